@@ -0,0 +1,15 @@
+"""Python client for the Analog Home API (used by the agent and api/ scripts).
+
+Both clients keep one pooled keep-alive connection set, gzip JSON bodies
+of 1 KB or more, retry 5xx/429 with jittered exponential backoff (only
+429/503 for non-idempotent calls such as /vote and /daemon-tick), and
+buffer daemon-tick lines so each tick costs one request per batch.
+
+Requires httpx (pip install httpx).
+"""
+
+from ._common import AnalogAPIError
+from .aio import AsyncAnalogClient
+from .client import AnalogClient
+
+__all__ = ["AnalogClient", "AsyncAnalogClient", "AnalogAPIError"]
@@ -0,0 +1,441 @@
+"""Transport-independent pieces shared by the sync and asyncio clients.
+
+Each endpoint method in Endpoints builds a Call and hands it to the
+concrete client's _call(), which returns the decoded result (sync) or an
+awaitable of it (asyncio). That keeps one definition per endpoint.
+"""
+
+import copy
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional
+
+DEFAULT_BASE_URL = os.getenv("API_URL", "https://api.analog-i.ai")
+
+# Statuses worth retrying. Non-idempotent calls only retry the ones that
+# guarantee the request was not applied (429 rate limit, 503 busy).
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+SAFE_RETRY_STATUSES = frozenset({429, 503})
+
+# JSON bodies at least this large are sent gzip-encoded.
+GZIP_MIN_BYTES = 1024
+
+
+class AnalogAPIError(Exception):
+    """Non-2xx response from the API (after retries)."""
+
+    def __init__(self, status_code: int, detail: Any):
+        super().__init__(f"HTTP {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+@dataclass
+class Call:
+    method: str
+    path: str
+    params: Optional[dict] = None
+    json: Any = None
+    content: Optional[bytes] = None
+    headers: Optional[dict] = None
+    # Safe to resend after a 5xx or a dropped connection (the server
+    # either didn't apply it or applying it twice is harmless).
+    idempotent: bool = True
+    # "json" -> decoded JSON, "bytes" -> raw body, "page" -> cursor page
+    # dict {"items", "next_cursor", "prev_cursor"}, "changes" -> poll dict
+    # {"items", "change_token"}.
+    expect: str = "json"
+
+
+def encode_body(call: Call) -> tuple[Optional[bytes], dict]:
+    """Serialize (and gzip, if large) the call's body. Returns (content, headers)."""
+    headers = dict(call.headers or {})
+    if call.json is None:
+        return call.content, headers
+    body = json.dumps(call.json, separators=(",", ":")).encode()
+    headers["Content-Type"] = "application/json"
+    if len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+class ETagCache:
+    """Last (ETag, decoded result) per GET, for If-None-Match revalidation.
+
+    The API answers an unchanged GET with a bodiless 304; the client then
+    returns a copy of the result it decoded last time.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(call: Call) -> Optional[tuple]:
+        if call.method != "GET" or call.expect == "bytes":
+            return None
+        return call.path, tuple(sorted((call.params or {}).items()))
+
+    def etag(self, key) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def result(self, key) -> Any:
+        with self._lock:
+            self._entries.move_to_end(key)
+            return copy.deepcopy(self._entries[key][1])
+
+    def put(self, key, etag: str, result: Any) -> None:
+        with self._lock:
+            self._entries[key] = (etag, copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def should_retry(call: Call, status_code: int) -> bool:
+    if call.idempotent:
+        return status_code in RETRY_STATUSES
+    return status_code in SAFE_RETRY_STATUSES
+
+
+def retry_delay(attempt: int, backoff: float, backoff_cap: float, retry_after: Optional[str] = None) -> float:
+    """Seconds to wait before retry number attempt+1: full-jitter exponential
+    backoff, but never less than a numeric Retry-After."""
+    delay = random.uniform(0, min(backoff_cap, backoff * (2 ** attempt)))
+    if retry_after and retry_after.isdigit():
+        delay = max(delay, min(float(retry_after), backoff_cap))
+    return delay
+
+
+def decode(call: Call, status_code: int, body: bytes, headers) -> Any:
+    content_type = headers.get("content-type", "")
+    if status_code >= 400:
+        detail: Any = body.decode(errors="replace")
+        if content_type.startswith("application/json"):
+            try:
+                detail = json.loads(body).get("detail", detail)
+            except (ValueError, AttributeError):
+                pass
+        raise AnalogAPIError(status_code, detail)
+    if call.expect == "bytes":
+        return body
+    data = json.loads(body) if body else None
+    if call.expect == "page":
+        return {"items": data, "next_cursor": headers.get("x-next-cursor"),
+                "prev_cursor": headers.get("x-prev-cursor")}
+    if call.expect == "changes":
+        return {"items": data, "change_token": headers.get("x-change-token")}
+    return data
+
+
+class SSEParser:
+    """Incremental text/event-stream parser for /events.
+
+    feed(line) takes one line (without its newline) and returns an event
+    dict {"id", "event", "data"} (data JSON-decoded) when the line ends
+    one, else None. Comments (heartbeats) are skipped.
+    """
+
+    def __init__(self):
+        self.last_event_id: Optional[int] = None
+        self._event = "message"
+        self._data: list[str] = []
+        self._id: Optional[int] = None
+
+    def feed(self, line: str) -> Optional[dict]:
+        if not line:
+            if not self._data:
+                self._event, self._id = "message", None
+                return None
+            event = {"id": self._id, "event": self._event, "data": json.loads("\n".join(self._data))}
+            if self._id is not None:
+                self.last_event_id = self._id
+            self._event, self._data, self._id = "message", [], None
+            return event
+        if line.startswith(":"):
+            return None
+        field, _, value = line.partition(":")
+        value = value[1:] if value.startswith(" ") else value
+        if field == "event":
+            self._event = value
+        elif field == "data":
+            self._data.append(value)
+        elif field == "id" and value.isdigit():
+            self._id = int(value)
+        return None
+
+
+def events_headers(last_event_id: Optional[int]) -> dict:
+    headers = {"Accept": "text/event-stream"}
+    if last_event_id is not None:
+        headers["Last-Event-ID"] = str(last_event_id)
+    return headers
+
+
+class TickBuffer:
+    """Coalesces daemon-tick lines per (run_id, tick) until flushed.
+
+    Several roles pushing lines for the same tick become one request.
+    brain / sentry_interval / complete take the most recent value.
+    """
+
+    def __init__(self, max_lines: int):
+        self.max_lines = max_lines
+        self._pending: dict[tuple[str, int], dict] = {}
+        self._lines = 0
+        self._lock = threading.Lock()
+        self.oldest_at: Optional[float] = None
+
+    def add(self, tick: int, lines: list[str], brain: str, run_id: str,
+            sentry_interval: int, complete: bool) -> bool:
+        """Buffer lines; True when the buffer should be flushed now."""
+        with self._lock:
+            entry = self._pending.setdefault((run_id, tick), {
+                "tick": tick, "brain": brain, "run_id": run_id, "lines": [],
+                "sentry_interval": sentry_interval, "complete": False,
+            })
+            entry["lines"].extend(lines)
+            entry["brain"] = brain or entry["brain"]
+            entry["sentry_interval"] = sentry_interval
+            entry["complete"] = complete
+            self._lines += len(lines)
+            if self.oldest_at is None:
+                self.oldest_at = time.monotonic()
+            return complete or self._lines >= self.max_lines
+
+    def drain(self) -> list[dict]:
+        with self._lock:
+            payloads = list(self._pending.values())
+            self._pending.clear()
+            self._lines = 0
+            self.oldest_at = None
+            return payloads
+
+    def requeue(self, payloads: list[dict]) -> None:
+        """Put unsent payloads back ahead of anything buffered since."""
+        with self._lock:
+            newer = self._pending
+            self._pending = {}
+            for p in payloads:
+                self._pending[(p["run_id"], p["tick"])] = p
+            for key, p in newer.items():
+                if key in self._pending:
+                    merged = self._pending[key]
+                    merged["lines"].extend(p["lines"])
+                    merged.update({k: p[k] for k in ("brain", "sentry_interval", "complete")})
+                else:
+                    self._pending[key] = p
+            self._lines = sum(len(p["lines"]) for p in self._pending.values())
+            if self._pending and self.oldest_at is None:
+                self.oldest_at = time.monotonic()
+
+    def requeue_failed(self, payloads: list[dict], result: dict) -> None:
+        """Requeue the payloads a /daemon-ticks result marks for retry."""
+        retry = [payloads[r["index"]] for r in result.get("results", []) if not r["ok"] and r.get("retry")]
+        if retry:
+            self.requeue(retry)
+
+
+def _list_params(limit, offset, run_id, artifact_type, sort, include_images, fields=None, preview=None) -> dict:
+    params = {"limit": limit, "offset": offset, "sort": sort, "include_images": str(include_images).lower()}
+    if run_id:
+        params["run_id"] = run_id
+    if artifact_type:
+        params["artifact_type"] = artifact_type
+    params.update(_projection_params(fields, preview))
+    return params
+
+
+def _projection_params(fields: Optional[list[str]], preview: Optional[int]) -> dict:
+    """fields= (only these, plus id/created_at/updated_at) and preview=
+    (bodies cut to N characters) for artifact reads."""
+    params = {}
+    if fields:
+        params["fields"] = ",".join(fields)
+    if preview is not None:
+        params["preview"] = preview
+    return params
+
+
+class Endpoints:
+    """One method per API endpoint. Subclasses supply _call()."""
+
+    def _call(self, call: Call):
+        raise NotImplementedError
+
+    # --- health / state -------------------------------------------------
+    def healthz(self):
+        return self._call(Call("GET", "/healthz"))
+
+    def state(self):
+        return self._call(Call("GET", "/state"))
+
+    def home(self, versions: Optional[dict] = None):
+        """GET /home. Sections whose version matches versions[section] come back as "unchanged"."""
+        raw = ",".join(f"{name}:{v}" for name, v in (versions or {}).items())
+        return self._call(Call("GET", "/home", params={"versions": raw} if raw else None))
+
+    def audience(self):
+        return self._call(Call("GET", "/audience"))
+
+    def cache_stats(self):
+        return self._call(Call("GET", "/cache/stats"))
+
+    # --- artifacts ------------------------------------------------------
+    def publish(self, artifact: dict):
+        """POST /publish. Idempotent: the server upserts by id, so always pass one."""
+        return self._call(Call("POST", "/publish", json=artifact, idempotent="id" in artifact))
+
+    def artifacts(self, limit: int = 5, offset: int = 0, run_id: Optional[str] = None,
+                  artifact_type: Optional[str] = None, sort: str = "desc", include_images: bool = False,
+                  fields: Optional[list[str]] = None, preview: Optional[int] = None):
+        return self._call(Call("GET", "/artifacts", params=_list_params(
+            limit, offset, run_id, artifact_type, sort, include_images, fields, preview)))
+
+    def artifacts_page(self, limit: int = 25, after: Optional[str] = None, before: Optional[str] = None,
+                       run_id: Optional[str] = None, artifact_type: Optional[str] = None,
+                       sort: str = "desc", include_images: bool = False,
+                       fields: Optional[list[str]] = None, preview: Optional[int] = None):
+        """Keyset page: {"items", "next_cursor", "prev_cursor"}. Pass a
+        returned cursor back as after= (next) or before= (previous)."""
+        params = _list_params(limit, 0, run_id, artifact_type, sort, include_images, fields, preview)
+        if after:
+            params["after"] = after
+        if before:
+            params["before"] = before
+        return self._call(Call("GET", "/artifacts", params=params, expect="page"))
+
+    def artifacts_since(self, since: Optional[str] = None, limit: int = 50, run_id: Optional[str] = None,
+                        artifact_type: Optional[str] = None, include_images: bool = False):
+        """Poll for changes: {"items", "change_token"}. Pass change_token
+        back as since= next time; items are artifacts published or edited
+        after it (merge by id)."""
+        params = _list_params(limit, 0, run_id, artifact_type, "desc", include_images)
+        if since:
+            params["since"] = since
+        return self._call(Call("GET", "/artifacts", params=params, expect="changes"))
+
+    def artifacts_count(self, run_id: Optional[str] = None, artifact_type: Optional[str] = None):
+        params = {k: v for k, v in (("run_id", run_id), ("artifact_type", artifact_type)) if v}
+        return self._call(Call("GET", "/artifacts/count", params=params))
+
+    def artifacts_sprite(self, limit: int = 24, offset: int = 0, run_id: Optional[str] = None,
+                         artifact_type: Optional[str] = None, sort: str = "desc", tile: int = 200):
+        params = {"limit": limit, "offset": offset, "sort": sort, "tile": tile}
+        if run_id:
+            params["run_id"] = run_id
+        if artifact_type:
+            params["artifact_type"] = artifact_type
+        return self._call(Call("GET", "/artifacts/sprite", params=params))
+
+    def search(self, q: str, limit: int = 20, cursor: Optional[str] = None, run_id: Optional[str] = None,
+               artifact_type: Optional[str] = None, from_date: Optional[str] = None,
+               to_date: Optional[str] = None, sort: str = "rank"):
+        """Full-text search page: {"items", "next_cursor", "prev_cursor"}.
+        Pass next_cursor back as cursor= for the following page."""
+        params = {"q": q, "limit": limit, "sort": sort}
+        for name, value in (("cursor", cursor), ("run_id", run_id), ("artifact_type", artifact_type),
+                            ("from_date", from_date), ("to_date", to_date)):
+            if value:
+                params[name] = value
+        return self._call(Call("GET", "/search", params=params, expect="page"))
+
+    def artifact(self, artifact_id: int, fields: Optional[list[str]] = None, preview: Optional[int] = None):
+        return self._call(Call("GET", f"/artifacts/{artifact_id}", params=_projection_params(fields, preview) or None))
+
+    def artifact_position(self, artifact_id: int, page_size: Optional[int] = None):
+        params = {"page_size": page_size} if page_size else None
+        return self._call(Call("GET", f"/artifacts/{artifact_id}/position", params=params))
+
+    def artifact_positions(self, ids: list[int], page_size: Optional[int] = None):
+        """Resolve many artifacts' run/position/total (and page) in one call."""
+        params = {"ids": ",".join(str(int(i)) for i in ids)}
+        if page_size:
+            params["page_size"] = page_size
+        return self._call(Call("GET", "/artifacts/positions", params=params))
+
+    def patch_artifact_body(self, artifact_id: int, body_markdown: str):
+        return self._call(Call("PATCH", f"/artifacts/{artifact_id}/body", json={"body_markdown": body_markdown}))
+
+    def delete_artifact(self, artifact_id: int):
+        return self._call(Call("DELETE", f"/artifacts/{artifact_id}"))
+
+    def latest_image(self):
+        return self._call(Call("GET", "/latest-image"))
+
+    def image(self, artifact_id: int, size: str = "full", accept: str = "image/jpeg"):
+        """Raw bytes of an image tier."""
+        return self._call(Call("GET", f"/artifacts/{artifact_id}/image/{size}",
+                               headers={"Accept": accept}, expect="bytes"))
+
+    def put_image(self, artifact_id: int, data: bytes, mime: str = "image/jpeg"):
+        """Upload an artifact's image as a raw binary body (no base64)."""
+        return self._call(Call("PUT", f"/artifacts/{artifact_id}/image", content=data,
+                               headers={"Content-Type": mime}))
+
+    def featured(self, include_images: bool = False, fields: Optional[list[str]] = None,
+                 preview: Optional[int] = None):
+        params = {"include_images": str(include_images).lower(), **_projection_params(fields, preview)}
+        return self._call(Call("GET", "/featured", params=params))
+
+    def feature(self, artifact_id: int):
+        return self._call(Call("POST", f"/feature/{artifact_id}"))
+
+    def unfeature(self, artifact_id: int):
+        return self._call(Call("DELETE", f"/feature/{artifact_id}"))
+
+    def runs(self):
+        return self._call(Call("GET", "/runs"))
+
+    # --- controls / seeds -----------------------------------------------
+    def vote(self, choice: str, temperature: Optional[float] = None):
+        return self._call(Call("POST", "/vote", json={"choice": str(choice), "temperature": temperature},
+                               idempotent=False))
+
+    def set_temperature(self, temperature: float):
+        return self._call(Call("POST", "/temperature", json={"temperature": temperature}, idempotent=False))
+
+    def set_default_temperature(self, temperature: float):
+        return self._call(Call("POST", "/default-temperature", json={"temperature": temperature}))
+
+    def set_tagline(self, tagline: str):
+        return self._call(Call("POST", "/tagline", json={"tagline": tagline}))
+
+    def set_trajectory(self, label_1: str, label_2: str, label_3: str, reason: str = "",
+                       default_temperature: Optional[float] = None):
+        return self._call(Call("POST", "/set-trajectory", json={
+            "label_1": label_1, "label_2": label_2, "label_3": label_3,
+            "reason": reason, "default_temperature": default_temperature,
+        }))
+
+    def seed(self, text: str):
+        return self._call(Call("POST", "/seed", json={"text": text}, idempotent=False))
+
+    def consume_seeds(self, ids: list[int]):
+        return self._call(Call("POST", "/consume-seeds", json={"ids": list(ids)}))
+
+    # --- daemon ---------------------------------------------------------
+    def daemon_live(self, limit: int = 10):
+        return self._call(Call("GET", "/daemon/live", params={"limit": limit}))
+
+    def daemon_live_since(self, since: Optional[str] = None, limit: int = 10):
+        """Poll for tick changes: {"items", "change_token"} (see artifacts_since)."""
+        params = {"limit": limit, **({"since": since} if since else {})}
+        return self._call(Call("GET", "/daemon/live", params=params, expect="changes"))
+
+    def clear_daemon_ticks(self, run_id: str = ""):
+        return self._call(Call("DELETE", "/daemon-ticks", params={"run_id": run_id}))
+
+    def _send_daemon_ticks(self, payloads: list[dict]):
+        # Appends lines server-side, so never blindly resent after a 5xx.
+        return self._call(Call("POST", "/daemon-ticks", json=payloads, idempotent=False))
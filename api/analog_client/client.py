@@ -0,0 +1,153 @@
+"""Blocking client: one keep-alive httpx.Client shared by every call."""
+
+import threading
+import time
+from typing import Optional
+
+import httpx
+
+from ._common import (DEFAULT_BASE_URL, Call, Endpoints, ETagCache, SSEParser, TickBuffer, decode,
+                      encode_body, events_headers, retry_delay, should_retry)
+
+
+class AnalogClient(Endpoints):
+    """Sync Analog Home API client.
+
+    Usage:
+        with AnalogClient("http://localhost:8000") as api:
+            api.publish({...})
+            api.daemon_tick(12, ["[sentry] quiet"], run_id="r1")   # buffered
+    """
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, *, timeout: float = 30.0,
+                 max_retries: int = 3, backoff: float = 0.5, backoff_cap: float = 8.0,
+                 max_connections: int = 10, tick_batch_lines: int = 50,
+                 tick_flush_interval: float = 2.0):
+        self._http = httpx.Client(
+            base_url=base_url.rstrip("/"),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections),
+        )
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.backoff_cap = backoff_cap
+        self.tick_flush_interval = tick_flush_interval
+        self._ticks = TickBuffer(tick_batch_lines)
+        self._etags = ETagCache()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def _call(self, call: Call):
+        content, headers = encode_body(call)
+        cache_key = ETagCache.key(call)
+        etag = self._etags.etag(cache_key) if cache_key else None
+        if etag:
+            headers["If-None-Match"] = etag
+        attempt = 0
+        while True:
+            try:
+                resp = self._http.request(call.method, call.path, params=call.params,
+                                          content=content, headers=headers)
+            except httpx.TransportError as e:
+                # A failed connect never reached the server, so even
+                # non-idempotent calls may retry it.
+                retryable = call.idempotent or isinstance(e, httpx.ConnectError)
+                if not retryable or attempt >= self.max_retries:
+                    raise
+                time.sleep(retry_delay(attempt, self.backoff, self.backoff_cap))
+                attempt += 1
+                continue
+            if attempt < self.max_retries and should_retry(call, resp.status_code):
+                time.sleep(retry_delay(attempt, self.backoff, self.backoff_cap,
+                                       resp.headers.get("retry-after")))
+                attempt += 1
+                continue
+            if resp.status_code == 304 and etag:
+                return self._etags.result(cache_key)
+            result = decode(call, resp.status_code, resp.content, resp.headers)
+            if cache_key and resp.headers.get("etag"):
+                self._etags.put(cache_key, resp.headers["etag"], result)
+            return result
+
+    # --- server-sent events -------------------------------------------
+    def events(self, last_event_id: Optional[int] = None):
+        """Iterate /events as {"id", "event", "data"} dicts, forever.
+
+        Reconnects after a dropped stream (resuming from the last event id)
+        and after 503 (stream cap reached), honouring Retry-After. Break
+        out of the loop to stop.
+        """
+        parser = SSEParser()
+        parser.last_event_id = last_event_id
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                with self._http.stream("GET", "/events", headers=events_headers(parser.last_event_id),
+                                       timeout=httpx.Timeout(self._http.timeout.connect, read=None)) as resp:
+                    if resp.status_code == 200:
+                        attempt = 0
+                        for line in resp.iter_lines():
+                            event = parser.feed(line)
+                            if event is not None:
+                                yield event
+                    elif resp.status_code == 503:
+                        retry_after = resp.headers.get("retry-after")
+                    else:
+                        decode(Call("GET", "/events"), resp.status_code, resp.read(), resp.headers)
+            except httpx.TransportError:
+                pass
+            time.sleep(retry_delay(attempt, self.backoff, self.backoff_cap, retry_after))
+            attempt += 1
+
+    # --- buffered daemon ticks -----------------------------------------
+    def daemon_tick(self, tick: int, lines: list[str], brain: str = "", run_id: str = "",
+                    sentry_interval: int = 300, complete: bool = False) -> None:
+        """Buffer tick lines; sent in batches (size, age, complete=True, flush(), close())."""
+        if self._ticks.add(tick, lines, brain, run_id, sentry_interval, complete):
+            self.flush_daemon_ticks()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.tick_flush_interval, self._timed_flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _timed_flush(self) -> None:
+        try:
+            self.flush_daemon_ticks()
+        except Exception:
+            pass  # lines were requeued; the next add/flush retries them
+
+    def flush_daemon_ticks(self) -> int:
+        """Send every buffered tick in one /daemon-ticks request.
+
+        Returns the number of requests made. Ticks the server reports as
+        retryable go back in the buffer; invalid ones are dropped.
+        """
+        with self._flush_lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            payloads = self._ticks.drain()
+            if not payloads:
+                return 0
+            try:
+                result = self._send_daemon_ticks(payloads)
+            except Exception:
+                self._ticks.requeue(payloads)
+                raise
+            self._ticks.requeue_failed(payloads, result)
+            return 1
+
+    # --- lifecycle ------------------------------------------------------
+    def close(self) -> None:
+        try:
+            self.flush_daemon_ticks()
+        finally:
+            self._http.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,72 @@
+"""Pre-render publish-time image variants and metadata for artifacts missing them.
+
+Covers rows published before variants existed, rows published before a
+new format (WebP/AVIF) was added, and rows without image metadata
+(dimensions, size, placeholder, dominant colour). Talks to Postgres directly (DATABASE_URL,
+same as the API). Safe to re-run: only artifacts missing metadata or one
+or more publish-time variants are processed.
+
+Usage:
+    DATABASE_URL=postgres://... python backfill_image_variants.py
+"""
+import sys
+
+from db import init_db, get_pool, close
+from storage import load_blob
+from images import PUBLISH_VARIANTS, decode_legacy_data_uri, render_publish, store_variants, variant_key
+
+
+def main() -> int:
+    init_db()
+    keys = [variant_key(tier, fmt) for tier, fmt in PUBLISH_VARIANTS]
+    try:
+        with get_pool().connection() as conn:
+            ids = [r[0] for r in conn.execute("""
+              SELECT a.id FROM artifacts a
+              WHERE (a.image_data IS NOT NULL OR a.image_sha256 IS NOT NULL
+                     OR a.image_url LIKE 'data:%%')
+                AND (a.image_width IS NULL
+                     OR (SELECT COUNT(*) FROM artifact_image_variants v
+                         WHERE v.artifact_id = a.id AND v.size = ANY(%s)) < %s)
+              ORDER BY a.id
+            """, [keys, len(keys)]).fetchall()]
+        print(f"Artifacts missing variants or metadata: {len(ids)}")
+
+        rendered = 0
+        failed = 0
+        for artifact_id in ids:
+            # One row at a time so only a single original is in memory.
+            with get_pool().connection() as conn:
+                row = conn.execute(
+                    "SELECT image_data, image_url, image_sha256 FROM artifacts WHERE id = %s", [artifact_id]
+                ).fetchone()
+                if not row:
+                    continue
+                raw = load_blob(row[0], row[2]) or decode_legacy_data_uri(row[1])[0]
+                variants, meta = render_publish(raw) if raw else ({}, {})
+                if not variants or not meta:
+                    print(f"  [FAIL] id={artifact_id}: could not decode image")
+                    failed += 1
+                    continue
+                store_variants(conn, artifact_id, variants)
+                conn.execute(
+                    """UPDATE artifacts SET image_size = %s, image_width = %s, image_height = %s,
+                              image_placeholder = %s, image_color = %s
+                       WHERE id = %s""",
+                    [meta["size"], meta["width"], meta["height"], meta["placeholder"], meta["color"],
+                     artifact_id]
+                )
+                conn.commit()
+            rendered += 1
+            sizes = ", ".join(f"{s}={len(d):,}" for s, (d, _) in variants.items())
+            print(f"  [OK]   id={artifact_id}: {meta['width']}x{meta['height']} {sizes}")
+
+        print()
+        print(f"Done. Rendered: {rendered}  Failed: {failed}")
+        return 0 if failed == 0 else 2
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
-"""Backfill legacy data-URI images by re-publishing them through /publish.
+"""Backfill legacy data-URI images by uploading them through the API.
 
-No DB access required — uses the public API. The /publish endpoint's
-ON CONFLICT (id) DO UPDATE branch overwrites the row in place when we
-send the same id.
+No DB access required — uses the public API via analog_client. Each
+image goes up as a raw binary body through PUT /artifacts/{id}/image,
+which replaces the data URI in place and leaves all other metadata as is.
 
 Usage:
     API_URL=https://api.analog-i.ai python backfill_images_via_api.py
@@ -11,7 +11,7 @@ import base64
 import os
 import sys
 
-import requests
+from analog_client import AnalogClient
 
 
 def parse_data_uri(uri: str) -> tuple[bytes, str]:
@@ -23,17 +23,15 @@ def parse_data_uri(uri: str) -> tuple[bytes, str]:
 
 
 def main() -> int:
-    api = os.environ.get("API_URL", "https://api.marcusrecursives.com").rstrip("/")
-    print(f"API: {api}")
+    base_url = os.environ.get("API_URL", "https://api.marcusrecursives.com").rstrip("/")
+    print(f"API: {base_url}")
+    with AnalogClient(base_url, timeout=60) as api:
+        return backfill(api)
 
+
+def backfill(api: AnalogClient) -> int:
     # Fetch image artifacts with image data inlined.
-    r = requests.get(
-        f"{api}/artifacts",
-        params={"artifact_type": "image", "limit": 50, "sort": "desc", "include_images": "true"},
-        timeout=30,
-    )
-    r.raise_for_status()
-    arts = r.json()
+    arts = api.artifacts(artifact_type="image", limit=50, sort="desc", include_images=True)
     print(f"Fetched {len(arts)} image artifacts.")
 
     legacy = [a for a in arts if (a.get("image_url") or "").startswith("data:")]
@@ -53,38 +51,11 @@ def main() -> int:
             failed += 1
             continue
 
-        b64 = base64.b64encode(data).decode("ascii")
-
-        # Re-publish with the same id. /publish ON CONFLICT (id) DO UPDATE
-        # will overwrite the row in place: image_data populated, image_url
-        # cleared, all other metadata preserved verbatim.
-        payload = {
-            "id": artifact_id,
-            "brain": art.get("brain", ""),
-            "cycle": art.get("cycle"),
-            "artifact_type": art.get("artifact_type", "image"),
-            "title": art.get("title", ""),
-            "body_markdown": art.get("body_markdown", ""),
-            "monologue_public": art.get("monologue_public", ""),
-            "channel": art.get("channel", ""),
-            "source_platform": art.get("source_platform", ""),
-            "source_id": art.get("source_id", ""),
-            "source_parent_id": art.get("source_parent_id", ""),
-            "source_url": art.get("source_url", ""),
-            "search_queries": art.get("search_queries", ""),
-            "temperature": art.get("temperature"),
-            "run_id": art.get("run_id", ""),
-            "image_url": "",  # clear the legacy data URI
-            "image_data_b64": b64,
-            "image_mime": mime,
-        }
-
+        # PUT /artifacts/{id}/image stores the bytes and clears image_url
+        # in one transaction, so a failed upload leaves the legacy data URI
+        # in place to retry.
         try:
-            resp = requests.post(f"{api}/publish", json=payload, timeout=60)
-            if resp.status_code >= 400:
-                print(f"  [FAIL] id={artifact_id}: HTTP {resp.status_code} {resp.text[:200]}")
-                failed += 1
-                continue
+            api.put_image(artifact_id, data, mime)
         except Exception as e:
             print(f"  [FAIL] id={artifact_id}: {e}")
             failed += 1
@@ -99,14 +70,12 @@ def main() -> int:
     print(f"Total binary uploaded: {total_bytes:,} bytes")
 
     # Verify: re-fetch and count remaining legacy URIs.
-    r = requests.get(
-        f"{api}/artifacts",
-        params={"artifact_type": "image", "limit": 50, "include_images": "true"},
-        timeout=30,
-    )
-    if r.ok:
-        remaining = sum(1 for a in r.json() if (a.get("image_url") or "").startswith("data:"))
+    try:
+        arts = api.artifacts(artifact_type="image", limit=50, include_images=True)
+        remaining = sum(1 for a in arts if (a.get("image_url") or "").startswith("data:"))
         print(f"Legacy data URIs remaining: {remaining}")
+    except Exception as e:
+        print(f"Verify failed: {e}")
 
     return 0 if failed == 0 else 2
 
@@ -0,0 +1,253 @@
+"""In-process caches for Analog Home API.
+
+ByteLRUCache holds final encoded response bodies (e.g. image tiers) under
+a memory budget. SingleFlight coalesces concurrent cache misses for the
+same key into one computation. VersionedSnapshot holds one value (the
+/state payload, the /home sections) that writers invalidate by bumping
+its version, patch in place, or refresh() in the background. Handlers
+run on FastAPI's threadpool, so every operation takes a lock.
+Per-process only: each uvicorn worker keeps its own copy.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# ---------------------------------------------------------------------------
+# Configurable defaults (override via environment)
+# ---------------------------------------------------------------------------
+IMAGE_CACHE_MB = float(os.getenv("IMAGE_CACHE_MB", "64"))
+IMAGE_CACHE_MAX_ENTRY_MB = float(os.getenv("IMAGE_CACHE_MAX_ENTRY_MB", "4"))
+# Upper bound on /state and /home staleness for writes made by *other* processes;
+# writes through this process invalidate immediately.
+STATE_CACHE_TTL = float(os.getenv("STATE_CACHE_TTL", "5"))
+
+
+class ByteLRUCache:
+    """LRU mapping of key -> (bytes, mime) bounded by total byte size.
+
+    Keys are tuples whose first element is the artifact id, so
+    invalidate_artifact() can drop every tier of one artifact at once.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: OrderedDict[tuple, tuple[bytes, str]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, data: bytes, mime: str) -> None:
+        """Store an entry, evicting least-recently-used ones to fit the budget.
+
+        Entries larger than max_entry_bytes are silently not cached.
+        """
+        n = len(data)
+        if n > self.max_entry_bytes or n > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old[0])
+            self._entries[key] = (data, mime)
+            self._size += n
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+                self.evictions += 1
+
+    def invalidate_artifact(self, artifact_id: int) -> None:
+        """Drop every cached entry belonging to one artifact."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == artifact_id]:
+                self._size -= len(self._entries.pop(key)[0])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "max_entry_bytes": self.max_entry_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class SingleFlight:
+    """Run at most one call per key at a time; concurrent callers share it.
+
+    The first caller for a key (the leader) runs fn(); callers arriving
+    while it runs block and receive the same result or exception.
+    """
+
+    def __init__(self):
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._calls[key] = fut
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class VersionedSnapshot:
+    """One cached value tagged with a monotonically increasing version.
+
+    Writers call bump() after committing; the next get() reloads. A load
+    that started before a bump is returned to its caller but not kept, so
+    the cache never holds data older than the latest local write. Entries
+    also expire after ttl seconds to pick up other processes' writes.
+    Concurrent reloads are coalesced into one: across threads by get(),
+    across coroutines on the event loop by get_async().
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._version = 0
+        self._value = None
+        self._value_version = -1
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._async_loads: dict[int, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def bump(self) -> int:
+        """Invalidate the cached value. Returns the new version."""
+        with self._lock:
+            self._version += 1
+            return self._version
+
+    def patch(self, update):
+        """Apply update(value) to the cached value in place, keeping its
+        version, and return the result; None if nothing current is cached.
+
+        For writers that know exactly what their commit changed (a vote
+        adds one to a tally). A load already in flight may overwrite the
+        patch with data from before it, so the writer must still trigger
+        a refresh (its NOTIFY does).
+        """
+        with self._lock:
+            if self._value_version != self._version:
+                return None
+            self._value = update(self._value)
+            return self._value
+
+    def refresh(self, load):
+        """Reload in the caller's thread and return the new value.
+
+        Unlike bump(), readers keep getting the current value while the
+        load runs, so a background refresh never puts a reload on their
+        path. The result is not kept if a bump() happened meanwhile.
+        """
+        with self._lock:
+            version = self._version
+        return self._load(load, version)
+
+    def get(self, load):
+        """Return the cached value, calling load() if it is stale or missing."""
+        with self._lock:
+            if self._value_version == self._version and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            version = self._version
+        return self._flight.do(version, lambda: self._load(load, version))
+
+    async def get_async(self, load):
+        """get() with an async load(); call from the event loop only."""
+        with self._lock:
+            if self._value_version == self._version and time.monotonic() - self._loaded_at < self.ttl:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            version = self._version
+        task = self._async_loads.get(version)
+        if task is None:
+            task = asyncio.ensure_future(self._load_async(load, version))
+            self._async_loads[version] = task
+            task.add_done_callback(lambda _: self._async_loads.pop(version, None))
+        # One cancelled waiter must not cancel the load the others share.
+        return await asyncio.shield(task)
+
+    def _load(self, load, version: int):
+        loaded_at = time.monotonic()
+        value = load()
+        self._store(value, version, loaded_at)
+        return value
+
+    async def _load_async(self, load, version: int):
+        loaded_at = time.monotonic()
+        value = await load()
+        self._store(value, version, loaded_at)
+        return value
+
+    def _store(self, value, version: int, loaded_at: float) -> None:
+        with self._lock:
+            if self._version == version:
+                self._value = value
+                self._value_version = version
+                self._loaded_at = loaded_at
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "version": self._version,
+                "cached": self._value_version == self._version,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+image_cache = ByteLRUCache(
+    max_bytes=int(IMAGE_CACHE_MB * 1024 * 1024),
+    max_entry_bytes=int(IMAGE_CACHE_MAX_ENTRY_MB * 1024 * 1024),
+)
+
+state_snapshot = VersionedSnapshot(ttl=STATE_CACHE_TTL)
+home_snapshot = VersionedSnapshot(ttl=STATE_CACHE_TTL)
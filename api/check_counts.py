@@ -0,0 +1,36 @@
+"""Check (and optionally repair) the artifact_counts counters.
+
+Compares every counter behind /artifacts/count with a fresh COUNT(*) of
+artifacts and prints the ones that disagree. With --repair, rebuilds the
+table in one transaction.
+
+Usage:
+    DATABASE_URL=postgres://... python check_counts.py
+    ... python check_counts.py --repair
+"""
+import sys
+
+from counts import diff_counts, rebuild_counts
+from db import init_db, get_pool, close
+
+
+def main() -> int:
+    repair = "--repair" in sys.argv[1:]
+    init_db()
+    try:
+        with get_pool().connection() as conn:
+            drift = diff_counts(conn)
+            for run_id, artifact_type, stored, actual in drift:
+                print(f"  [DRIFT] run_id={run_id!r} artifact_type={artifact_type!r}: stored {stored}, actual {actual}")
+            print(f"{len(drift)} counters out of sync.")
+            if drift and repair:
+                rebuild_counts(conn)
+                conn.commit()
+                print("Rebuilt artifact_counts.")
+        return 1 if drift and not repair else 0
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Artifact counters behind /artifacts/count.
+
+artifact_counts holds one row per filter combination /artifacts/count
+accepts: (run_id, artifact_type), (run_id, '*'), ('*', artifact_type)
+and ('*', '*'), where '*' means "any". Writers call adjust_counts() in
+the same transaction as the insert/delete/type change, so a count is a
+primary-key read whatever the table size. rebuild_counts() recomputes
+everything (see check_counts.py).
+
+Lock order: a writer that also maintains runs takes its run locks
+(runs.lock_runs(), see runs.py) before adjust_counts()/move_counts()
+(counter row locks), so a publish and a delete in the same run can't
+deadlock.
+"""
+
+ANY = "*"
+
+# Current counts for every combination, straight from artifacts. NULL
+# run_id/artifact_type values count under ''.
+_RECOUNT_SQL = """
+  SELECT CASE WHEN GROUPING(COALESCE(run_id, '')) = 1 THEN '*' ELSE COALESCE(run_id, '') END,
+         CASE WHEN GROUPING(COALESCE(artifact_type, '')) = 1 THEN '*' ELSE COALESCE(artifact_type, '') END,
+         COUNT(*)
+  FROM artifacts
+  GROUP BY CUBE (COALESCE(run_id, ''), COALESCE(artifact_type, ''))
+"""
+
+
+def _keys(run_id, artifact_type) -> list[tuple[str, str]]:
+    run_id, artifact_type = run_id or "", artifact_type or ""
+    return [(run_id, artifact_type), (run_id, ANY), (ANY, artifact_type), (ANY, ANY)]
+
+
+_ADJUST_SQL = """
+  INSERT INTO artifact_counts (run_id, artifact_type, n)
+  SELECT r, t, %s FROM unnest(%s::text[], %s::text[]) AS k(r, t)
+  ON CONFLICT (run_id, artifact_type) DO UPDATE SET n = artifact_counts.n + EXCLUDED.n
+"""
+
+
+def _adjust_params(run_id, artifact_type, delta: int) -> list:
+    keys = sorted(_keys(run_id, artifact_type))  # fixed lock order across writers
+    return [delta, [k[0] for k in keys], [k[1] for k in keys]]
+
+
+def adjust_counts(conn, run_id, artifact_type, delta: int) -> None:
+    """Add delta to every counter an artifact in (run_id, artifact_type) belongs to."""
+    conn.execute(_ADJUST_SQL, _adjust_params(run_id, artifact_type, delta))
+
+
+def _moves(old: tuple | None, new: tuple | None) -> list[list]:
+    if old is not None and new is not None and tuple(old) == tuple(new):
+        return []
+    moves = []
+    if old is not None:
+        moves.append(_adjust_params(old[0], old[1], -1))
+    if new is not None:
+        moves.append(_adjust_params(new[0], new[1], 1))
+    return moves
+
+
+def move_counts(conn, old: tuple | None, new: tuple | None) -> None:
+    """Account for an artifact going from (run_id, artifact_type) old to new.
+
+    old is None for an insert, new is None for a delete.
+    """
+    for params in _moves(old, new):
+        conn.execute(_ADJUST_SQL, params)
+
+
+async def move_counts_async(conn, old: tuple | None, new: tuple | None) -> None:
+    """move_counts() for an AsyncConnection."""
+    for params in _moves(old, new):
+        await conn.execute(_ADJUST_SQL, params)
+
+
+def get_count(conn, run_id, artifact_type) -> int:
+    row = conn.execute(
+        "SELECT n FROM artifact_counts WHERE run_id = %s AND artifact_type = %s",
+        [run_id or ANY, artifact_type or ANY],
+    ).fetchone()
+    return int(row[0]) if row else 0
+
+
+def diff_counts(conn) -> list[tuple[str, str, int, int]]:
+    """(run_id, artifact_type, stored, actual) for every counter that is off."""
+    stored = {(r, t): n for r, t, n in conn.execute("SELECT run_id, artifact_type, n FROM artifact_counts").fetchall()}
+    actual = {(r, t): n for r, t, n in conn.execute(_RECOUNT_SQL).fetchall()}
+    return sorted(
+        (r, t, int(stored.get((r, t), 0)), int(actual.get((r, t), 0)))
+        for r, t in stored.keys() | actual.keys()
+        if stored.get((r, t), 0) != actual.get((r, t), 0)
+    )
+
+
+def rebuild_counts(conn) -> None:
+    """Recompute every counter from artifacts."""
+    conn.execute("LOCK TABLE artifact_counts IN EXCLUSIVE MODE")
+    conn.execute("DELETE FROM artifact_counts")
+    conn.execute("INSERT INTO artifact_counts (run_id, artifact_type, n) " + _RECOUNT_SQL)
@@ -1,13 +1,18 @@
 """Postgres database layer for Analog Home API.
 
 Uses psycopg3 with connection pooling. Connects to Neon serverless Postgres.
+Async handlers use a separate AsyncConnectionPool (open_async_pool() on
+startup); sync handlers and background threads use the ConnectionPool.
 """
 
 import os
 import datetime
-from psycopg_pool import ConnectionPool
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
 from dotenv import load_dotenv
 
+from counts import rebuild_counts
+from runs import rebuild_runs
+
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "")
@@ -22,13 +27,33 @@ MAX_SEEDS = 10              # reject new seeds when seedbank has this many
 MAX_SEEDS_RETURNED = 10
 MAX_VOTES_PER_IP = 5        # per-IP vote cap, resets each trajectory cycle
 
+# Connection pools (override via environment). DB_MAX_CONNECTIONS is the
+# per-process budget both pools share (plus one LISTEN connection, see
+# events.py): keep it times the number of API processes under the Neon
+# compute's max_connections, or use Neon's pooler endpoint. The async pool
+# serves the hot reads and votes, so it gets the larger share; the sync
+# pool serves image bytes, the remaining sync handlers and the tick writer.
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "10"))
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", str(max(2, DB_MAX_CONNECTIONS * 2 // 5))))
+DB_ASYNC_POOL_MIN_SIZE = int(os.getenv("DB_ASYNC_POOL_MIN_SIZE", "1"))
+DB_ASYNC_POOL_MAX_SIZE = int(os.getenv("DB_ASYNC_POOL_MAX_SIZE", str(max(2, DB_MAX_CONNECTIONS - DB_POOL_MAX_SIZE))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))            # seconds to wait for a free connection
+DB_POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "600"))         # close connections idle this long
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "3600"))
+
 _pool: ConnectionPool | None = None
+_async_pool: AsyncConnectionPool | None = None
 
 
 def init_db() -> None:
     """Create tables (if needed) and open the connection pool."""
     global _pool
-    _pool = ConnectionPool(DATABASE_URL, min_size=1, max_size=10)
+    if DB_POOL_MAX_SIZE + DB_ASYNC_POOL_MAX_SIZE > DB_MAX_CONNECTIONS:
+        raise RuntimeError(f"DB_POOL_MAX_SIZE ({DB_POOL_MAX_SIZE}) + DB_ASYNC_POOL_MAX_SIZE "
+                           f"({DB_ASYNC_POOL_MAX_SIZE}) exceeds DB_MAX_CONNECTIONS ({DB_MAX_CONNECTIONS})")
+    _pool = ConnectionPool(DATABASE_URL, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                           timeout=DB_POOL_TIMEOUT, max_idle=DB_POOL_MAX_IDLE, max_lifetime=DB_POOL_MAX_LIFETIME)
 
     with _pool.connection() as conn:
         conn.execute("""
@@ -102,6 +127,69 @@ def init_db() -> None:
             ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_mime VARCHAR(32) DEFAULT 'image/jpeg'
         """)
 
+        # Pre-rendered thumb/medium tiers, written at publish time so the
+        # image endpoint is a single indexed byte fetch (no PIL per GET).
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifact_image_variants (
+                artifact_id BIGINT NOT NULL REFERENCES artifacts(id) ON DELETE CASCADE,
+                size VARCHAR(16) NOT NULL,
+                image_data BYTEA NOT NULL,
+                image_mime VARCHAR(32) DEFAULT 'image/jpeg',
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (artifact_id, size)
+            )
+        """)
+        # Image bytes are already compressed: EXTERNAL skips pglz so the
+        # chunked substring() reads used for streaming full-size images
+        # only fetch the TOAST slices they need.
+        conn.execute("""
+            ALTER TABLE artifact_image_variants ALTER COLUMN image_data SET STORAGE EXTERNAL
+        """)
+
+        # Migration: content-addressed image storage (see storage.py). Rows
+        # record sha256 + size; image_data is NULL when the bytes live in
+        # the filesystem blob store instead of Postgres.
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_sha256 VARCHAR(64)
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_size INTEGER
+        """)
+        conn.execute("""
+            ALTER TABLE artifact_image_variants ADD COLUMN IF NOT EXISTS sha256 VARCHAR(64)
+        """)
+        conn.execute("""
+            ALTER TABLE artifact_image_variants ADD COLUMN IF NOT EXISTS byte_size INTEGER
+        """)
+        conn.execute("""
+            ALTER TABLE artifact_image_variants ALTER COLUMN image_data DROP NOT NULL
+        """)
+
+        # Migration: image metadata extracted once at publish (see
+        # images.analyze_image) so the front end can reserve layout and show
+        # a placeholder before downloading, and oversized originals can be
+        # found with a query.
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_width INTEGER
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_height INTEGER
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_placeholder TEXT
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS image_color VARCHAR(7)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_image_size
+            ON artifacts(image_size) WHERE image_size IS NOT NULL
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_image_dims
+            ON artifacts(image_width, image_height) WHERE image_width IS NOT NULL
+        """)
+
         conn.execute("""
             CREATE TABLE IF NOT EXISTS ip_rate_limits (
                 ip VARCHAR,
@@ -111,11 +199,162 @@ def init_db() -> None:
             )
         """)
 
+        # Votes not yet folded into controls.vote_N (see votes.py).
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_votes (
+                id BIGSERIAL PRIMARY KEY,
+                choice SMALLINT NOT NULL CHECK (choice BETWEEN 1 AND 3),
+                created_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
         # Migration: add is_featured column to artifacts
         conn.execute("""
             ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS is_featured BOOLEAN DEFAULT FALSE
         """)
 
+        # Listing indexes: (filter, created_at, id) matches the ORDER BY and the
+        # keyset cursor comparison in /artifacts, so pages at any depth are a
+        # range scan instead of a sort of the whole table.
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_created
+            ON artifacts(created_at, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_run_created
+            ON artifacts(run_id, created_at, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_type_created
+            ON artifacts(artifact_type, created_at, id)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_featured
+            ON artifacts(cycle DESC NULLS LAST, created_at DESC) WHERE is_featured
+        """)
+
+        # Migration: has_image generated column (binary, blob-store or legacy
+        # data URI image) so /latest-image reads one partial-index entry.
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS has_image BOOLEAN
+            GENERATED ALWAYS AS (
+                image_data IS NOT NULL OR image_sha256 IS NOT NULL OR COALESCE(image_url, '') <> ''
+            ) STORED
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_has_image
+            ON artifacts(created_at DESC, id DESC) WHERE has_image
+        """)
+
+        # Migration: artifacts.updated_at, bumped by every write to an artifact.
+        # Existing rows start at their created_at.
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ
+        """)
+        conn.execute("""
+            UPDATE artifacts SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP
+        """)
+
+        # Migration: artifacts.change_seq, the commit-ordered counter behind
+        # X-Change-Token (main._stamp_change). updated_at is its writer's
+        # transaction start, so a slow writer could commit behind a token a
+        # poller already holds. Existing rows are numbered in updated_at order.
+        conn.execute("""
+            CREATE SEQUENCE IF NOT EXISTS artifact_change_seq
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS change_seq BIGINT
+        """)
+        conn.execute("""
+            UPDATE artifacts a SET change_seq = o.seq
+            FROM (
+                SELECT id, nextval('artifact_change_seq') AS seq
+                FROM (SELECT id FROM artifacts WHERE change_seq IS NULL ORDER BY updated_at, id) u
+            ) o
+            WHERE a.id = o.id
+        """)
+        conn.execute("""
+            ALTER TABLE artifacts ALTER COLUMN change_seq SET DEFAULT nextval('artifact_change_seq')
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_change
+            ON artifacts(change_seq)
+        """)
+        conn.execute("""
+            DROP INDEX IF EXISTS idx_artifacts_updated
+        """)
+
+        # Migration: full-text search document behind /search. Title weighs
+        # most, then the agent's search queries, body and monologue. Adding
+        # the stored column rewrites the table once.
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS search_tsv tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
+                setweight(to_tsvector('english', COALESCE(search_queries, '')), 'B') ||
+                setweight(to_tsvector('english', COALESCE(body_markdown, '')), 'C') ||
+                setweight(to_tsvector('english', COALESCE(monologue_public, '')), 'D')
+            ) STORED
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_artifacts_search
+            ON artifacts USING GIN (search_tsv)
+        """)
+
+        # Migration: per-run ordinal for O(1) archive deep links (runs.py)
+        conn.execute("""
+            ALTER TABLE artifacts ADD COLUMN IF NOT EXISTS run_position INTEGER
+        """)
+
+        # Run summaries behind /runs, maintained by runs.add_to_run() /
+        # remove_from_run() on publish/delete. Populated (with run_position) from artifacts the
+        # first time it is empty or an artifact is unnumbered.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS runs (
+                run_id VARCHAR NOT NULL,
+                brain VARCHAR NOT NULL DEFAULT '',
+                artifact_count INTEGER NOT NULL DEFAULT 0,
+                started_at TIMESTAMPTZ,
+                last_artifact_at TIMESTAMPTZ,
+                first_cycle INTEGER,
+                last_cycle INTEGER,
+                first_title VARCHAR DEFAULT '',
+                PRIMARY KEY (run_id, brain)
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_runs_started
+            ON runs(started_at DESC)
+        """)
+        needs_rebuild = conn.execute("""
+            SELECT NOT EXISTS (SELECT 1 FROM runs)
+                OR EXISTS (SELECT 1 FROM artifacts WHERE run_position IS NULL AND run_id != '')
+        """).fetchone()[0]
+        if needs_rebuild:
+            rebuild_runs(conn)
+
+        # Counters behind /artifacts/count ('*' = any), maintained by
+        # counts.adjust_counts() on publish/delete. Populated from artifacts
+        # the first time it is empty.
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS artifact_counts (
+                run_id VARCHAR NOT NULL,
+                artifact_type VARCHAR NOT NULL,
+                n BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (run_id, artifact_type)
+            )
+        """)
+        if not conn.execute("SELECT 1 FROM artifact_counts LIMIT 1").fetchone():
+            rebuild_counts(conn)
+
+        # Event ids for the /events SSE stream (events.notify)
+        conn.execute("""
+            CREATE SEQUENCE IF NOT EXISTS analog_event_seq
+        """)
+
         # Daemon live feed — stores recent tick summaries for Analog Home display
         conn.execute("""
             CREATE TABLE IF NOT EXISTS daemon_ticks (
@@ -133,6 +372,41 @@ def init_db() -> None:
             ON daemon_ticks(created_at DESC)
         """)
 
+        # Tick lines live append-only in daemon_tick_lines, so pushing lines
+        # is one upsert + one insert however long the tick already is.
+        # tick_data keeps the per-tick flags (sentry_interval, complete).
+        conn.execute("""
+            DELETE FROM daemon_ticks a USING daemon_ticks b
+            WHERE a.run_id = b.run_id AND a.tick = b.tick AND a.id < b.id
+        """)
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_daemon_ticks_run_tick
+            ON daemon_ticks(run_id, tick)
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS daemon_tick_lines (
+                id BIGSERIAL PRIMARY KEY,
+                tick_id INTEGER NOT NULL REFERENCES daemon_ticks(id) ON DELETE CASCADE,
+                line TEXT NOT NULL
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_daemon_tick_lines_tick
+            ON daemon_tick_lines(tick_id, id)
+        """)
+        # Migration: move lines out of pre-existing tick_data documents.
+        conn.execute("""
+            INSERT INTO daemon_tick_lines (tick_id, line)
+            SELECT t.id, l.line
+            FROM daemon_ticks t,
+                 jsonb_array_elements_text(t.tick_data -> 'lines') WITH ORDINALITY AS l(line, n)
+            WHERE jsonb_typeof(t.tick_data -> 'lines') = 'array'
+            ORDER BY t.id, l.n
+        """)
+        conn.execute("""
+            UPDATE daemon_ticks SET tick_data = tick_data - 'lines' WHERE tick_data ? 'lines'
+        """)
+
         # Ensure exactly one controls row (id=1)
         conn.execute("""
             INSERT INTO controls (id, temperature, vote_1, vote_2, vote_3,
@@ -150,6 +424,21 @@ def get_pool() -> ConnectionPool:
     return _pool
 
 
+async def open_async_pool() -> None:
+    """Open the async connection pool (on the running event loop). Call after init_db()."""
+    global _async_pool
+    _async_pool = AsyncConnectionPool(DATABASE_URL, min_size=DB_ASYNC_POOL_MIN_SIZE, max_size=DB_ASYNC_POOL_MAX_SIZE,
+                                      timeout=DB_POOL_TIMEOUT, max_idle=DB_POOL_MAX_IDLE,
+                                      max_lifetime=DB_POOL_MAX_LIFETIME, open=False)
+    await _async_pool.open()
+
+
+def get_async_pool() -> AsyncConnectionPool:
+    """Return the async connection pool. Must await open_async_pool() first."""
+    assert _async_pool is not None, "Async pool not open — await open_async_pool() first"
+    return _async_pool
+
+
 def close() -> None:
     """Shut down the connection pool."""
     global _pool
@@ -158,6 +447,14 @@ def close() -> None:
         _pool = None
 
 
+async def close_async_pool() -> None:
+    """Shut down the async connection pool."""
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.close()
+        _async_pool = None
+
+
 def effective_temperature(stored_temp: float, temp_set_at, default_temp: float = DEFAULT_TEMPERATURE) -> float:
     """Decay temperature toward default_temp over TEMP_DECAY_HOURS."""
     if temp_set_at is None or stored_temp == default_temp:
@@ -0,0 +1,290 @@
+"""Server-Sent Events for Analog Home API, fed by Postgres LISTEN/NOTIFY.
+
+Writers call notify(conn, type, data) inside their transaction; Postgres
+delivers it to every API process when (and only if) it commits. Each
+process runs one EventBroker listener thread on its own connection
+(outside the pool, since LISTEN holds it). The broker expands each
+notification into a full event with the hydrator registered for its
+type (run once per process, not per client), keeps the last
+EVENT_REPLAY events for Last-Event-ID resume, and fans it out to every
+connected /events client. Types registered with coalesce= (the full
+/state reload behind "state") are hydrated on their own thread at most
+once per window, for the newest notification in it, so a burst of votes
+costs one reload per process rather than one per vote, and never holds
+up other event types.
+
+Event ids come from a database sequence, so they are the same in every
+process and a client can resume against any of them. They are unique
+but neither contiguous (rolled-back writers and cached sequence values
+leave gaps) nor in delivery order (nextval runs before commit, and
+Postgres delivers in commit order), so resume looks the client's last id
+up in the buffer and replays what this process delivered after it. A
+client whose last id is no longer buffered (replay window passed, or
+dropped here), whose queue overflowed, or whose listener reconnected
+gets a "resync" event and should refetch /home.
+
+On Neon, EVENTS_DATABASE_URL must be a direct (non-pooler) endpoint:
+PgBouncer in transaction mode drops LISTEN registrations.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+from collections import deque
+from typing import Callable, Optional
+
+import psycopg
+
+from db import DATABASE_URL
+
+# ---------------------------------------------------------------------------
+# Configurable defaults (override via environment)
+# ---------------------------------------------------------------------------
+EVENTS_CHANNEL = "analog_events"
+EVENTS_DATABASE_URL = os.getenv("EVENTS_DATABASE_URL") or DATABASE_URL
+MAX_SSE_CLIENTS = int(os.getenv("MAX_SSE_CLIENTS", "200"))          # per process
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_RETRY_MS = 3000                     # browser reconnect delay hint
+EVENT_REPLAY = int(os.getenv("EVENT_REPLAY", "256"))
+SSE_CLIENT_QUEUE = 64                   # events buffered per slow client
+EVENT_COALESCE_SECONDS = float(os.getenv("EVENT_COALESCE_MS", "250")) / 1000
+
+RESYNC = (None, "resync", "{}")
+
+
+_NOTIFY_SQL = ("SELECT pg_notify(%s, json_build_object("
+               "'id', nextval('analog_event_seq'), 'type', %s::text, 'data', %s::json)::text)")
+
+
+def notify(conn, event_type: str, data: Optional[dict] = None) -> None:
+    """Queue an event; delivered to every API process when conn commits."""
+    conn.execute(_NOTIFY_SQL, [EVENTS_CHANNEL, event_type, json.dumps(data or {})])
+
+
+async def notify_async(conn, event_type: str, data: Optional[dict] = None) -> None:
+    """notify() for an AsyncConnection."""
+    await conn.execute(_NOTIFY_SQL, [EVENTS_CHANNEL, event_type, json.dumps(data or {})])
+
+
+def format_event(event: tuple) -> str:
+    """Serialize an (id, type, data_json) event as an SSE frame."""
+    event_id, event_type, data = event
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {data}\n\n"
+
+
+class TooManySubscribers(Exception):
+    """Per-process SSE connection cap reached."""
+
+
+class Subscriber:
+    """One /events connection: a bounded queue on its event loop."""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SSE_CLIENT_QUEUE)
+
+    def push(self, event: tuple) -> None:
+        """Thread-safe enqueue from the broker's threads."""
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: tuple) -> None:
+        if self.queue.full():
+            # Too slow to keep up: drop its backlog and make it refetch.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            event = RESYNC
+        self.queue.put_nowait(event)
+
+
+class _Coalescer:
+    """Hydrates one event type on its own thread, at most once per window.
+
+    Notifications arriving while a window is open (or a hydration is
+    running) replace each other; only the newest is dispatched.
+    """
+
+    def __init__(self, broker: "EventBroker", event_type: str, window: float):
+        self.broker = broker
+        self.event_type = event_type
+        self.window = window
+        self._pending: Optional[tuple] = None
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self.coalesced = 0
+
+    def submit(self, event: tuple) -> None:
+        with self._cond:
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = event
+            self._cond.notify()
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"event-{self.event_type}", daemon=True)
+            self._thread.start()
+
+    def join(self) -> None:
+        with self._cond:
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        stop = self.broker._stop
+        while not stop.is_set():
+            with self._cond:
+                while self._pending is None and not stop.is_set():
+                    self._cond.wait()
+            if stop.wait(self.window):
+                return
+            with self._cond:
+                event, self._pending = self._pending, None
+            self.broker._dispatch(event, hydrate=True)
+
+
+class EventBroker:
+    """LISTENs on one connection and fans events out to subscribers."""
+
+    def __init__(self, dsn: str, channel: str = EVENTS_CHANNEL,
+                 max_subscribers: int = MAX_SSE_CLIENTS, replay: int = EVENT_REPLAY):
+        self.dsn = dsn
+        self.channel = channel
+        self.max_subscribers = max_subscribers
+        self._hydrators: dict[str, Callable] = {}
+        self._coalescers: dict[str, _Coalescer] = {}
+        self._subscribers: set[Subscriber] = set()
+        self._recent: deque = deque(maxlen=replay)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.listening = False
+        self.reconnects = 0
+
+    def on(self, event_type: str, hydrate: Callable, coalesce: float = 0) -> None:
+        """Register hydrate(data) -> data for an event type ("resync" too).
+
+        Runs on the listener thread; return None to drop the event. With
+        coalesce=seconds it runs on a thread of its own instead, once per
+        window, for the newest event of the type.
+        """
+        self._hydrators[event_type] = hydrate
+        if coalesce > 0:
+            self._coalescers[event_type] = _Coalescer(self, event_type, coalesce)
+
+    # --- listener -------------------------------------------------------
+    def start(self) -> None:
+        if not self.dsn or self._thread is not None:
+            return
+        self._stop.clear()
+        for coalescer in self._coalescers.values():
+            coalescer.start()
+        self._thread = threading.Thread(target=self._run, name="event-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        for coalescer in self._coalescers.values():
+            coalescer.join()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        backoff = 1.0
+        connected_before = False
+        while not self._stop.is_set():
+            try:
+                with psycopg.connect(self.dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {self.channel}")
+                    self.listening = True
+                    if connected_before:
+                        # Notifications sent while disconnected are lost.
+                        self._dispatch(RESYNC, hydrate=True)
+                    connected_before = True
+                    backoff = 1.0
+                    while not self._stop.is_set():
+                        for n in conn.notifies(timeout=1.0):
+                            self._handle(n.payload)
+            except Exception:
+                pass
+            self.listening = False
+            if not self._stop.is_set():
+                self.reconnects += 1
+                self._stop.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+    def _handle(self, payload: str) -> None:
+        try:
+            msg = json.loads(payload)
+            event = (int(msg["id"]), str(msg["type"]), msg.get("data") or {})
+        except (ValueError, KeyError, TypeError):
+            return
+        coalescer = self._coalescers.get(event[1])
+        if coalescer is not None:
+            coalescer.submit(event)
+        else:
+            self._dispatch(event, hydrate=True)
+
+    def _dispatch(self, event: tuple, hydrate: bool = False) -> None:
+        event_id, event_type, data = event
+        hydrator = self._hydrators.get(event_type) if hydrate else None
+        if hydrator is not None:
+            try:
+                data = hydrator(json.loads(data) if isinstance(data, str) else data)
+            except Exception:
+                data = None if event_type != "resync" else {}
+            if data is None:
+                return
+        event = (event_id, event_type, data if isinstance(data, str) else json.dumps(data, default=str))
+        with self._lock:
+            if event_id is not None:
+                self._recent.append(event)
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.push(event)
+
+    # --- subscribers ----------------------------------------------------
+    def subscribe(self, last_event_id: Optional[int] = None) -> tuple[Subscriber, Optional[list]]:
+        """Register a connection on the running event loop.
+
+        Returns (subscriber, backlog): the events delivered after
+        last_event_id, in delivery order, or None if last_event_id is not
+        in the buffer (the caller should send a resync). Raises
+        TooManySubscribers at the cap.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise TooManySubscribers()
+            sub = Subscriber(loop)
+            self._subscribers.add(sub)
+            if last_event_id is None:
+                return sub, []
+            for i, event in enumerate(self._recent):
+                if event[0] == last_event_id:
+                    return sub, list(itertools.islice(self._recent, i + 1, None))
+            return sub, None
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "listening": self.listening,
+                "subscribers": len(self._subscribers),
+                "max_subscribers": self.max_subscribers,
+                "buffered": len(self._recent),
+                "last_event_id": self._recent[-1][0] if self._recent else None,
+                "reconnects": self.reconnects,
+                "coalesced": {t: c.coalesced for t, c in self._coalescers.items()},
+            }
+
+
+event_broker = EventBroker(EVENTS_DATABASE_URL)
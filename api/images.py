@@ -0,0 +1,373 @@
+"""Image tier rendering for Analog Home API.
+
+Variants (thumb/medium/full in JPEG and WebP) are rendered once when an
+artifact is published and stored in the artifact_image_variants table, so
+the image endpoint only has to fetch bytes. The request path falls back to
+rendering on a variant miss (rows published before variants existed, ?w=
+width buckets, and AVIF, which is too slow to encode on every publish).
+
+All PIL work runs in a small process pool (render_pool) so resizing never
+holds the GIL or an API worker thread's CPU while JSON endpoints wait.
+"""
+
+import base64
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+from storage import prepare_blob
+
+# ---------------------------------------------------------------------------
+# Configurable defaults (override via environment)
+# ---------------------------------------------------------------------------
+IMAGE_RENDER_WORKERS = int(os.getenv("IMAGE_RENDER_WORKERS", "2"))
+IMAGE_RENDER_MAX_PENDING = int(os.getenv("IMAGE_RENDER_MAX_PENDING", "16"))
+IMAGE_RENDER_RETRY_AFTER = int(os.getenv("IMAGE_RENDER_RETRY_AFTER", "2"))  # seconds
+IMAGE_STREAM_CHUNK_BYTES = int(os.getenv("IMAGE_STREAM_CHUNK_KB", "256")) * 1024
+MAX_IMAGE_UPLOAD_BYTES = int(float(os.getenv("MAX_IMAGE_UPLOAD_MB", "5")) * 1024 * 1024)
+
+# Longest-side targets for the named tiers. Full = original dimensions,
+# re-encoded (optimized/progressive) rather than resized.
+IMAGE_SIZES = {
+    "thumb": 400,
+    "medium": 800,
+    "full": None,
+}
+
+# ?w= requests snap up to one of these widths (for srcset), so the set of
+# variants per artifact stays small and cacheable.
+WIDTH_BUCKETS = (320, 480, 640, 800, 1024, 1280, 1600)
+
+FORMAT_MIMES = {
+    "avif": "image/avif",
+    "webp": "image/webp",
+    "jpeg": "image/jpeg",
+}
+
+Image.init()
+AVIF_SUPPORTED = "AVIF" in Image.SAVE
+
+# Output formats in order of preference for content negotiation.
+OUTPUT_FORMATS = ("avif", "webp", "jpeg") if AVIF_SUPPORTED else ("webp", "jpeg")
+
+# Gallery contact sheets: tiles per row, and the allowed cell sizes (?tile=
+# snaps up to one, capped by the thumb tier the tiles are cut from).
+SPRITE_COLUMNS = 6
+SPRITE_TILE_SIZES = (100, 150, 200, 300, 400)
+
+# Longest side of the inline blur-up placeholder stored with each artifact.
+PLACEHOLDER_DIM = 16
+
+# (tier, format) pairs pre-rendered at publish time. Publish renders skip
+# the render pool's queue limit, so they stay cheap: AVIF tiers and width
+# buckets are rendered on first request (bounded) and persisted the same way.
+PUBLISH_FORMATS = ("webp", "jpeg")
+PUBLISH_VARIANTS = tuple((tier, fmt) for tier in IMAGE_SIZES for fmt in PUBLISH_FORMATS)
+
+
+def decode_legacy_data_uri(data_uri: str) -> tuple[bytes, str]:
+    """Decode a data: URI string into (bytes, mime). Returns (b'', '') on failure."""
+    if not data_uri or not data_uri.startswith("data:"):
+        return b"", ""
+    try:
+        header, b64 = data_uri.split(",", 1)
+        # header looks like "data:image/jpeg;base64"
+        mime = header[5:].split(";", 1)[0] or "image/jpeg"
+        return base64.b64decode(b64), mime
+    except Exception:
+        return b"", ""
+
+
+def snap_width(width: int, buckets: tuple[int, ...] = WIDTH_BUCKETS) -> int:
+    """Round a requested width up to the nearest bucket (capped at the largest)."""
+    for bucket in buckets:
+        if width <= bucket:
+            return bucket
+    return buckets[-1]
+
+
+def negotiate_format(accept: str) -> str:
+    """Pick the best output format the client accepts (JPEG if nothing better)."""
+    accepted = set()
+    for part in (accept or "").lower().split(","):
+        media, _, params = part.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            accepted.add(media.strip())
+    for fmt in OUTPUT_FORMATS:
+        if FORMAT_MIMES[fmt] in accepted:
+            return fmt
+    return "jpeg"
+
+
+def variant_key(tier: str, fmt: str) -> str:
+    """Key in artifact_image_variants.size: "thumb", "medium.webp", "w640.avif".
+
+    JPEG keeps the bare tier name so rows written before format
+    negotiation existed stay valid.
+    """
+    return tier if fmt == "jpeg" else f"{tier}.{fmt}"
+
+
+def _tier_box(tier: str) -> tuple[int, int] | None:
+    """Bounding box for a tier: square for named tiers, width-only for w<N>."""
+    if tier in IMAGE_SIZES:
+        dim = IMAGE_SIZES[tier]
+        return (dim, dim) if dim is not None else None
+    return (int(tier[1:]), 1_000_000)
+
+
+def render_variant(raw_bytes: bytes, tier: str, fmt: str = "jpeg") -> tuple[bytes, str]:
+    """Render an original at a tier ("thumb", "medium", "full" or "w<N>") in fmt.
+
+    Returns (bytes, mime). For "full", the original is returned untouched
+    when it is already in fmt and re-encoding would not make it smaller.
+    Raises on undecodable input; callers decide whether that is a 400/500
+    or just a skipped variant.
+    """
+    img = Image.open(io.BytesIO(raw_bytes))
+    source_format = (img.format or "").lower()
+    if fmt == "jpeg":
+        # Convert palette/RGBA to RGB so JPEG re-encode is safe.
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+    elif img.mode not in ("RGB", "RGBA", "L"):
+        img = img.convert("RGBA" if "A" in img.getbands() or "transparency" in img.info else "RGB")
+
+    box = _tier_box(tier)
+    if box is not None:
+        img.thumbnail(box, Image.LANCZOS)
+
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        img.save(buf, format="JPEG", quality=85, optimize=True, progressive=True)
+    elif fmt == "webp":
+        img.save(buf, format="WEBP", quality=80, method=6)
+    else:
+        img.save(buf, format="AVIF", quality=60)
+    data = buf.getvalue()
+
+    if box is None and source_format == fmt and len(data) >= len(raw_bytes):
+        return raw_bytes, FORMAT_MIMES[fmt]
+    return data, FORMAT_MIMES[fmt]
+
+
+def render_variants(raw_bytes: bytes) -> dict[str, tuple[bytes, str]]:
+    """Render every publish-time variant for an original. Empty dict if undecodable."""
+    try:
+        return {variant_key(tier, fmt): render_variant(raw_bytes, tier, fmt)
+                for tier, fmt in PUBLISH_VARIANTS}
+    except Exception:
+        return {}
+
+
+def analyze_image(raw_bytes: bytes) -> dict:
+    """Extract layout/placeholder metadata from an original. Empty dict if undecodable.
+
+    Keys match the artifacts image_* columns: width, height, size, mime,
+    placeholder (a ~16px WebP data URI to blur up while the real tier
+    loads) and color (dominant colour as #rrggbb).
+    """
+    try:
+        img = Image.open(io.BytesIO(raw_bytes))
+        width, height = img.size
+        mime = Image.MIME.get(img.format or "", "")
+        rgb = img.convert("RGB")
+
+        small = rgb.copy()
+        small.thumbnail((PLACEHOLDER_DIM, PLACEHOLDER_DIM), Image.LANCZOS)
+        buf = io.BytesIO()
+        small.save(buf, format="WEBP", quality=30)
+        placeholder = "data:image/webp;base64," + base64.b64encode(buf.getvalue()).decode("ascii")
+
+        # Dominant colour: most common entry of a 5-colour palette of a
+        # downscaled copy (cheap, and ignores single-pixel noise).
+        sample = rgb.copy()
+        sample.thumbnail((64, 64))
+        quantized = sample.quantize(colors=5)
+        _, index = max(quantized.getcolors())
+        r, g, b = quantized.getpalette()[index * 3:index * 3 + 3]
+    except Exception:
+        return {}
+    return {
+        "width": width,
+        "height": height,
+        "size": len(raw_bytes),
+        "mime": mime,
+        "placeholder": placeholder,
+        "color": f"#{r:02x}{g:02x}{b:02x}",
+    }
+
+
+def render_publish(raw_bytes: bytes) -> tuple[dict[str, tuple[bytes, str]], dict]:
+    """All publish-time work for an original in one worker round trip:
+    (render_variants(raw), analyze_image(raw))."""
+    return render_variants(raw_bytes), analyze_image(raw_bytes)
+
+
+def fit_within(width: int | None, height: int | None, box: int) -> tuple[int, int]:
+    """Dimensions of a width x height image scaled to fit a box x box square.
+
+    Unknown dimensions (rows without metadata) are treated as square.
+    """
+    if not width or not height:
+        return box, box
+    scale = min(box / width, box / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def sprite_layout(dims: list[tuple[int | None, int | None]], tile: int) -> tuple[int, int, list[tuple[int, int, int, int]]]:
+    """Lay tiles out row-major in SPRITE_COLUMNS columns of tile x tile cells.
+
+    Returns (sheet_width, sheet_height, [(x, y, w, h), ...]) with each
+    image fitted inside its cell at the cell's top-left corner.
+    """
+    columns = max(1, min(SPRITE_COLUMNS, len(dims)))
+    rows = max(1, -(-len(dims) // columns))
+    rects = []
+    for i, (width, height) in enumerate(dims):
+        w, h = fit_within(width, height, tile)
+        rects.append(((i % columns) * tile, (i // columns) * tile, w, h))
+    return columns * tile, rows * tile, rects
+
+
+def render_sprite(sources: list[bytes], rects: list[tuple[int, int, int, int]],
+                  sheet_size: tuple[int, int], fmt: str = "jpeg") -> tuple[bytes, str]:
+    """Paste each source image into its rect on one sheet. Returns (bytes, mime).
+
+    Undecodable sources leave their cell blank rather than failing the sheet.
+    """
+    sheet = Image.new("RGB", sheet_size, (0, 0, 0))
+    for data, (x, y, w, h) in zip(sources, rects):
+        if not data:
+            continue
+        try:
+            img = Image.open(io.BytesIO(data)).convert("RGB")
+        except Exception:
+            continue
+        sheet.paste(img.resize((w, h), Image.LANCZOS), (x, y))
+    buf = io.BytesIO()
+    if fmt == "jpeg":
+        sheet.save(buf, format="JPEG", quality=82, optimize=True, progressive=True)
+    elif fmt == "webp":
+        sheet.save(buf, format="WEBP", quality=78, method=6)
+    else:
+        sheet.save(buf, format="AVIF", quality=55)
+    return buf.getvalue(), FORMAT_MIMES[fmt]
+
+
+_UPSERT_VARIANT_SQL = """
+  INSERT INTO artifact_image_variants (artifact_id, size, image_data, image_mime, sha256, byte_size)
+  VALUES (%s, %s, %s, %s, %s, %s)
+  ON CONFLICT (artifact_id, size) DO UPDATE SET
+    image_data=EXCLUDED.image_data, image_mime=EXCLUDED.image_mime,
+    sha256=EXCLUDED.sha256, byte_size=EXCLUDED.byte_size,
+    created_at=CURRENT_TIMESTAMP
+"""
+
+
+def store_variant(conn, artifact_id: int, key: str, data: bytes, mime: str) -> None:
+    """Upsert one rendered variant under its variant_key (caller commits).
+
+    The bytes go to the configured image store (see storage.prepare_blob).
+    """
+    image_data, digest, size = prepare_blob(data)
+    conn.execute(_UPSERT_VARIANT_SQL, [artifact_id, key, image_data, mime, digest, size])
+
+
+def store_variants(conn, artifact_id: int, variants: dict[str, tuple[bytes, str]]) -> None:
+    """Replace all stored variants for an artifact (caller commits)."""
+    conn.execute("DELETE FROM artifact_image_variants WHERE artifact_id = %s", [artifact_id])
+    for key, (data, mime) in variants.items():
+        store_variant(conn, artifact_id, key, data, mime)
+
+
+def prepare_variants(variants: dict[str, tuple[bytes, str]]) -> list[tuple]:
+    """prepare_blob() every variant: [(key, column value, mime, sha256, size)].
+
+    Blocking (IMAGE_STORE=fs writes files); run it off the event loop.
+    """
+    rows = []
+    for key, (data, mime) in variants.items():
+        image_data, digest, size = prepare_blob(data)
+        rows.append((key, image_data, mime, digest, size))
+    return rows
+
+
+async def store_variants_async(conn, artifact_id: int, prepared: list[tuple]) -> None:
+    """store_variants() for an AsyncConnection, from prepare_variants() rows."""
+    await conn.execute("DELETE FROM artifact_image_variants WHERE artifact_id = %s", [artifact_id])
+    for key, image_data, mime, digest, size in prepared:
+        await conn.execute(_UPSERT_VARIANT_SQL, [artifact_id, key, image_data, mime, digest, size])
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the render pool already has max_pending jobs queued."""
+
+
+class RenderPool:
+    """Bounded process pool for PIL work.
+
+    run() blocks the calling thread on the result, but the CPU work happens
+    in a child process, so the GIL stays free for other handlers. When
+    max_pending jobs are already queued or running, bounded callers get
+    RenderPoolBusy instead of queueing behind them.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def run(self, fn, *args, bounded: bool = True):
+        """Run fn(*args) in a worker process and return its result.
+
+        bounded=False skips the queue limit (used by /publish, whose agent
+        traffic is low-volume and must not be turned away).
+        """
+        with self._lock:
+            if bounded and self._pending >= self.max_pending:
+                raise RenderPoolBusy()
+            if self._executor is None:
+                # spawn, not fork: the parent holds psycopg pool threads.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            executor = self._executor
+            self._pending += 1
+        try:
+            return executor.submit(fn, *args).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge image); start fresh next time.
+            with self._lock:
+                if self._executor is executor:
+                    self._executor = None
+            executor.shutdown(wait=False)
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+render_pool = RenderPool(IMAGE_RENDER_WORKERS, IMAGE_RENDER_MAX_PENDING)
@@ -0,0 +1,34 @@
+"""JSON rendering for Analog Home API.
+
+FastJSONResponse is the app's default response class. Hot list
+endpoints also return it directly, which skips FastAPI's
+jsonable_encoder pass (most of the serialization cost for a page of
+artifacts); their payloads are already plain JSON types. orjson is used
+when installed, the stdlib json module otherwise.
+"""
+
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # optional: pip install orjson
+    orjson = None
+
+
+def dumps(content: Any, sort_keys: bool = False) -> bytes:
+    """Compact UTF-8 JSON; unknown types (datetimes, Decimals) become str."""
+    if orjson is not None:
+        # Datetimes go through default=str like json.dumps, so timestamps
+        # keep the "YYYY-MM-DD HH:MM:SS+00:00" form the API has always used.
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(content, default=str, option=option)
+    return json.dumps(content, sort_keys=sort_keys, default=str, ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,76 @@
+"""Load-test /vote and check the tallies stay exact.
+
+Fires --votes votes at a running API from --concurrency concurrent
+clients, each vote from its own X-Forwarded-For address so the per-IP
+cap never trips, then prints throughput and latency and compares the
+/audience total_votes delta with the number of votes accepted.
+
+Run it against a local or staging database: the votes are real and
+stay in the current trajectory cycle.
+
+Usage:
+    python load_test_votes.py --url http://localhost:8000
+    ... python load_test_votes.py --votes 10000 --concurrency 200
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+
+async def _vote(client: httpx.AsyncClient, n: int, latencies: list[float], statuses: dict) -> None:
+    ip = f"10.{(n >> 16) & 255}.{(n >> 8) & 255}.{n & 255}"
+    started = time.perf_counter()
+    try:
+        resp = await client.post("/vote", json={"choice": str(n % 3 + 1)}, headers={"X-Forwarded-For": ip})
+        status = resp.status_code
+    except httpx.TransportError:
+        status = "error"
+    latencies.append(time.perf_counter() - started)
+    statuses[status] = statuses.get(status, 0) + 1
+
+
+async def run(url: str, votes: int, concurrency: int) -> int:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url.rstrip("/"), limits=limits, timeout=60) as client:
+        before = (await client.get("/audience")).json()["total_votes"]
+        latencies: list[float] = []
+        statuses: dict = {}
+        queue = iter(range(votes))
+
+        async def worker():
+            for n in queue:
+                await _vote(client, n, latencies, statuses)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        after = (await client.get("/audience")).json()["total_votes"]
+
+    accepted = statuses.get(200, 0)
+    latencies.sort()
+    pct = lambda p: 1000 * latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+    print(f"{votes} votes, {concurrency} concurrent: {elapsed:.2f}s, {accepted / elapsed:.0f} votes/s")
+    print(f"latency ms: p50 {pct(0.5):.1f}  p95 {pct(0.95):.1f}  p99 {pct(0.99):.1f}  "
+          f"mean {1000 * statistics.fmean(latencies):.1f}")
+    print(f"responses: {statuses}")
+    exact = after - before == accepted
+    print(f"total_votes {before} -> {after} (+{after - before}), accepted {accepted}: "
+          f"{'exact' if exact else 'MISMATCH'}")
+    return 0 if exact else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--votes", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    return asyncio.run(run(args.url, args.votes, args.concurrency))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,15 +1,42 @@
+import asyncio
 import base64
-import io
+import datetime
+import functools
+import hashlib
+import html
 import json
+import logging
 import time
+from concurrent.futures.process import BrokenProcessPool
 from typing import List, Optional
 from fastapi import FastAPI, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from PIL import Image
+from fastapi.responses import StreamingResponse
+from psycopg.rows import dict_row
+from psycopg_pool import PoolTimeout
+from starlette.concurrency import run_in_threadpool
 
-from db import init_db, get_pool, close, effective_temperature, MAX_SEEDS_RETURNED, MAX_SEEDS, MAX_VOTES_PER_IP
+from db import (init_db, get_pool, close, open_async_pool, get_async_pool, close_async_pool, effective_temperature,
+                MAX_SEEDS_RETURNED, MAX_SEEDS, MAX_VOTES_PER_IP, TEMP_DECAY_HOURS)
 from models import ArtifactOut, VoteRequest, SeedRequest, SetTrajectoryRequest, StateOut
-from pydantic import BaseModel, Field
+from cache import SingleFlight, home_snapshot, image_cache, state_snapshot
+from counts import get_count, move_counts, move_counts_async
+from events import (EVENT_COALESCE_SECONDS, RESYNC, SSE_HEARTBEAT_SECONDS, SSE_RETRY_MS, TooManySubscribers, event_broker,
+                    format_event, notify, notify_async)
+from middleware import ETagMiddleware, GzipRequestMiddleware
+from json_response import FastJSONResponse, dumps
+from runs import add_to_run_async, lock_artifact, lock_artifact_async, refresh_runs_async, remove_from_run
+from ticks import FeedBacklogged, tick_feed
+from votes import CAST_VOTE_SQL, RESET_SQL, TALLY_COLUMNS, TALLY_JOIN, vote_folder
+from storage import blob_store, load_blob, prepare_blob
+from images import (IMAGE_SIZES, IMAGE_RENDER_RETRY_AFTER, IMAGE_STREAM_CHUNK_BYTES, MAX_IMAGE_UPLOAD_BYTES, RenderPoolBusy, decode_legacy_data_uri,
+                    SPRITE_TILE_SIZES, negotiate_format, prepare_variants, render_pool, render_publish, render_sprite,
+                    render_variant, snap_width, sprite_layout, store_variant, store_variants, store_variants_async,
+                    variant_key)
+from pydantic import BaseModel, Field, ValidationError
+
+
+log = logging.getLogger(__name__)
 
 
 class DaemonTickRequest(BaseModel):
@@ -46,7 +73,7 @@ class PublishRequest(BaseModel):
     image_mime: str = Field(default="image/jpeg", max_length=32)
 
 
-app = FastAPI(title="Analog I API")
+app = FastAPI(title="Analog I API", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -63,16 +90,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Prev-Cursor", "X-Change-Token", "Retry-After"],
 )
 
+# Agent clients may gzip large JSON bodies (see analog_client).
+app.add_middleware(GzipRequestMiddleware)
+# Strong ETag + If-None-Match -> 304 on every JSON GET, so an unchanged
+# poll is a header exchange.
+app.add_middleware(ETagMiddleware)
+
+
+@app.exception_handler(PoolTimeout)
+async def _pool_timeout(request: Request, exc: PoolTimeout):
+    # Every connection stayed busy for DB_POOL_TIMEOUT: shed load with a
+    # retryable 503 instead of a 500.
+    return FastJSONResponse({"detail": "database busy"}, status_code=503, headers={"Retry-After": "1"})
+
 
 @app.on_event("startup")
 def _startup():
     init_db()
+    tick_feed.load()
+    tick_feed.start()
+    event_broker.start()
+
+
+@app.on_event("startup")
+async def _startup_async():
+    await open_async_pool()
+    vote_folder.start()
+
+
+@app.on_event("shutdown")
+async def _shutdown_async():
+    await vote_folder.stop()
+    await close_async_pool()
 
 
 @app.on_event("shutdown")
 def _shutdown():
+    tick_feed.stop()
+    event_broker.stop()
+    render_pool.shutdown()
     close()
 
 
@@ -84,144 +143,473 @@ def healthz():
     return {"ok": True}
 
 
-_ART_COLS = """id, created_at, brain, cycle, artifact_type,
-             title, body_markdown, monologue_public,
-             channel, source_platform, source_id, source_parent_id, source_url,
-             search_queries, temperature, run_id, image_url,
-             (image_data IS NOT NULL) AS has_binary_image"""
+@app.get("/cache/stats")
+def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process caches (this process only)."""
+    return {"images": image_cache.stats(), "state": state_snapshot.stats(), "home": home_snapshot.stats(),
+            "events": event_broker.stats(), "daemon_feed": tick_feed.stats(),
+            "vote_folds": vote_folder.stats()}
+
+
+# Artifact fields the API returns -> the columns each is built from, so a
+# fields= projection selects only what it needs. has_image is the stored
+# generated column; has_binary_image is computed below.
+_ART_FIELD_COLUMNS = {
+    "id": ("id",),
+    "created_at": ("created_at",),
+    "brain": ("brain",),
+    "cycle": ("cycle",),
+    "artifact_type": ("artifact_type",),
+    "title": ("title",),
+    "body_markdown": ("body_markdown",),
+    "monologue_public": ("monologue_public",),
+    "channel": ("channel",),
+    "source_platform": ("source_platform",),
+    "source_id": ("source_id",),
+    "source_parent_id": ("source_parent_id",),
+    "source_url": ("source_url",),
+    "search_queries": ("search_queries",),
+    "temperature": ("temperature",),
+    "run_id": ("run_id",),
+    "image_url": ("image_url", "has_binary_image"),
+    "has_image": ("has_image",),
+    "image_width": ("image_width",),
+    "image_height": ("image_height",),
+    "image_size": ("image_size",),
+    "image_mime": ("image_mime", "has_image"),
+    "image_placeholder": ("image_placeholder",),
+    "image_color": ("image_color",),
+    "updated_at": ("updated_at",),
+}
+_ART_COLUMN_SQL = {
+    "has_binary_image": "(image_data IS NOT NULL OR image_sha256 IS NOT NULL) AS has_binary_image",
+}
+# Always selected and returned: cursors, change tokens and client-side
+# merges key on them.
+_ART_KEY_FIELDS = ("id", "created_at", "updated_at")
+_PREVIEW_FIELDS = ("body_markdown", "monologue_public")
 
 
-def _read_state(conn):
-    ctrl = conn.execute("""
-      SELECT temperature, temp_set_at, vote_1, vote_2, vote_3,
-             vote_label_1, vote_label_2, vote_label_3, updated_at,
-             trajectory_reason, default_temperature, tagline
-      FROM controls WHERE id=1
-    """).fetchone()
-
-    art = conn.execute(f"""
-      SELECT {_ART_COLS}
-      FROM artifacts
-      ORDER BY created_at DESC
-      LIMIT 1
-    """).fetchone()
-
-    seeds_rows = conn.execute("""
-      SELECT id, text, created_at FROM seeds
-      ORDER BY created_at ASC LIMIT %s
-    """, [MAX_SEEDS_RETURNED]).fetchall()
-
-    default_temp = float(ctrl[10]) if ctrl[10] is not None else 0.7
+def _art_columns(fields: Optional[tuple] = None, slim: bool = False, preview: Optional[int] = None) -> str:
+    """SELECT list for _art_row_to_dict (all fields unless projected).
+
+    slim skips the legacy data-URI image_url column, which can be
+    hundreds of KB; preview=N reads only the first N characters of the
+    body and monologue.
+    """
+    columns = {}
+    for field in _ART_KEY_FIELDS + (fields or tuple(_ART_FIELD_COLUMNS)):
+        for col in _ART_FIELD_COLUMNS[field]:
+            if col == "image_url" and slim:
+                continue
+            if preview is not None and col in _PREVIEW_FIELDS:
+                columns[col] = f"LEFT({col}, {int(preview)}) AS {col}, char_length({col}) > {int(preview)} AS {col}_truncated"
+            else:
+                columns[col] = _ART_COLUMN_SQL.get(col, col)
+    return ", ".join(columns.values())
+
+
+_ART_COLS = _art_columns()
+
+
+def _parse_fields(raw: Optional[str]) -> Optional[tuple]:
+    """?fields=id,title,... -> tuple of artifact field names (None = all)."""
+    if not raw:
+        return None
+    fields = tuple(dict.fromkeys(f.strip() for f in raw.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in _ART_FIELD_COLUMNS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(unknown)}")
+    return fields or None
+
+
+def _fetch_dicts(conn, query: str, params=None) -> list[dict]:
+    return conn.cursor(row_factory=dict_row).execute(query, params).fetchall()
+
+
+# Reads shared by sync and async handlers are written once as a plan,
+# (sql, params, finish): _run() / _run_async() fetch dict rows and
+# return finish(rows).
+def _run(conn, plan: tuple):
+    sql, params, finish = plan
+    return finish(_fetch_dicts(conn, sql, params))
+
+
+async def _run_async(conn, plan: tuple):
+    sql, params, finish = plan
+    cur = conn.cursor(row_factory=dict_row)
+    await cur.execute(sql, params)
+    return finish(await cur.fetchall())
+
+
+def _state_plans() -> list[tuple]:
+    """The /state reads: controls row, latest artifact, oldest seeds."""
+    return [
+        (f"""
+          SELECT c.temperature, c.temp_set_at, {TALLY_COLUMNS},
+                 c.vote_label_1, c.vote_label_2, c.vote_label_3,
+                 c.trajectory_reason, c.default_temperature, c.tagline
+          FROM controls c {TALLY_JOIN} WHERE c.id=1
+        """, None, lambda rows: rows[0]),
+        (f"""
+          SELECT {_ART_COLS}
+          FROM artifacts
+          ORDER BY created_at DESC
+          LIMIT 1
+        """, None, lambda rows: _art_row_to_dict(rows[0]) if rows else None),
+        ("""
+          SELECT id, text, created_at FROM seeds
+          ORDER BY created_at ASC LIMIT %s
+        """, [MAX_SEEDS_RETURNED],
+         lambda rows: [{"id": int(r["id"]), "text": r["text"] or "", "created_at": str(r["created_at"])} for r in rows]),
+    ]
+
+
+def _load_state(conn) -> tuple[dict, tuple]:
+    """Query the /state payload minus the time-dependent temperature.
+
+    Returns (state, (stored_temp, temp_set_at, default_temp)); the
+    snapshot cache keeps this pair and _finish_state() applies the decay
+    on every read.
+    """
+    return _build_state(*(_run(conn, plan) for plan in _state_plans()))
+
+
+async def _load_state_async(conn) -> tuple[dict, tuple]:
+    """_load_state() on an AsyncConnection."""
+    return _build_state(*[await _run_async(conn, plan) for plan in _state_plans()])
+
+
+def _build_state(ctrl: dict, artifact: Optional[dict], seeds: list[dict]) -> tuple[dict, tuple]:
+    default_temp = float(ctrl["default_temperature"]) if ctrl["default_temperature"] is not None else 0.7
 
     controls = {
-        "temperature": effective_temperature(float(ctrl[0]), ctrl[1], default_temp),
         "default_temperature": default_temp,
-        "vote_1": int(ctrl[2]),
-        "vote_2": int(ctrl[3]),
-        "vote_3": int(ctrl[4]),
-        "vote_label_1": ctrl[5] or "",
-        "vote_label_2": ctrl[6] or "",
-        "vote_label_3": ctrl[7] or "",
-        "updated_at": str(ctrl[8]),
-        "trajectory_reason": ctrl[9] or "",
-        "tagline": ctrl[11] or "" if len(ctrl) > 11 else "",
+        "vote_1": int(ctrl["vote_1"]),
+        "vote_2": int(ctrl["vote_2"]),
+        "vote_3": int(ctrl["vote_3"]),
+        "vote_label_1": ctrl["vote_label_1"] or "",
+        "vote_label_2": ctrl["vote_label_2"] or "",
+        "vote_label_3": ctrl["vote_label_3"] or "",
+        "updated_at": str(ctrl["updated_at"]),
+        "trajectory_reason": ctrl["trajectory_reason"] or "",
+        "tagline": ctrl["tagline"] or "",
     }
 
-    artifact = None
-    if art:
-        artifact = _art_row_to_dict(art)
+    state = {"artifact": artifact, "controls": controls, "seeds": seeds}
+    return state, (float(ctrl["temperature"]), ctrl["temp_set_at"], default_temp)
 
-    seeds = [{"id": int(r[0]), "text": r[1] or "", "created_at": str(r[2])} for r in seeds_rows]
 
-    return {"artifact": artifact, "controls": controls, "seeds": seeds}
+def _finish_state(snapshot: tuple[dict, tuple]) -> dict:
+    state, (stored_temp, temp_set_at, default_temp) = snapshot
+    controls = dict(state["controls"], temperature=effective_temperature(stored_temp, temp_set_at, default_temp))
+    return {**state, "controls": controls}
 
 
-@app.get("/state", response_model=StateOut)
-def get_state():
+def _read_state(conn):
+    return _finish_state(_load_state(conn))
+
+
+def _load_state_snapshot() -> tuple[dict, tuple]:
     with get_pool().connection() as conn:
-        return _read_state(conn)
+        return _load_state(conn)
+
+
+async def _load_state_snapshot_async() -> tuple[dict, tuple]:
+    async with get_async_pool().connection() as conn:
+        return await _load_state_async(conn)
+
 
+@app.get("/state", response_model=StateOut)
+async def get_state():
+    """Served from an in-process snapshot; every mutating handler bumps
+    state_snapshot after commit, and STATE_CACHE_TTL bounds staleness for
+    writes made by other processes. Reloads run on the AsyncConnectionPool."""
+    return _finish_state(await state_snapshot.get_async(_load_state_snapshot_async))
+
+
+HOME_SECTIONS = ("state", "runs", "featured", "artifacts", "latest_image")
+HOME_ARTIFACT_LIMIT = 25
+
+
+def _section_version(data) -> str:
+    """Short content hash of a JSON section; equal data -> equal version."""
+    return hashlib.sha1(dumps(data, sort_keys=True)).hexdigest()[:16]
+
+
+async def _load_home_sections_async() -> dict:
+    """Everything on the home page except /state, over one pooled connection.
+
+    Returns {section: (version, data)}. Cached in home_snapshot, which
+    handlers bump whenever artifacts, runs or the featured list change.
+    """
+    async with get_async_pool().connection() as conn:
+        runs = await _run_async(conn, _RUNS_PLAN)
+        latest_run_id = runs[0]["run_id"] if runs else None
+        sections = {
+            "runs": runs,
+            "featured": await _run_async(conn, _featured_plan(slim=True)),
+            "artifacts": await _run_async(conn, _artifacts_plan(limit=HOME_ARTIFACT_LIMIT, run_id=latest_run_id)),
+            "latest_image": await _run_async(conn, _LATEST_IMAGE_PLAN),
+        }
+    return {name: (_section_version(data), data) for name, data in sections.items()}
 
-def _art_row_to_dict(row, slim: bool = False) -> dict:
-    artifact_id = int(row[0])
-    legacy_image_url = row[16] or "" if len(row) > 16 else ""
-    has_binary_image = bool(row[17]) if len(row) > 17 else False
+
+def _home_state(snapshot: tuple[dict, tuple]) -> tuple[str, dict]:
+    """The /home state section as (version, data).
+
+    The version hashes the snapshot (payload plus stored temperature,
+    temp_set_at and default temperature), not the decayed temperature,
+    so it only changes when something is written. controls also carries
+    stored_temperature, temp_set_at and temp_decay_hours so clients can
+    decay the temperature themselves (db.effective_temperature).
+    """
+    state, (stored_temp, temp_set_at, default_temp) = snapshot
+    data = _finish_state(snapshot)
+    data["controls"].update(stored_temperature=stored_temp, temp_decay_hours=TEMP_DECAY_HOURS,
+                            temp_set_at=str(temp_set_at) if temp_set_at is not None else None)
+    return _section_version([state, stored_temp, temp_set_at, default_temp]), data
+
+
+def _parse_versions(raw: str) -> dict:
+    """Parse ?versions=state:abc,runs:def into {section: version}."""
+    seen = {}
+    for part in raw.split(","):
+        name, _, version = part.partition(":")
+        if name.strip() in HOME_SECTIONS and version.strip():
+            seen[name.strip()] = version.strip()
+    return seen
+
+
+@app.get("/home")
+async def get_home(request: Request, versions: str = Query(default="")):
+    """Aggregated home-page bootstrap: state, runs, featured, latest-run
+    artifacts and latest image in one response.
+
+    Each section carries a content version. Pass the last-seen versions
+    back as ?versions=state:<v>,runs:<v>,... and matching sections come
+    back as "unchanged" instead of their data. The ETag covers every
+    section, so If-None-Match with an unchanged page returns 304. The
+    state version ignores the temperature decay (see _home_state). Both
+    snapshots reload on the AsyncConnectionPool, like /state.
+    """
+    state = _home_state(await state_snapshot.get_async(_load_state_snapshot_async))
+    sections = {"state": state, **await home_snapshot.get_async(_load_home_sections_async)}
+    section_versions = {name: sections[name][0] for name in HOME_SECTIONS}
+    etag = f'"home-{_section_version(section_versions)}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    seen = _parse_versions(versions)
+    body = {"versions": section_versions}
+    for name in HOME_SECTIONS:
+        version, data = sections[name]
+        body[name] = "unchanged" if seen.get(name) == version else data
+    return FastJSONResponse(body, headers=headers)
+
+
+def _art_row_to_dict(row: dict, slim: bool = False, fields: Optional[tuple] = None) -> dict:
+    """API dict for an artifacts row fetched with dict_row and _art_columns().
+
+    Fields whose columns weren't selected come back empty; pass the same
+    fields= to drop them.
+    """
+    artifact_id = row["id"]
 
     # Resolve image_url:
     #   - New artifacts (image_data BYTEA): point at the medium-size endpoint URL.
     #     Returned as /api/proxy/... so the Next.js rewrite hits the backend
     #     and the browser caches the response across 8s polls.
-    #   - Legacy artifacts (image_url data URI): pass through as-is for backward compat.
-    if has_binary_image:
-        resolved_image_url = f"/api/proxy/artifacts/{artifact_id}/image/medium"
+    #   - Legacy artifacts (image_url data URI): pass through as-is for backward
+    #     compat, except when slim.
+    if row.get("has_binary_image"):
+        image_url = f"/api/proxy/artifacts/{artifact_id}/image/medium"
     else:
-        resolved_image_url = legacy_image_url
-
-    has_image = has_binary_image or bool(legacy_image_url)
+        image_url = "" if slim else row.get("image_url") or ""
+    has_image = bool(row.get("has_image"))
+    temperature = row.get("temperature")
+    updated_at = row.get("updated_at")
 
     d = {
         "id": artifact_id,
-        "created_at": str(row[1]),
-        "brain": row[2] or "",
-        "cycle": row[3],
-        "artifact_type": row[4] or "",
-        "title": row[5] or "",
-        "body_markdown": row[6] or "",
-        "monologue_public": row[7] or "",
-        "channel": row[8] or "",
-        "source_platform": row[9] or "",
-        "source_id": row[10] or "",
-        "source_parent_id": row[11] or "",
-        "source_url": row[12] or "",
-        "search_queries": row[13] or "" if len(row) > 13 else "",
-        "temperature": float(row[14]) if len(row) > 14 and row[14] is not None else None,
-        "run_id": row[15] or "" if len(row) > 15 else "",
-        # When slim, drop legacy data URI but keep the cheap binary URL.
-        "image_url": (resolved_image_url if has_binary_image else "") if slim else resolved_image_url,
+        "created_at": str(row["created_at"]),
+        "brain": row.get("brain") or "",
+        "cycle": row.get("cycle"),
+        "artifact_type": row.get("artifact_type") or "",
+        "title": row.get("title") or "",
+        "body_markdown": row.get("body_markdown") or "",
+        "monologue_public": row.get("monologue_public") or "",
+        "channel": row.get("channel") or "",
+        "source_platform": row.get("source_platform") or "",
+        "source_id": row.get("source_id") or "",
+        "source_parent_id": row.get("source_parent_id") or "",
+        "source_url": row.get("source_url") or "",
+        "search_queries": row.get("search_queries") or "",
+        "temperature": float(temperature) if temperature is not None else None,
+        "run_id": row.get("run_id") or "",
+        "image_url": image_url,
         "has_image": has_image,
+        # Precomputed at publish (images.analyze_image); None/"" when unknown.
+        "image_width": row.get("image_width"),
+        "image_height": row.get("image_height"),
+        "image_size": row.get("image_size"),
+        "image_mime": (row.get("image_mime") or "") if has_image else "",
+        "image_placeholder": row.get("image_placeholder") or "",
+        "image_color": row.get("image_color") or "",
+        "updated_at": str(updated_at) if updated_at is not None else "",
     }
+    if fields:
+        d = {name: d[name] for name in _ART_KEY_FIELDS + fields}
+    if "body_markdown_truncated" in row or "monologue_public_truncated" in row:
+        # preview=N: tells the client a full fetch would return more.
+        d["truncated"] = bool(row.get("body_markdown_truncated") or row.get("monologue_public_truncated"))
     return d
 
 
 @app.get("/artifacts")
-def get_artifacts(
+async def get_artifacts(
     limit: int = Query(default=5, ge=1, le=50),
     offset: int = Query(default=0, ge=0),
     run_id: Optional[str] = Query(default=None),
     artifact_type: Optional[str] = Query(default=None),
     sort: str = Query(default="desc"),
     include_images: bool = Query(default=False),
+    after: Optional[str] = Query(default=None),
+    before: Optional[str] = Query(default=None),
+    since: Optional[str] = Query(default=None),
+    fields: Optional[str] = Query(default=None),
+    preview: Optional[int] = Query(default=None, ge=0, le=20000),
 ):
-    order = "ASC" if sort.lower() == "asc" else "DESC"
-    with get_pool().connection() as conn:
-        conditions = []
-        params: list = []
-        if run_id:
-            conditions.append("run_id = %s")
-            params.append(run_id)
-        if artifact_type:
-            conditions.append("artifact_type = %s")
-            params.append(artifact_type)
-        where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
-        params.extend([limit, offset])
-        rows = conn.execute(f"""
-          SELECT {_ART_COLS} FROM artifacts
-          {where} ORDER BY created_at {order} LIMIT %s OFFSET %s
-        """, params).fetchall()
-        slim = not include_images
-        return [_art_row_to_dict(r, slim=slim) for r in rows]
+    """List artifacts with offset or keyset (cursor) paging.
+
+    Cursor mode: pass the X-Next-Cursor response header back as ?after=
+    for the next page, X-Prev-Cursor as ?before= for the previous one.
+    Cursor pages are an index range scan at any depth, unlike OFFSET,
+    which still works for older clients.
+
+    Polling: every response carries X-Change-Token. Pass it back as
+    ?since= to get only artifacts published or edited after it (merge
+    them by id); an idle poll returns [] and the same token. Tokens are
+    commit-ordered (_stamp_change), so a poll never misses a committed
+    change; deletes are not reported.
+
+    Projection: ?fields=id,title,... returns (and selects) only those
+    fields plus id, created_at and updated_at; ?preview=N cuts body and
+    monologue to N characters and adds "truncated".
+    """
+    if after and before:
+        raise HTTPException(status_code=400, detail="pass after or before, not both")
+    projection = _parse_fields(fields)
+    headers = {}
+    if since:
+        since_key = _decode_cursor(since, int)
+        async with get_async_pool().connection() as conn:
+            arts, token = await _run_async(conn, _changed_artifacts_plan(
+                since_key, limit, run_id, artifact_type, sort, slim=not include_images, fields=projection,
+                preview=preview))
+        headers["X-Change-Token"] = token or since
+        return FastJSONResponse(arts, headers=headers)
+    after_key = _decode_cursor(after) if after else None
+    before_key = _decode_cursor(before) if before else None
+    async with get_async_pool().connection() as conn:
+        arts = await _run_async(conn, _artifacts_plan(limit, offset, run_id, artifact_type, sort, slim=not include_images,
+                                                      after=after_key, before=before_key, fields=projection,
+                                                      preview=preview))
+        head = await _run_async(conn, _CHANGE_HEAD_PLAN)
+    if head:
+        headers["X-Change-Token"] = _encode_cursor(*head)
+    if arts:
+        if len(arts) == limit or before_key:
+            headers["X-Next-Cursor"] = _encode_cursor(arts[-1]["created_at"], arts[-1]["id"])
+        if after_key or offset or (before_key and len(arts) == limit):
+            headers["X-Prev-Cursor"] = _encode_cursor(arts[0]["created_at"], arts[0]["id"])
+    return FastJSONResponse(arts, headers=headers)
+
+
+# (change_seq, id) of the most recent change: the X-Change-Token.
+_CHANGE_HEAD_PLAN = (
+    "SELECT change_seq, id FROM artifacts ORDER BY change_seq DESC NULLS LAST LIMIT 1", None,
+    lambda rows: (rows[0]["change_seq"], rows[0]["id"]) if rows else None,
+)
 
 
-@app.get("/artifacts/count")
-def get_artifacts_count(
-    run_id: Optional[str] = Query(default=None),
-    artifact_type: Optional[str] = Query(default=None),
-):
-    """Count artifacts, optionally filtered by run_id and/or artifact_type.
+def _changed_artifacts_plan(since: tuple, limit: int, run_id: Optional[str], artifact_type: Optional[str],
+                            sort: str, slim: bool, fields: Optional[tuple] = None,
+                            preview: Optional[int] = None) -> tuple:
+    """Artifacts whose change_seq is past since, oldest change first, up
+    to limit. Finishes as (artifacts in sort order, token of the last one).
 
-    Defined BEFORE /artifacts/{artifact_id} so FastAPI's top-down route
-    matching doesn't send "count" to the int-parsing handler.
+    change_seq is commit-ordered (_stamp_change), so every change after
+    the token is either returned here or not yet committed: none is ever
+    skipped.
     """
+    where, params = _artifact_filters(run_id, artifact_type)
+    where += (" AND " if where else "WHERE ") + "change_seq > %s"
+    params.extend([since[0], limit])
+
+    def finish(rows):
+        if not rows:
+            return [], None
+        token = _encode_cursor(rows[-1]["change_seq"], rows[-1]["id"])
+        arts = [_art_row_to_dict(r, slim=slim, fields=fields) for r in rows]
+        arts.sort(key=lambda a: (a["created_at"], a["id"]), reverse=sort.lower() != "asc")
+        return arts, token
+
+    return f"""
+      SELECT {_art_columns(fields, slim, preview)}, change_seq FROM artifacts
+      {where} ORDER BY change_seq ASC LIMIT %s
+    """, params, finish
+
+
+def _encode_cursor(ts, row_id: int) -> str:
+    """Opaque token for a (timestamp, id) sort key: page cursors and change tokens."""
+    raw = f"{ts}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str, parse=datetime.datetime.fromisoformat) -> tuple:
+    """(key, id) from _encode_cursor; parse turns the key back into its type."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        key, _, artifact_id = raw.rpartition("|")
+        return parse(key), int(artifact_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+
+def _artifacts_plan(limit: int, offset: int = 0, run_id: Optional[str] = None,
+                    artifact_type: Optional[str] = None, sort: str = "desc", slim: bool = True,
+                    after: Optional[tuple] = None, before: Optional[tuple] = None,
+                    fields: Optional[tuple] = None, preview: Optional[int] = None) -> tuple:
+    """One page of artifacts. after/before are decoded (created_at, id)
+    cursors; a before page is fetched backwards then flipped into sort order."""
+    descending = sort.lower() != "asc"
+    backwards = before is not None
+    where, params = _artifact_filters(run_id, artifact_type)
+    cursor = before if backwards else after
+    if cursor is not None:
+        # Row comparison, so the scan starts inside the (…, created_at, id) indexes.
+        op = "<" if descending != backwards else ">"
+        where += (" AND " if where else "WHERE ") + f"(created_at, id) {op} (%s, %s)"
+        params.extend(cursor)
+        offset = 0
+    order = "DESC" if descending != backwards else "ASC"
+    params.extend([limit, offset])
+
+    def finish(rows):
+        if backwards:
+            rows.reverse()
+        return [_art_row_to_dict(r, slim=slim, fields=fields) for r in rows]
+
+    return f"""
+      SELECT {_art_columns(fields, slim, preview)} FROM artifacts
+      {where} ORDER BY created_at {order}, id {order} LIMIT %s OFFSET %s
+    """, params, finish
+
+
+def _artifact_filters(run_id: Optional[str], artifact_type: Optional[str]) -> tuple[str, list]:
+    """WHERE clause + params for the run_id/artifact_type filters shared by list endpoints."""
     conditions = []
     params: list = []
     if run_id:
@@ -231,56 +619,356 @@ def get_artifacts_count(
         conditions.append("artifact_type = %s")
         params.append(artifact_type)
     where = ("WHERE " + " AND ".join(conditions)) if conditions else ""
+    return where, params
+
+
+# Highlight markers for ts_headline; control characters can't occur in
+# the snippet text, so they survive HTML-escaping and become <mark> tags.
+_MARK_START, _MARK_STOP = "\x02", "\x03"
+_HEADLINE_OPTIONS = (f"StartSel={_MARK_START}, StopSel={_MARK_STOP}, "
+                     "MaxFragments=2, MaxWords=24, MinWords=8, FragmentDelimiter=\" … \"")
+
+
+@app.get("/search")
+def search_artifacts(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(default=20, ge=1, le=50),
+    run_id: Optional[str] = Query(default=None),
+    artifact_type: Optional[str] = Query(default=None),
+    from_date: Optional[str] = Query(default=None),
+    to_date: Optional[str] = Query(default=None),
+    sort: str = Query(default="rank"),
+    cursor: Optional[str] = Query(default=None),
+):
+    """Full-text search over title, body, monologue and search queries.
+
+    q takes web-search syntax ("exact phrase", -exclude, or). Matches come
+    from the GIN index on artifacts.search_tsv, best first (sort=rank) or
+    newest first (sort=recent); from_date/to_date bound created_at (ISO
+    dates, to_date inclusive). Rows are slim artifacts without body or
+    monologue, plus rank and an HTML-escaped snippet with matches wrapped
+    in <mark>. Pass X-Next-Cursor back as ?cursor= for the next page.
+    """
+    if sort not in ("rank", "recent"):
+        raise HTTPException(status_code=400, detail="sort must be rank or recent")
+    where, params = _artifact_filters(run_id, artifact_type)
+    conditions = [where[len("WHERE "):]] if where else []
+    for name, raw, op in (("from_date", from_date, ">="), ("to_date", to_date, "<")):
+        if not raw:
+            continue
+        try:
+            bound = datetime.datetime.fromisoformat(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"invalid {name}")
+        if op == "<" and len(raw) <= 10:
+            bound += datetime.timedelta(days=1)  # whole to_date day
+        conditions.append(f"created_at {op} %s")
+        params.append(bound)
+    filters = "".join(f" AND {c}" for c in conditions)
+
+    key = "rank" if sort == "rank" else "created_at"
+    page = ""
+    if cursor:
+        page = f"WHERE ({key}, id) < (%s{'::real' if sort == 'rank' else ''}, %s)"
+        params.extend(_decode_cursor(cursor, float if sort == "rank" else datetime.datetime.fromisoformat))
+    # Rank every match, page, then build snippets for the page rows only
+    # (ts_headline re-parses the text, so it is the expensive part).
+    with get_pool().connection() as conn:
+        rows = _fetch_dicts(conn, f"""
+          SELECT p.*, ts_headline('english', concat_ws(E'\\n', p.body_markdown, p.monologue_public), query, %s) AS snippet
+          FROM (
+              SELECT * FROM (
+                  SELECT {_art_columns(slim=True)}, ts_rank_cd(search_tsv, query)::real AS rank
+                  FROM artifacts, websearch_to_tsquery('english', %s) AS query
+                  WHERE search_tsv @@ query{filters}
+              ) m
+              {page}
+              ORDER BY {key} DESC, id DESC
+              LIMIT %s
+          ) p, websearch_to_tsquery('english', %s) AS query
+          ORDER BY p.{key} DESC, p.id DESC
+        """, [_HEADLINE_OPTIONS, q, *params, limit, q])
+
+    results = []
+    for r in rows:
+        d = _art_row_to_dict(r, slim=True)
+        del d["body_markdown"], d["monologue_public"]
+        d["rank"] = r["rank"]
+        d["snippet"] = (html.escape(r["snippet"] or "")
+                        .replace(_MARK_START, "<mark>").replace(_MARK_STOP, "</mark>"))
+        results.append(d)
+    headers = {}
+    if len(results) == limit:
+        last = results[-1]
+        headers["X-Next-Cursor"] = _encode_cursor(
+            repr(last["rank"]) if sort == "rank" else last["created_at"], last["id"])
+    return FastJSONResponse(results, headers=headers)
+
+
+@app.get("/artifacts/count")
+def get_artifacts_count(
+    run_id: Optional[str] = Query(default=None),
+    artifact_type: Optional[str] = Query(default=None),
+):
+    """Count artifacts, optionally filtered by run_id and/or artifact_type.
+
+    Reads a maintained counter (counts.py), so it costs one primary-key
+    lookup regardless of table size.
+
+    Defined BEFORE /artifacts/{artifact_id} so FastAPI's top-down route
+    matching doesn't send "count" to the int-parsing handler.
+    """
     with get_pool().connection() as conn:
-        count = conn.execute(f"SELECT COUNT(*) FROM artifacts {where}", params).fetchone()[0]
-        return {"count": int(count)}
+        return {"count": get_count(conn, run_id, artifact_type)}
+
+
+@app.get("/artifacts/sprite")
+def get_artifacts_sprite(
+    limit: int = Query(default=24, ge=1, le=50),
+    offset: int = Query(default=0, ge=0),
+    run_id: Optional[str] = Query(default=None),
+    artifact_type: Optional[str] = Query(default=None),
+    sort: str = Query(default="desc"),
+    tile: int = Query(default=200, ge=1, le=400),
+):
+    """Contact sheet for a page of artifacts: one sprite image plus a tile map.
+
+    Same filter/offset/limit/sort semantics as /artifacts. Returns the
+    page's slim artifacts, a sprite_url packing every image artifact's
+    thumbnail into one sheet, and each one's (x, y, w, h) on it, so a
+    gallery page costs one JSON + one image request instead of one per
+    tile. The sprite URL is keyed by the ids, image versions and image
+    dimensions it was laid out from (_sprite_key), so it is immutable,
+    cached like any image tier, and always matches this tile map.
+
+    Defined BEFORE /artifacts/{artifact_id} (see get_artifacts_count).
+    """
+    tile = snap_width(tile, SPRITE_TILE_SIZES)
+    order = "ASC" if sort.lower() == "asc" else "DESC"
+    where, params = _artifact_filters(run_id, artifact_type)
+    params.extend([limit, offset])
+    with get_pool().connection() as conn:
+        rows = _fetch_dicts(conn, f"""
+          SELECT {_art_columns(slim=True)}, {_SPRITE_VERSION_COL} AS sprite_version FROM artifacts
+          {where} ORDER BY created_at {order}, id {order} LIMIT %s OFFSET %s
+        """, params)
+
+    artifacts = [_art_row_to_dict(r, slim=True) for r in rows]
+    tiled = [(a, r) for a, r in zip(artifacts, rows) if a["has_image"]]
+    if not tiled:
+        return {"sprite_url": "", "tile": tile, "width": 0, "height": 0, "tiles": [], "artifacts": artifacts}
+
+    entries = [(a["id"], r["sprite_version"], r["image_width"], r["image_height"]) for a, r in tiled]
+    width, height, rects = sprite_layout([(w, h) for _, _, w, h in entries], tile)
+    ids = [a["id"] for a, _ in tiled]
+    key = _sprite_key(tile, entries)
+    return {
+        "sprite_url": f"/api/proxy/sprites/{key}?tile={tile}&ids={','.join(map(str, ids))}",
+        "tile": tile,
+        "width": width,
+        "height": height,
+        "tiles": [{"id": i, "x": x, "y": y, "w": w, "h": h} for i, (x, y, w, h) in zip(ids, rects)],
+        "artifacts": artifacts,
+    }
+
+
+# Changes whenever an artifact's image does, so sprite keys never go stale:
+# the content hash, or for legacy rows without one the row's updated_at
+# (which every image write bumps).
+_SPRITE_VERSION_COL = "COALESCE(image_sha256, updated_at::text, '')"
+
+
+def _sprite_key(tile: int, entries: list[tuple[int, str, Optional[int], Optional[int]]]) -> str:
+    """Key a sheet by (id, version, width, height) per tile, i.e. by its geometry.
+
+    /sprites/{key} lays the sheet out again from the rows it reads and
+    only serves it if they hash to the same key, so the image always
+    matches the tile map /artifacts/sprite returned with it.
+    """
+    joined = ",".join(f"{artifact_id}:{version}:{w}x{h}" for artifact_id, version, w, h in entries)
+    return hashlib.sha256(f"{tile}|{joined}".encode()).hexdigest()[:24]
+
+
+@app.get("/sprites/{key}")
+def get_sprite(key: str, request: Request, ids: str = Query(...), tile: int = Query(default=200, ge=1, le=400)):
+    """Serve a contact sheet built by /artifacts/sprite (format negotiated like image tiers).
+
+    404 if the key no longer matches the artifacts' current images or
+    their dimensions.
+    """
+    try:
+        id_list = [int(i) for i in ids.split(",") if i]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not id_list or len(id_list) > 50:
+        raise HTTPException(status_code=400, detail="ids must list 1 to 50 artifacts")
+    tile = snap_width(tile, SPRITE_TILE_SIZES)
+    fmt = negotiate_format(request.headers.get("accept", ""))
+
+    etag = f'"sprite-{key}-{fmt}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=_image_cache_headers(etag))
+
+    cache_key = ("sprite", key, fmt)
+    cached = image_cache.get(cache_key)
+    if cached is not None:
+        return _image_response(cached[0], cached[1], etag)
+
+    try:
+        data, mime = _image_flights.do(cache_key, lambda: _build_sprite(key, id_list, tile, fmt))
+    except RenderPoolBusy:
+        raise _render_busy()
+    return _image_response(data, mime, etag)
+
+
+def _build_sprite(key: str, id_list: list[int], tile: int, fmt: str) -> tuple[bytes, str]:
+    # Versions, dimensions and thumbnails from one statement, so the key
+    # check and the bytes come from the same snapshot.
+    with get_pool().connection() as conn:
+        rows = conn.execute(
+            f"""SELECT a.id, {_SPRITE_VERSION_COL}, a.image_width, a.image_height, v.image_data, v.sha256
+                FROM artifacts a
+                LEFT JOIN artifact_image_variants v ON v.artifact_id = a.id AND v.size = 'thumb'
+                WHERE a.id = ANY(%s)""",
+            [id_list]
+        ).fetchall()
+    by_id = {r[0]: r for r in rows}
+    if len(by_id) != len(set(id_list)):
+        raise HTTPException(status_code=404, detail="Sprite not found (artifacts changed)")
+    entries = [by_id[i][:4] for i in id_list]
+    if _sprite_key(tile, entries) != key:
+        raise HTTPException(status_code=404, detail="Sprite not found (artifacts changed)")
+    thumbs = {r[0]: load_blob(r[4], r[5]) for r in rows if r[4] is not None or r[5] is not None}
+
+    sources = []
+    for artifact_id in id_list:
+        if artifact_id not in thumbs:
+            try:
+                thumbs[artifact_id] = _load_artifact_image_once(artifact_id, "thumb", "jpeg")[0]
+            except HTTPException as e:
+                if e.status_code != 404:
+                    raise
+                thumbs[artifact_id] = b""
+        sources.append(thumbs[artifact_id])
+
+    width, height, rects = sprite_layout([(w, h) for _, _, w, h in entries], tile)
+    try:
+        data, mime = render_pool.run(render_sprite, sources, rects, (width, height), fmt)
+    except BrokenProcessPool:
+        log.exception("sprite render failed: render pool broken")
+        raise RenderPoolBusy()
+    image_cache.put(("sprite", key, fmt), data, mime)
+    return data, mime
+
+
+@app.get("/artifacts/positions")
+def get_artifact_positions(
+    ids: str = Query(..., description="Comma-separated artifact ids (max 100)"),
+    page_size: Optional[int] = Query(default=None, ge=1, le=200),
+):
+    """Batch form of /artifacts/{id}/position (e.g. for link previews).
+
+    Returns one entry per existing id, in request order; unknown ids are
+    omitted. Defined BEFORE /artifacts/{artifact_id} (see get_artifacts_count).
+    """
+    try:
+        id_list = list(dict.fromkeys(int(i) for i in ids.split(",") if i.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not id_list or len(id_list) > 100:
+        raise HTTPException(status_code=400, detail="pass 1-100 ids")
+    with get_pool().connection() as conn:
+        return _artifact_positions(conn, id_list, page_size)
 
 
 @app.get("/artifacts/{artifact_id}")
-def get_artifact_by_id(artifact_id: int):
-    """Get a single artifact by ID."""
+def get_artifact_by_id(
+    artifact_id: int,
+    fields: Optional[str] = Query(default=None),
+    preview: Optional[int] = Query(default=None, ge=0, le=20000),
+):
+    """Get a single artifact by ID (fields=/preview= as on /artifacts)."""
+    projection = _parse_fields(fields)
     with get_pool().connection() as conn:
-        row = conn.execute(f"SELECT {_ART_COLS} FROM artifacts WHERE id = %s", [artifact_id]).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Artifact not found")
-        return _art_row_to_dict(row)
+        rows = _fetch_dicts(conn, f"SELECT {_art_columns(projection, preview=preview)} FROM artifacts WHERE id = %s",
+                            [artifact_id])
+    if not rows:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return FastJSONResponse(_art_row_to_dict(rows[0], fields=projection))
 
 
 @app.get("/artifacts/{artifact_id}/position")
-def get_artifact_position(artifact_id: int):
-    """Get the position (0-indexed) of an artifact within its run, sorted by created_at ASC."""
+def get_artifact_position(artifact_id: int, page_size: Optional[int] = Query(default=None, ge=1, le=200)):
+    """Get the position (0-indexed) of an artifact within its run, sorted by created_at ASC.
+
+    Reads the stored run_position and the run's total from the runs table.
+    With ?page_size=N the response also carries the 0-indexed page the
+    artifact falls on.
+    """
     with get_pool().connection() as conn:
-        row = conn.execute(
-            "SELECT run_id, created_at FROM artifacts WHERE id = %s", [artifact_id]
-        ).fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="Artifact not found")
-        run_id, created_at = row[0], row[1]
-        pos = conn.execute(
-            "SELECT COUNT(*) FROM artifacts WHERE run_id = %s AND created_at < %s",
-            [run_id, created_at]
-        ).fetchone()[0]
-        total = conn.execute(
-            "SELECT COUNT(*) FROM artifacts WHERE run_id = %s", [run_id]
-        ).fetchone()[0]
-        return {"run_id": run_id, "position": pos, "total": total}
+        positions = _artifact_positions(conn, [artifact_id], page_size)
+    if not positions:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    return positions[0]
+
+
+def _artifact_positions(conn, ids: list[int], page_size: Optional[int]) -> list[dict]:
+    """Position dicts for the ids that exist, in the order given."""
+    rows = conn.execute("""
+      SELECT a.id, a.run_id, a.run_position, a.created_at, t.total
+      FROM artifacts a
+      LEFT JOIN LATERAL (
+          SELECT SUM(artifact_count)::int AS total FROM runs r WHERE r.run_id = a.run_id
+      ) t ON true
+      WHERE a.id = ANY(%s)
+    """, [ids]).fetchall()
+    found = {}
+    for artifact_id, run_id, position, created_at, total in rows:
+        if not run_id or position is None or total is None:
+            # Artifacts outside a run (or not yet numbered) aren't in the
+            # runs table; count them the slow way.
+            position = conn.execute(
+                "SELECT COUNT(*) FROM artifacts WHERE run_id = %s AND created_at < %s",
+                [run_id, created_at]
+            ).fetchone()[0]
+            total = conn.execute(
+                "SELECT COUNT(*) FROM artifacts WHERE run_id = %s", [run_id]
+            ).fetchone()[0]
+        d = {"id": artifact_id, "run_id": run_id, "position": int(position), "total": int(total)}
+        if page_size:
+            d["page"] = int(position) // page_size
+        found[artifact_id] = d
+    return [found[i] for i in ids if i in found]
 
 
 @app.get("/featured")
-def get_featured(include_images: bool = Query(default=False)):
+async def get_featured(
+    include_images: bool = Query(default=False),
+    fields: Optional[str] = Query(default=None),
+    preview: Optional[int] = Query(default=None, ge=0, le=20000),
+):
     """Get all currently featured artifacts (newest cycle first).
 
     By default returns slim rows (no image_url) to save bandwidth.
     Pass ?include_images=true if you actually need the image data
     (only the gallery and archive deep-link should need this).
+    fields=/preview= work as on /artifacts.
     """
-    with get_pool().connection() as conn:
-        rows = conn.execute(f"""
-          SELECT {_ART_COLS} FROM artifacts WHERE is_featured = TRUE
-          ORDER BY cycle DESC NULLS LAST, created_at DESC
-        """).fetchall()
-        slim = not include_images
-        return [_art_row_to_dict(r, slim=slim) for r in rows]
+    projection = _parse_fields(fields)
+    async with get_async_pool().connection() as conn:
+        featured = await _run_async(conn, _featured_plan(slim=not include_images, fields=projection, preview=preview))
+    return FastJSONResponse(featured)
+
+
+def _query_featured(conn, slim: bool, fields: Optional[tuple] = None, preview: Optional[int] = None) -> list[dict]:
+    return _run(conn, _featured_plan(slim, fields, preview))
+
+
+def _featured_plan(slim: bool, fields: Optional[tuple] = None, preview: Optional[int] = None) -> tuple:
+    return f"""
+      SELECT {_art_columns(fields, slim, preview)} FROM artifacts WHERE is_featured = TRUE
+      ORDER BY cycle DESC NULLS LAST, created_at DESC
+    """, None, lambda rows: [_art_row_to_dict(r, slim=slim, fields=fields) for r in rows]
 
 
 @app.post("/feature/{artifact_id}")
@@ -288,7 +976,9 @@ def feature_artifact(artifact_id: int):
     """Mark an artifact as featured (additive — multiple can be featured)."""
     with get_pool().connection() as conn:
         conn.execute("UPDATE artifacts SET is_featured = TRUE WHERE id = %s", [artifact_id])
+        notify(conn, "featured")
         conn.commit()
+    home_snapshot.bump()
     return {"ok": True, "featured_id": artifact_id}
 
 
@@ -297,7 +987,9 @@ def unfeature_artifact(artifact_id: int):
     """Remove an artifact from the featured list."""
     with get_pool().connection() as conn:
         conn.execute("UPDATE artifacts SET is_featured = FALSE WHERE id = %s", [artifact_id])
+        notify(conn, "featured")
         conn.commit()
+    home_snapshot.bump()
     return {"ok": True, "unfeatured_id": artifact_id}
 
 
@@ -309,10 +1001,14 @@ def patch_artifact_body(artifact_id: int, body: dict):
         raise HTTPException(status_code=400, detail="body_markdown required")
     with get_pool().connection() as conn:
         result = conn.execute(
-            "UPDATE artifacts SET body_markdown = %s WHERE id = %s",
+            "UPDATE artifacts SET body_markdown = %s, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
             [new_body, artifact_id]
         )
+        _notify_artifact(conn, artifact_id)
+        _stamp_change(conn, artifact_id)
         conn.commit()
+    state_snapshot.bump()
+    home_snapshot.bump()
     return {"ok": True, "artifact_id": artifact_id}
 
 
@@ -320,175 +1016,555 @@ def patch_artifact_body(artifact_id: int, body: dict):
 def get_latest_image():
     """Return the most recent artifact that has an image (binary or legacy data URI)."""
     with get_pool().connection() as conn:
-        row = conn.execute(f"""
-          SELECT {_ART_COLS} FROM artifacts
-          WHERE image_data IS NOT NULL
-             OR (image_url IS NOT NULL AND image_url != '')
-          ORDER BY created_at DESC LIMIT 1
-        """).fetchone()
-        if row:
-            return _art_row_to_dict(row)
-        return None
-
-
-# Resize targets for the three image tiers. Full = original (no resize).
-_IMAGE_SIZES = {
-    "thumb": 400,
-    "medium": 800,
-    "full": None,
-}
+        return _run(conn, _LATEST_IMAGE_PLAN)
 
 
-def _decode_legacy_data_uri(data_uri: str) -> tuple[bytes, str]:
-    """Decode a data: URI string into (bytes, mime). Returns (b'', '') on failure."""
-    if not data_uri or not data_uri.startswith("data:"):
-        return b"", ""
-    try:
-        header, b64 = data_uri.split(",", 1)
-        # header looks like "data:image/jpeg;base64"
-        mime = header[5:].split(";", 1)[0] or "image/jpeg"
-        return base64.b64decode(b64), mime
-    except Exception:
-        return b"", ""
+# has_image is a stored generated column with a partial index, so this
+# reads one index entry instead of OR-scanning the image columns.
+_LATEST_IMAGE_PLAN = (f"""
+  SELECT {_ART_COLS} FROM artifacts
+  WHERE has_image
+  ORDER BY created_at DESC, id DESC LIMIT 1
+""", None, lambda rows: _art_row_to_dict(rows[0]) if rows else None)
 
 
 @app.get("/artifacts/{artifact_id}/image/{size}")
-def get_artifact_image(artifact_id: int, size: str, request: Request):
+def get_artifact_image(
+    artifact_id: int,
+    size: str,
+    request: Request,
+    w: Optional[int] = Query(default=None, ge=1, le=4096),
+):
     """Serve an artifact image at a tiered size (thumb/medium/full).
 
-    - Reads binary from the image_data column (preferred).
-    - Falls back to decoding legacy image_url data URIs for older artifacts.
-    - Resizes thumb/medium on the fly with PIL; full returns the original.
+    - Format is negotiated from Accept: AVIF (when Pillow supports it),
+      then WebP, then JPEG. Responses carry Vary: Accept and per-format ETags.
+    - ?w= overrides the tier with a width snapped to images.WIDTH_BUCKETS,
+      for srcset.
+    - thumb/medium/full come pre-rendered from artifact_image_variants
+      (written at publish time or by backfill_image_variants.py); full is
+      an optimized progressive re-encode at original dimensions.
+    - full is streamed from Postgres in IMAGE_STREAM_CHUNK_BYTES slices
+      (one short connection checkout per chunk) and honours Range, so
+      clients can resume and memory per request stays near the chunk size.
+    - On a variant miss, renders from the original once (in the process
+      pool, coalesced across concurrent requests) and stores it. Returns
+      503 + Retry-After when the render pool is saturated.
+    - Final bytes are kept in an in-process LRU (cache.image_cache) so hot
+      images like the latest-image hero never hit Postgres.
     - Aggressive HTTP caching: artifacts are immutable once published.
     """
-    if size not in _IMAGE_SIZES:
+    if size not in IMAGE_SIZES:
         raise HTTPException(status_code=400, detail="size must be thumb, medium, or full")
 
-    # Conditional GET — every (artifact, size) pair is immutable.
-    etag = f'"{artifact_id}-{size}"'
+    tier = f"w{snap_width(w)}" if w is not None else size
+    fmt = negotiate_format(request.headers.get("accept", ""))
+
+    # Conditional GET — every (artifact, tier, format) triple is immutable.
+    etag = f'"{artifact_id}-{tier}-{fmt}"'
     if request.headers.get("if-none-match") == etag:
-        return Response(status_code=304)
+        return Response(status_code=304, headers=_image_cache_headers(etag))
+
+    if tier == "full":
+        return _full_image_response(artifact_id, fmt, etag, request)
 
+    cache_key = (artifact_id, tier, fmt)
+    cached = image_cache.get(cache_key)
+    if cached is not None:
+        return _image_response(cached[0], cached[1], etag)
+
+    # Concurrent misses for the same variant (e.g. every poller right after
+    # a publish) share one DB fetch and one render.
+    raw_bytes, mime = _load_artifact_image_once(artifact_id, tier, fmt)
+    return _image_response(raw_bytes, mime, etag)
+
+
+_image_flights = SingleFlight()
+
+
+def _load_artifact_image_once(artifact_id: int, tier: str, fmt: str) -> tuple[bytes, str]:
+    """_load_artifact_image, coalesced per variant; 503 when the render pool is full."""
+    try:
+        return _image_flights.do((artifact_id, tier, fmt), lambda: _load_artifact_image(artifact_id, tier, fmt))
+    except RenderPoolBusy:
+        raise _render_busy()
+
+
+def _render_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="image renderer busy, retry shortly",
+        headers={"Retry-After": str(IMAGE_RENDER_RETRY_AFTER)},
+    )
+
+
+def _load_artifact_image(artifact_id: int, tier: str, fmt: str) -> tuple[bytes, str]:
+    """Fetch (or render and store) one image variant, filling image_cache.
+
+    full is never put in image_cache: it is normally streamed, and only
+    comes through here on a variant miss.
+    """
+    cache_key = (artifact_id, tier, fmt) if tier != "full" else None
+    key = variant_key(tier, fmt)
     with get_pool().connection() as conn:
+        variant = conn.execute(
+            "SELECT image_data, image_mime, sha256 FROM artifact_image_variants WHERE artifact_id = %s AND size = %s",
+            [artifact_id, key]
+        ).fetchone()
+        if variant:
+            raw_bytes, mime = load_blob(variant[0], variant[2]), variant[1] or "image/jpeg"
+            _cache_image(cache_key, raw_bytes, mime)
+            return raw_bytes, mime
+
         row = conn.execute(
-            "SELECT image_data, image_mime, image_url FROM artifacts WHERE id = %s",
+            "SELECT image_data, image_mime, image_url, image_sha256 FROM artifacts WHERE id = %s",
             [artifact_id]
         ).fetchone()
         if not row:
             raise HTTPException(status_code=404, detail="Artifact not found")
 
-        raw_bytes: bytes = bytes(row[0]) if row[0] is not None else b""
+        raw_bytes: bytes = load_blob(row[0], row[3])
         mime: str = row[1] or "image/jpeg"
 
         if not raw_bytes and row[2]:
             # Legacy fallback: decode the data URI.
-            raw_bytes, legacy_mime = _decode_legacy_data_uri(row[2])
+            raw_bytes, legacy_mime = decode_legacy_data_uri(row[2])
             if legacy_mime:
                 mime = legacy_mime
 
         if not raw_bytes:
             raise HTTPException(status_code=404, detail="Artifact has no image")
 
-    # Resize for thumb/medium. Full returns the original bytes untouched.
-    target_dim = _IMAGE_SIZES[size]
-    if target_dim is not None:
-        try:
-            img = Image.open(io.BytesIO(raw_bytes))
-            # Convert palette/RGBA to RGB so JPEG re-encode is safe.
-            if img.mode not in ("RGB", "L"):
-                img = img.convert("RGB")
-            img.thumbnail((target_dim, target_dim), Image.LANCZOS)
-            buf = io.BytesIO()
-            img.save(buf, format="JPEG", quality=85, optimize=True)
-            raw_bytes = buf.getvalue()
-            mime = "image/jpeg"
-        except Exception as e:
+    # Variant miss (published before variants existed, or a new ?w= bucket):
+    # render once in the process pool — with the connection back in the
+    # pool — and persist so the next cold request is a plain byte fetch.
+    try:
+        raw_bytes, mime = render_pool.run(render_variant, raw_bytes, tier, fmt)
+    except RenderPoolBusy:
+        raise
+    except BrokenProcessPool:
+        # Not the image's fault: workers restart on the next job.
+        log.exception("image render failed: render pool broken")
+        raise RenderPoolBusy()
+    except Exception as e:
+        if tier != "full":
             raise HTTPException(status_code=500, detail=f"image resize failed: {e}")
+        # Undecodable by PIL: full still serves the original bytes as-is.
+        return raw_bytes, mime
+    with get_pool().connection() as conn:
+        store_variant(conn, artifact_id, key, raw_bytes, mime)
+        conn.commit()
 
-    return Response(
-        content=raw_bytes,
-        media_type=mime,
-        headers={
-            "Cache-Control": "public, max-age=86400, immutable",
-            "ETag": etag,
-        },
-    )
+    _cache_image(cache_key, raw_bytes, mime)
+    return raw_bytes, mime
+
+
+def _cache_image(cache_key: Optional[tuple], data: bytes, mime: str) -> None:
+    if cache_key is not None:
+        image_cache.put(cache_key, data, mime)
+
+
+def _full_image_response(artifact_id: int, fmt: str, etag: str, request: Request) -> Response:
+    """Serve the full tier with Range support, streaming from the variant's storage."""
+    key = variant_key("full", fmt)
+    with get_pool().connection() as conn:
+        row = conn.execute(
+            f"""SELECT COALESCE(byte_size, octet_length(image_data)), image_mime,
+                       image_data IS NULL, sha256, {_VARIANT_VERSION_COL}
+                FROM artifact_image_variants WHERE artifact_id = %s AND size = %s""",
+            [artifact_id, key]
+        ).fetchone()
+
+    if row is None:
+        # Variant miss: render (and store) it once, then serve from memory.
+        data, mime = _load_artifact_image_once(artifact_id, "full", fmt)
+        length = len(data)
+        byte_range = _parse_range(request, etag, length)
+        start, end = byte_range or (0, length - 1)
+        body = iter([memoryview(data)[start:end + 1]])
+    else:
+        length, mime = int(row[0]), row[1] or "image/jpeg"
+        byte_range = _parse_range(request, etag, length)
+        start, end = byte_range or (0, length - 1)
+        if row[2]:
+            body = _stream_blob(_open_blob(row[3], length), start, end)
+        else:
+            body = _stream_variant(artifact_id, key, row[4], start, end)
+
+    headers = _image_cache_headers(etag)
+    headers["Accept-Ranges"] = "bytes"
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    return StreamingResponse(body, status_code=206 if byte_range is not None else 200,
+                             media_type=mime, headers=headers)
+
+
+# Identifies one stored version of a variant: its content hash, or for
+# rows written before hashes were recorded, when it was (re)written.
+_VARIANT_VERSION_COL = "COALESCE(sha256, created_at::text, '')"
+
+
+class VariantChanged(Exception):
+    """A streamed variant was replaced or deleted after its headers went out."""
+
+
+def _stream_variant(artifact_id: int, key: str, version: str, start: int, end: int):
+    """Yield bytes [start, end] of a stored variant, one chunk per query.
+
+    Each chunk checks a connection out only for its own substring() query,
+    so a slow client never pins a pool connection. image_data uses
+    STORAGE EXTERNAL (see db.init_db), so Postgres reads only the TOAST
+    slices each substring needs.
+
+    Every chunk must come from the version the headers were built from.
+    If the variant was replaced or deleted in between, raise
+    VariantChanged: the server aborts the connection instead of ending a
+    body shorter than its Content-Length or splicing two versions.
+    """
+    pos = start
+    while pos <= end:
+        n = min(IMAGE_STREAM_CHUNK_BYTES, end - pos + 1)
+        with get_pool().connection() as conn:
+            chunk = conn.execute(
+                f"""SELECT substring(image_data FROM %s FOR %s) FROM artifact_image_variants
+                    WHERE artifact_id = %s AND size = %s AND {_VARIANT_VERSION_COL} = %s""",
+                [pos + 1, n, artifact_id, key, version]
+            ).fetchone()
+        if not chunk or chunk[0] is None or len(chunk[0]) != n:
+            raise VariantChanged(f"variant {key} of artifact {artifact_id} changed mid-stream")
+        yield chunk[0]
+        pos += n
+
+
+def _open_blob(digest: Optional[str], length: int) -> memoryview:
+    """Map a file-store blob for _stream_blob, before any header is sent.
+
+    404 if the blob is missing; 500 if it is empty (mmap refuses those)
+    or not the byte_size its row records, which Content-Length promises.
+    """
+    try:
+        if not digest:
+            raise FileNotFoundError(digest)
+        view = memoryview(blob_store.open_mmap(digest))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Image data not found")
+    except ValueError:
+        log.error("blob %s is empty", digest)
+        raise HTTPException(status_code=500, detail="stored image is empty")
+    if len(view) != length:
+        log.error("blob %s is %d bytes, expected %d", digest, len(view), length)
+        raise HTTPException(status_code=500, detail="stored image has the wrong size")
+    return view
+
+
+def _stream_blob(view: memoryview, start: int, end: int):
+    """Yield bytes [start, end] of a mapped blob (_open_blob) as slices.
+
+    No copies and no DB connection; the mapping is released when the last
+    slice is garbage collected.
+    """
+    pos = start
+    while pos <= end:
+        n = min(IMAGE_STREAM_CHUNK_BYTES, end - pos + 1)
+        yield view[pos:pos + n]
+        pos += n
+
+
+def _parse_range(request: Request, etag: str, length: int) -> Optional[tuple[int, int]]:
+    """Resolve a single-range Range header to inclusive (start, end).
+
+    Returns None (serve the whole body) when there is no usable Range:
+    absent, multi-range, a stale If-Range, or invalid (RFC 9110 says to
+    ignore those, e.g. bytes=5-3). Raises 416 only for a valid range that
+    is unsatisfiable: first byte past the end, or a zero-length suffix.
+    """
+    header = request.headers.get("range", "")
+    if_range = request.headers.get("if-range")
+    if not header.startswith("bytes=") or "," in header or (if_range and if_range != etag):
+        return None
+    first, _, last = header[6:].strip().partition("-")
+    if not all(p.isascii() and p.isdigit() for p in (first, last) if p) or not (first or last):
+        return None
+    if first:
+        start = int(first)
+        if last and int(last) < start:
+            return None
+        end = min(int(last), length - 1) if last else length - 1
+    else:
+        start, end = max(0, length - int(last)), length - 1
+    if start >= length or start > end:
+        raise HTTPException(status_code=416, detail="Range not satisfiable",
+                            headers={"Content-Range": f"bytes */{length}"})
+    return start, end
+
+
+def _image_cache_headers(etag: str) -> dict:
+    return {
+        "Cache-Control": "public, max-age=86400, immutable",
+        "ETag": etag,
+        "Vary": "Accept",
+    }
+
+
+def _image_response(content: bytes, mime: str, etag: str) -> Response:
+    return Response(content=content, media_type=mime, headers=_image_cache_headers(etag))
 
 
 @app.delete("/daemon-ticks")
 def clear_daemon_ticks(run_id: str = Query(default="")):
     """Clear all daemon ticks (or for a specific run_id)."""
-    with get_pool().connection() as conn:
-        if run_id:
-            conn.execute("DELETE FROM daemon_ticks WHERE run_id = %s", [run_id])
-        else:
-            conn.execute("DELETE FROM daemon_ticks")
-        conn.commit()
+    tick_feed.clear(run_id)
     return {"ok": True}
 
 
+MAX_TICK_BATCH_ITEMS = 1000
+MAX_TICK_BATCH_BYTES = 4 * 1024 * 1024
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+
 @app.post("/daemon-tick")
 def post_daemon_tick(req: DaemonTickRequest):
-    """Push daemon tick lines (per-role, appends to current tick)."""
-    with get_pool().connection() as conn:
-        existing = conn.execute(
-            "SELECT id, tick_data FROM daemon_ticks WHERE tick=%s AND run_id=%s",
-            [req.tick, req.run_id]
-        ).fetchone()
-        if existing:
-            data = existing[1] if isinstance(existing[1], dict) else json.loads(existing[1])
-            data.setdefault("lines", []).extend(req.lines)
-            data["complete"] = req.complete
-            data["sentry_interval"] = req.sentry_interval
-            conn.execute(
-                "UPDATE daemon_ticks SET tick_data=%s, updated_at=CURRENT_TIMESTAMP WHERE id=%s",
-                [json.dumps(data), existing[0]]
-            )
-        else:
-            # Clean out old session ticks when a new run_id appears
-            conn.execute("DELETE FROM daemon_ticks WHERE run_id != %s", [req.run_id])
-            data = {"lines": req.lines, "sentry_interval": req.sentry_interval, "complete": req.complete}
-            conn.execute(
-                "INSERT INTO daemon_ticks (tick, brain, run_id, tick_data) VALUES (%s,%s,%s,%s)",
-                [req.tick, req.brain, req.run_id, json.dumps(data)]
-            )
-        conn.execute(
-            "DELETE FROM daemon_ticks WHERE id NOT IN (SELECT id FROM daemon_ticks ORDER BY COALESCE(updated_at, created_at) DESC LIMIT 50)"
-        )
-        conn.commit()
+    """Push daemon tick lines (per-role, appends to current tick).
+
+    The lines are in /daemon/live as soon as this returns; Postgres is
+    written behind (see ticks.py). 503 while the write queue is full.
+    """
+    try:
+        tick_feed.apply(**req.model_dump())
+    except FeedBacklogged:
+        raise HTTPException(status_code=503, detail="daemon tick writes are backlogged",
+                            headers={"Retry-After": "5"})
     return {"ok": True}
 
 
+@app.post("/daemon-ticks")
+async def post_daemon_ticks(request: Request):
+    """Push many daemon ticks in one request.
+
+    The body is a JSON array of DaemonTickRequest items, or one item per
+    line with Content-Type application/x-ndjson. Items are applied in
+    body order, as if each had been sent to /daemon-tick. The response
+    has a result per item: {"index", "ok"} plus "error" and "retry" on
+    failure, so the agent resends only the items with retry=true (the
+    write queue was full). Invalid items never succeed (retry=false) and
+    don't stop the rest of the batch.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_TICK_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"batch exceeds {MAX_TICK_BATCH_BYTES} bytes")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_TICK_BATCH_BYTES:
+            raise HTTPException(status_code=413, detail=f"batch exceeds {MAX_TICK_BATCH_BYTES} bytes")
+
+    mime = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    results: list = []
+    items: list = []
+    if mime in NDJSON_TYPES:
+        for line in bytes(body).splitlines():
+            if not line.strip(b" \t\x1e"):
+                continue
+            try:
+                items.append(json.loads(line.strip(b"\x1e")))
+            except ValueError:
+                items.append(None)
+                results.append({"index": len(items) - 1, "ok": False, "retry": False, "error": "invalid JSON"})
+    else:
+        try:
+            items = json.loads(body) if body else []
+        except ValueError:
+            raise HTTPException(status_code=400, detail="body must be a JSON array or NDJSON")
+        if not isinstance(items, list):
+            raise HTTPException(status_code=400, detail="body must be a JSON array or NDJSON")
+    if len(items) > MAX_TICK_BATCH_ITEMS:
+        raise HTTPException(status_code=413, detail=f"batch exceeds {MAX_TICK_BATCH_ITEMS} items")
+
+    # tick_feed.apply takes a threading lock and can block on the write
+    # queue, so the items are applied off the event loop.
+    return await run_in_threadpool(_ingest_ticks, items, {r["index"]: r for r in results})
+
+
+def _ingest_ticks(items: list, results: dict) -> dict:
+    for i, item in enumerate(items):
+        if i in results:
+            continue
+        try:
+            req = DaemonTickRequest.model_validate(item)
+        except ValidationError as e:
+            err = e.errors()[0]
+            where = ".".join(str(p) for p in err["loc"])
+            results[i] = {"index": i, "ok": False, "retry": False,
+                          "error": f"{where}: {err['msg']}" if where else err["msg"]}
+            continue
+        try:
+            tick_feed.apply(**req.model_dump())
+            results[i] = {"index": i, "ok": True}
+        except FeedBacklogged:
+            results[i] = {"index": i, "ok": False, "retry": True, "error": "daemon tick writes are backlogged"}
+
+    ordered = [results[i] for i in range(len(items))]
+    accepted = sum(1 for r in ordered if r["ok"])
+    return {"ok": accepted == len(ordered), "accepted": accepted, "results": ordered}
+
+
 @app.get("/daemon/live")
-def get_daemon_live(limit: int = Query(default=10, ge=1, le=50)):
-    """Get recent daemon ticks for live terminal display. Only returns ticks from the latest session."""
+async def get_daemon_live(
+    response: Response,
+    limit: int = Query(default=10, ge=1, le=50),
+    since: Optional[str] = Query(default=None),
+):
+    """Get recent daemon ticks for live terminal display. Only returns ticks from the latest session.
+
+    Served from this process's in-memory feed (ticks.py), never Postgres.
+    Polling: pass the X-Change-Token response header back as ?since= to
+    get only ticks added or extended after it (replace them by tick); an
+    idle poll returns [].
+    """
+    since_key = _decode_cursor(since) if since else None
+    ticks, head = tick_feed.live(limit, since_key)
+    if head is not None:
+        response.headers["X-Change-Token"] = _encode_cursor(*head)
+    return ticks
+
+
+@app.get("/events")
+async def get_events(request: Request, last_event_id: Optional[int] = Query(default=None)):
+    """Server-Sent Events push channel (see events.py).
+
+    Event types: "state" (/home's state section), "artifact" (slim artifact,
+    or {id, deleted: true}), "featured" (slim featured list),
+    "daemon_tick" (one /daemon/live tick) and "resync" (refetch /home).
+    Reconnects resume from the Last-Event-ID header (or ?last_event_id=)
+    when the gap is still buffered, otherwise they start with a resync.
+    Returns 503 when this process is at MAX_SSE_CLIENTS; clients should
+    fall back to polling.
+    """
+    header = request.headers.get("last-event-id", "")
+    if header.isdigit():
+        last_event_id = int(header)
+    try:
+        sub, backlog = event_broker.subscribe(last_event_id)
+    except TooManySubscribers:
+        raise HTTPException(status_code=503, detail="Too many event stream clients",
+                            headers={"Retry-After": "30"})
+
+    async def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            for event in backlog if backlog is not None else [RESYNC]:
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle stream.
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event)
+        finally:
+            event_broker.unsubscribe(sub)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
+
+def _stamp_change(conn, artifact_id: int) -> None:
+    """Give an artifact the next change_seq. Call last, right before commit.
+
+    The lock is held through commit, so change_seq values become visible
+    in the order they are taken: once a poller has seen N, everything
+    below N has committed. Writers serialize only on this one UPDATE and
+    their commit; it is the last lock any artifact writer takes.
+    """
+    conn.execute(_CHANGE_LOCK_SQL)
+    conn.execute(_CHANGE_STAMP_SQL, [artifact_id])
+
+
+async def _stamp_change_async(conn, artifact_id: int) -> None:
+    """_stamp_change() for an AsyncConnection."""
+    await conn.execute(_CHANGE_LOCK_SQL)
+    await conn.execute(_CHANGE_STAMP_SQL, [artifact_id])
+
+
+_CHANGE_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext('artifacts:change_seq'))"
+_CHANGE_STAMP_SQL = "UPDATE artifacts SET change_seq = nextval('artifact_change_seq') WHERE id = %s"
+
+
+def _notify_artifact(conn, artifact_id: int, deleted: bool = False) -> None:
+    """Announce an artifact write; /state and /home change with it."""
+    notify(conn, "artifact", {"id": artifact_id, "deleted": True} if deleted else {"id": artifact_id})
+    notify(conn, "state")
+
+
+async def _notify_artifact_async(conn, artifact_id: int) -> None:
+    """_notify_artifact() for an AsyncConnection."""
+    await notify_async(conn, "artifact", {"id": artifact_id})
+    await notify_async(conn, "state")
+
+
+# Hydrators run once per process on the listener thread ("state" on its
+# own, coalesced: see events.py). They also drop this process's
+# snapshots, so writes made through another API process show up here
+# without waiting for STATE_CACHE_TTL. "state" refreshes in place instead,
+# so readers keep the current snapshot while it reloads.
+def _hydrate_state(data: dict) -> dict:
+    return _home_state(state_snapshot.refresh(_load_state_snapshot))[1]
+
+
+def _hydrate_artifact(data: dict) -> dict:
+    artifact_id = int(data["id"])
+    home_snapshot.bump()
+    image_cache.invalidate_artifact(artifact_id)
+    if data.get("deleted"):
+        return {"id": artifact_id, "deleted": True}
     with get_pool().connection() as conn:
-        # Get the most recent run_id to filter to current session
-        latest = conn.execute(
-            "SELECT run_id FROM daemon_ticks ORDER BY COALESCE(updated_at, created_at) DESC LIMIT 1"
-        ).fetchone()
-        if not latest:
-            return []
-        run_id = latest[0]
-        rows = conn.execute(
-            "SELECT tick, COALESCE(updated_at, created_at), tick_data FROM daemon_ticks WHERE run_id = %s ORDER BY COALESCE(updated_at, created_at) DESC LIMIT %s",
-            [run_id, limit]
-        ).fetchall()
-    return [{
-        "tick": r[0],
-        "created_at": str(r[1]),
-        "data": r[2] if isinstance(r[2], dict) else json.loads(r[2]) if r[2] else {},
-    } for r in reversed(rows)]
+        rows = _fetch_dicts(conn, f"SELECT {_art_columns(slim=True)} FROM artifacts WHERE id = %s", [artifact_id])
+    return _art_row_to_dict(rows[0], slim=True) if rows else {"id": artifact_id, "deleted": True}
+
+
+def _hydrate_featured(data: dict) -> list:
+    home_snapshot.bump()
+    with get_pool().connection() as conn:
+        return _query_featured(conn, slim=True)
+
+
+def _hydrate_daemon_tick(data: dict) -> Optional[dict]:
+    if data.get("origin") == tick_feed.origin:
+        return tick_feed.get(data.get("run_id", ""), data.get("tick"))
+    return tick_feed.refresh(data.get("run_id", ""), data.get("tick"))
+
+
+def _hydrate_daemon_clear(data: dict) -> None:
+    if data.get("origin") != tick_feed.origin:
+        tick_feed.forget(data.get("run_id", ""))
+    return None
+
+
+def _hydrate_resync(data: dict) -> dict:
+    state_snapshot.bump()
+    home_snapshot.bump()
+    image_cache.clear()
+    tick_feed.load()
+    return {}
+
+
+event_broker.on("state", _hydrate_state, coalesce=EVENT_COALESCE_SECONDS)
+event_broker.on("artifact", _hydrate_artifact)
+event_broker.on("featured", _hydrate_featured)
+event_broker.on("daemon_tick", _hydrate_daemon_tick)
+event_broker.on("daemon_clear", _hydrate_daemon_clear)
+event_broker.on("resync", _hydrate_resync)
 
 
 @app.get("/audience")
 def get_audience_stats():
     """Audience engagement summary for the agent's feedback loop."""
     with get_pool().connection() as conn:
-        ctrl = conn.execute("""
-          SELECT vote_1, vote_2, vote_3, vote_label_1, vote_label_2, vote_label_3,
-                 updated_at, trajectory_reason
-          FROM controls WHERE id=1
+        ctrl = conn.execute(f"""
+          SELECT {TALLY_COLUMNS}, c.vote_label_1, c.vote_label_2, c.vote_label_3, c.trajectory_reason
+          FROM controls c {TALLY_JOIN} WHERE c.id=1
         """).fetchone()
 
         # Seed stats
@@ -512,10 +1588,10 @@ def get_audience_stats():
             "vote_1": int(ctrl[0]) if ctrl else 0,
             "vote_2": int(ctrl[1]) if ctrl else 0,
             "vote_3": int(ctrl[2]) if ctrl else 0,
-            "vote_label_1": ctrl[3] or "" if ctrl else "",
-            "vote_label_2": ctrl[4] or "" if ctrl else "",
-            "vote_label_3": ctrl[5] or "" if ctrl else "",
-            "last_vote_at": str(ctrl[6]) if ctrl else None,
+            "vote_label_1": ctrl[4] or "" if ctrl else "",
+            "vote_label_2": ctrl[5] or "" if ctrl else "",
+            "vote_label_3": ctrl[6] or "" if ctrl else "",
+            "last_vote_at": str(ctrl[3]) if ctrl else None,
             "unique_voters": int(unique_voters),
             "seeds_pending": int(seed_count),
             "unique_seeders": int(unique_seeders),
@@ -526,54 +1602,32 @@ def get_audience_stats():
 
 
 @app.get("/runs")
-def get_runs():
+async def get_runs():
     """List all runs with summary info (most recent first), including first artifact title."""
-    with get_pool().connection() as conn:
-        rows = conn.execute("""
-          SELECT r.run_id,
-                 r.brain,
-                 r.artifact_count,
-                 r.started_at,
-                 r.last_artifact_at,
-                 r.first_cycle,
-                 r.last_cycle,
-                 ft.title AS first_title
-          FROM (
-              SELECT run_id,
-                     brain,
-                     COUNT(*) AS artifact_count,
-                     MIN(created_at) AS started_at,
-                     MAX(created_at) AS last_artifact_at,
-                     MIN(cycle) AS first_cycle,
-                     MAX(cycle) AS last_cycle
-              FROM artifacts
-              WHERE run_id != '' AND run_id IS NOT NULL
-              GROUP BY run_id, brain
-          ) r
-          LEFT JOIN LATERAL (
-              SELECT title FROM artifacts
-              WHERE run_id = r.run_id
-                AND artifact_type NOT LIKE 'system_%%'
-                AND title != ''
-              ORDER BY created_at ASC
-              LIMIT 1
-          ) ft ON true
-          ORDER BY r.started_at DESC
-        """).fetchall()
-
-        runs = []
-        for r in rows:
-            runs.append({
-                "run_id": r[0],
-                "brain": r[1],
-                "artifact_count": int(r[2]),
-                "started_at": str(r[3]),
-                "last_artifact_at": str(r[4]),
-                "first_cycle": r[5],
-                "last_cycle": r[6],
-                "first_title": r[7] or "",
-            })
-        return runs
+    async with get_async_pool().connection() as conn:
+        return await _run_async(conn, _RUNS_PLAN)
+
+
+def _run_to_dict(r: dict) -> dict:
+    return {
+        "run_id": r["run_id"],
+        "brain": r["brain"],
+        "artifact_count": int(r["artifact_count"]),
+        "started_at": str(r["started_at"]),
+        "last_artifact_at": str(r["last_artifact_at"]),
+        "first_cycle": r["first_cycle"],
+        "last_cycle": r["last_cycle"],
+        "first_title": r["first_title"] or "",
+    }
+
+
+# Summary rows maintained on publish/delete (see runs.py).
+_RUNS_PLAN = ("""
+  SELECT run_id, brain, artifact_count, started_at, last_artifact_at,
+         first_cycle, last_cycle, first_title
+  FROM runs
+  ORDER BY started_at DESC
+""", None, lambda rows: [_run_to_dict(r) for r in rows])
 
 
 def _get_client_ip(request: Request) -> str:
@@ -582,34 +1636,48 @@ def _get_client_ip(request: Request) -> str:
 
 
 @app.post("/vote", response_model=StateOut)
-def post_vote(req: VoteRequest, request: Request):
-    with get_pool().connection() as conn:
-        # Rate-limit votes per IP (resets each trajectory cycle)
-        ip = _get_client_ip(request)
-        row = conn.execute(
-            "SELECT count FROM ip_rate_limits WHERE ip = %s AND action = 'vote'", [ip]
-        ).fetchone()
-        if row and row[0] >= MAX_VOTES_PER_IP:
+async def post_vote(req: VoteRequest, request: Request):
+    """Cast a trajectory vote (see votes.py: no lock on controls)."""
+    async with get_async_pool().connection() as conn:
+        # Rate-limit check, count and vote in one statement (per-IP cap
+        # resets each trajectory cycle)
+        cur = await conn.execute(CAST_VOTE_SQL, {"ip": _get_client_ip(request), "cap": MAX_VOTES_PER_IP,
+                                                 "choice": int(req.choice)})
+        vote = await cur.fetchone()
+        if vote is None:
             raise HTTPException(status_code=429, detail="Vote limit reached (5 per cycle)")
-        conn.execute("""
-            INSERT INTO ip_rate_limits (ip, action, count) VALUES (%s, 'vote', 1)
-            ON CONFLICT (ip, action) DO UPDATE SET count = ip_rate_limits.count + 1
-        """, [ip])
-
-        col = f"vote_{req.choice}"
-        conn.execute(
-            f"UPDATE controls SET {col} = {col} + 1, updated_at = CURRENT_TIMESTAMP WHERE id=1;"
-        )
 
+        temperature = None
         if req.temperature is not None:
-            conn.execute(
-                "UPDATE controls SET temperature = %s, temp_set_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE id=1;",
+            cur = await conn.execute(
+                "UPDATE controls SET temperature = %s, temp_set_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP WHERE id=1 RETURNING temp_set_at;",
                 [float(req.temperature)]
             )
+            temperature = (float(req.temperature), (await cur.fetchone())[0])
 
-        state = _read_state(conn)
-        conn.commit()
-        return state
+        await notify_async(conn, "state")
+        await conn.commit()
+
+        if vote_folder.accepted():
+            await vote_folder.fold(conn)
+
+    # No read-back: add this vote to the cached snapshot. The NOTIFY
+    # refreshes it in the background (see _hydrate_state); with nothing
+    # cached, a load made after the commit already counts the vote.
+    add_vote = functools.partial(_add_vote, choice=int(req.choice), cast_at=vote[1], temperature=temperature)
+    snapshot = state_snapshot.patch(add_vote) or await state_snapshot.get_async(_load_state_snapshot_async)
+    return _finish_state(snapshot)
+
+
+def _add_vote(snapshot: tuple[dict, tuple], choice: int, cast_at,
+              temperature: Optional[tuple] = None) -> tuple[dict, tuple]:
+    """A state snapshot with one more vote (and the temperature it set) applied."""
+    state, (stored_temp, temp_set_at, default_temp) = snapshot
+    controls = dict(state["controls"], updated_at=max(state["controls"]["updated_at"], str(cast_at)))
+    controls[f"vote_{choice}"] += 1
+    if temperature is not None:
+        stored_temp, temp_set_at = temperature
+    return {**state, "controls": controls}, (stored_temp, temp_set_at, default_temp)
 
 
 @app.post("/temperature", response_model=StateOut)
@@ -648,8 +1716,10 @@ def post_temperature(req: dict, request: Request):
             [t]
         )
         state = _read_state(conn)
+        notify(conn, "state")
         conn.commit()
-        return state
+    state_snapshot.bump()
+    return state
 
 
 @app.post("/seed", response_model=StateOut)
@@ -664,8 +1734,10 @@ def post_seed(req: SeedRequest):
         next_id = conn.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM seeds").fetchone()[0]
         conn.execute("INSERT INTO seeds (id, text) VALUES (%s, %s);", [next_id, text])
         state = _read_state(conn)
+        notify(conn, "state")
         conn.commit()
-        return state
+    state_snapshot.bump()
+    return state
 
 
 @app.post("/consume-seeds")
@@ -676,13 +1748,17 @@ def consume_seeds(req: dict):
         return {"deleted": 0}
     with get_pool().connection() as conn:
         conn.execute("DELETE FROM seeds WHERE id = ANY(%s)", [[int(i) for i in ids]])
+        notify(conn, "state")
         conn.commit()
+    state_snapshot.bump()
     return {"deleted": len(ids)}
 
 
 @app.post("/set-trajectory", response_model=StateOut)
 def set_trajectory(req: SetTrajectoryRequest):
     with get_pool().connection() as conn:
+        # New cycle, fresh tallies: pending votes go first (votes.py lock order)
+        conn.execute(RESET_SQL)
         # Build SET clause dynamically based on whether default_temperature is provided
         if req.default_temperature is not None:
             conn.execute("""
@@ -709,8 +1785,10 @@ def set_trajectory(req: SetTrajectoryRequest):
         # Reset per-IP rate limits for the new cycle
         conn.execute("DELETE FROM ip_rate_limits")
         state = _read_state(conn)
+        notify(conn, "state")
         conn.commit()
-        return state
+    state_snapshot.bump()
+    return state
 
 
 @app.post("/default-temperature", response_model=StateOut)
@@ -726,8 +1804,10 @@ def set_default_temperature(req: dict):
             [t]
         )
         state = _read_state(conn)
+        notify(conn, "state")
         conn.commit()
-        return state
+    state_snapshot.bump()
+    return state
 
 
 @app.post("/tagline", response_model=StateOut)
@@ -744,26 +1824,48 @@ def set_tagline(req: dict):
             [text]
         )
         state = _read_state(conn)
+        notify(conn, "state")
         conn.commit()
-        return state
+    state_snapshot.bump()
+    return state
 
 
 @app.delete("/artifacts/{artifact_id}")
 def delete_artifact(artifact_id: int):
     """Delete a single artifact by ID."""
     with get_pool().connection() as conn:
-        result = conn.execute("DELETE FROM artifacts WHERE id = %s", [artifact_id])
-        conn.commit()
-        if result.rowcount == 0:
+        # Run lock before the row lock (see runs.py).
+        if lock_artifact(conn, artifact_id) is None:
             raise HTTPException(status_code=404, detail="Artifact not found")
-        return {"deleted": artifact_id}
+        run_id, artifact_type, brain, created_at, cycle, title, run_position = conn.execute(
+            "DELETE FROM artifacts WHERE id = %s RETURNING run_id, artifact_type, brain, created_at, cycle, title, run_position",
+            [artifact_id]
+        ).fetchone()
+        remove_from_run(conn, artifact_id, run_id, brain, created_at, cycle, title, run_position)
+        move_counts(conn, (run_id, artifact_type), None)
+        _notify_artifact(conn, artifact_id, deleted=True)
+        conn.commit()
+    state_snapshot.bump()
+    home_snapshot.bump()
+    image_cache.invalidate_artifact(artifact_id)
+    return {"deleted": artifact_id}
 
 
 @app.post("/publish", response_model=StateOut)
-def publish(req: PublishRequest):
-    """Publish a new artifact."""
+async def publish(req: PublishRequest):
+    """Publish a new artifact.
+
+    Image decoding, rendering (PIL, in the render pool) and blob store
+    writes run on a worker thread; the write transaction runs on the
+    AsyncConnectionPool.
+    """
     # Decode raw base64 image (no data URI prefix). The agent now sends binary
     # via image_data_b64 instead of stuffing a giant data URI into image_url.
+    prepared = await run_in_threadpool(_prepare_publish_image, req)
+    return await _publish_artifact(req, *prepared)
+
+
+def _prepare_publish_image(req: PublishRequest) -> tuple:
     image_data: Optional[bytes] = None
     if req.image_data_b64:
         try:
@@ -771,14 +1873,29 @@ def publish(req: PublishRequest):
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"image_data_b64 decode failed: {e}")
 
-    with get_pool().connection() as conn:
+    # Pre-render tiers outside the transaction. Legacy data URI publishes
+    # get variants too.
+    source_bytes = image_data or decode_legacy_data_uri(req.image_url)[0]
+    variants, meta = _process_publish_image(source_bytes)
+    image_column, image_sha256, _ = prepare_blob(image_data) if image_data else (None, None, None)
+    return source_bytes, prepare_variants(variants), meta, image_column, image_sha256
+
+
+async def _publish_artifact(req: PublishRequest, source_bytes: Optional[bytes], variants: list[tuple], meta: dict,
+                            image_column: Optional[bytes], image_sha256: Optional[str]) -> dict:
+    async with get_async_pool().connection() as conn:
+        # Run locks before the row lock (see runs.py). A republish may move
+        # the artifact to another run or type; refresh both.
+        previous = await lock_artifact_async(conn, int(req.id), [req.run_id])
         try:
-            conn.execute(
+            cur = await conn.execute(
                 """INSERT INTO artifacts
                    (id, brain, cycle, artifact_type, title, body_markdown, monologue_public,
                     channel, source_platform, source_id, source_parent_id, source_url,
-                    search_queries, temperature, run_id, image_url, image_data, image_mime)
-                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    search_queries, temperature, run_id, image_url, image_data, image_mime,
+                    image_sha256, image_size, image_width, image_height, image_placeholder, image_color)
+                   VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
+                           %s, %s, %s, %s)
                    ON CONFLICT (id) DO UPDATE SET
                     brain=EXCLUDED.brain, cycle=EXCLUDED.cycle, artifact_type=EXCLUDED.artifact_type,
                     title=EXCLUDED.title, body_markdown=EXCLUDED.body_markdown,
@@ -787,17 +1904,128 @@ def publish(req: PublishRequest):
                     source_parent_id=EXCLUDED.source_parent_id, source_url=EXCLUDED.source_url,
                     search_queries=EXCLUDED.search_queries, temperature=EXCLUDED.temperature,
                     run_id=EXCLUDED.run_id, image_url=EXCLUDED.image_url,
-                    image_data=EXCLUDED.image_data, image_mime=EXCLUDED.image_mime;""",
+                    image_data=EXCLUDED.image_data, image_mime=EXCLUDED.image_mime,
+                    image_sha256=EXCLUDED.image_sha256, image_size=EXCLUDED.image_size,
+                    image_width=EXCLUDED.image_width, image_height=EXCLUDED.image_height,
+                    image_placeholder=EXCLUDED.image_placeholder, image_color=EXCLUDED.image_color,
+                    updated_at=CURRENT_TIMESTAMP
+                   RETURNING (xmax = 0)""",
                 [int(req.id), req.brain, req.cycle, req.artifact_type,
                  req.title, req.body_markdown, req.monologue_public,
                  req.channel, req.source_platform, req.source_id,
                  req.source_parent_id, req.source_url, req.search_queries,
                  req.temperature, req.run_id, req.image_url,
-                 image_data, req.image_mime],
+                 image_column, meta.get("mime") or req.image_mime, image_sha256,
+                 len(source_bytes) if source_bytes else None, meta.get("width"), meta.get("height"),
+                 meta.get("placeholder"), meta.get("color")],
             )
+            inserted = (await cur.fetchone())[0]
         except Exception as e:
             raise HTTPException(status_code=400, detail=str(e))
 
-        state = _read_state(conn)
+        # Replace variants too, so an ON CONFLICT overwrite never serves
+        # tiers rendered from the previous image.
+        await store_variants_async(conn, int(req.id), variants)
+        if inserted:
+            await add_to_run_async(conn, int(req.id))
+        else:
+            # A republish may change its run, brain, cycle or title.
+            await refresh_runs_async(conn, [req.run_id, previous[0] if previous else None])
+        if previous is None and not inserted:
+            # A concurrent publish of the same id (client retry) inserted
+            # it first and already counted it.
+            previous = (req.run_id, req.artifact_type)
+        await move_counts_async(conn, previous, (req.run_id, req.artifact_type))
+
+        state = _finish_state(await _load_state_async(conn))
+        await _notify_artifact_async(conn, int(req.id))
+        await _stamp_change_async(conn, int(req.id))
+        await conn.commit()
+    state_snapshot.bump()
+    home_snapshot.bump()
+    image_cache.invalidate_artifact(int(req.id))
+    return state
+
+
+def _process_publish_image(source_bytes: bytes) -> tuple[dict, dict]:
+    """Render publish-time variants and extract metadata in the process pool.
+
+    Returns (variants, meta). An undecodable image gets neither (the
+    worker returns them empty) and is stored as sent. A render pool that
+    can't run the job (workers crashed or failed to start) is retried
+    once on fresh workers, then fails the request with 503, so an image
+    is never stored without its variants and metadata.
+    """
+    if not source_bytes:
+        return {}, {}
+    for attempt in (1, 2):
+        try:
+            return render_pool.run(render_publish, source_bytes, bounded=False)
+        except BrokenProcessPool:
+            log.exception("publish render failed: render pool broken (attempt %d)", attempt)
+        except Exception:
+            log.exception("publish render failed")
+            break
+    raise HTTPException(status_code=503, detail="image renderer unavailable, retry shortly",
+                        headers={"Retry-After": str(IMAGE_RENDER_RETRY_AFTER)})
+
+
+@app.put("/artifacts/{artifact_id}/image")
+async def put_artifact_image(artifact_id: int, request: Request):
+    """Upload an artifact's image as the raw request body.
+
+    Binary alternative to PublishRequest.image_data_b64: the agent
+    publishes metadata via /publish, then PUTs the image bytes here with
+    Content-Type set to the image mime. Skips the base64 inflation and the
+    giant pydantic string. The body is read incrementally and rejected with
+    413 as soon as it exceeds MAX_IMAGE_UPLOAD_BYTES.
+    """
+    mime = request.headers.get("content-type", "").split(";", 1)[0].strip().lower()
+    if not mime.startswith("image/") or len(mime) > 32:
+        raise HTTPException(status_code=415, detail="Content-Type must be an image/* mime type")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_IMAGE_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"image exceeds {MAX_IMAGE_UPLOAD_BYTES} bytes")
+
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > MAX_IMAGE_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail=f"image exceeds {MAX_IMAGE_UPLOAD_BYTES} bytes")
+    if not body:
+        raise HTTPException(status_code=400, detail="empty image body")
+
+    # DB writes and rendering are blocking; keep them off the event loop.
+    return await run_in_threadpool(_store_uploaded_image, artifact_id, bytes(body), mime)
+
+
+def _store_uploaded_image(artifact_id: int, image_data: bytes, mime: str) -> dict:
+    with get_pool().connection() as conn:
+        exists = conn.execute("SELECT 1 FROM artifacts WHERE id = %s", [artifact_id]).fetchone()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+
+    variants, meta = _process_publish_image(image_data)
+    image_column, image_sha256, image_size = prepare_blob(image_data)
+
+    with get_pool().connection() as conn:
+        result = conn.execute(
+            """UPDATE artifacts SET image_data = %s, image_mime = %s, image_url = '',
+                      image_sha256 = %s, image_size = %s, image_width = %s, image_height = %s,
+                      image_placeholder = %s, image_color = %s, updated_at = CURRENT_TIMESTAMP
+               WHERE id = %s""",
+            [image_column, meta.get("mime") or mime, image_sha256, image_size,
+             meta.get("width"), meta.get("height"), meta.get("placeholder"), meta.get("color"),
+             artifact_id]
+        )
+        if result.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Artifact not found")
+        store_variants(conn, artifact_id, variants)
+        _notify_artifact(conn, artifact_id)
+        _stamp_change(conn, artifact_id)
         conn.commit()
-        return state
+    state_snapshot.bump()
+    home_snapshot.bump()
+    image_cache.invalidate_artifact(artifact_id)
+    return {"ok": True, "artifact_id": artifact_id, "bytes": len(image_data), "variants": len(variants)}
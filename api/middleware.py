@@ -0,0 +1,133 @@
+"""ASGI middleware for Analog Home API."""
+
+import hashlib
+import os
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import PlainTextResponse
+
+# Caps on gzip request bodies: compressed bytes read, and bytes after
+# inflation (guards against decompression bombs).
+MAX_GZIP_REQUEST_BYTES = int(float(os.getenv("MAX_GZIP_REQUEST_MB", "4")) * 1024 * 1024)
+MAX_INFLATED_REQUEST_BYTES = int(float(os.getenv("MAX_INFLATED_REQUEST_MB", "8")) * 1024 * 1024)
+
+
+class GzipRequestMiddleware:
+    """Transparently inflate request bodies sent with Content-Encoding: gzip.
+
+    The agent client (analog_client) gzips JSON bodies; handlers see the
+    plain body and never know. Other requests pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            return await self.app(scope, receive, send)
+
+        compressed = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            compressed += message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(compressed) > MAX_GZIP_REQUEST_BYTES:
+                return await PlainTextResponse("request body too large", status_code=413)(scope, receive, send)
+
+        try:
+            inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            body = inflater.decompress(bytes(compressed), MAX_INFLATED_REQUEST_BYTES)
+            if inflater.unconsumed_tail:
+                return await PlainTextResponse("request body too large", status_code=413)(scope, receive, send)
+        except zlib.error:
+            return await PlainTextResponse("invalid gzip body", status_code=400)(scope, receive, send)
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        sent = False
+
+        async def inflated_receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        await self.app(scope, inflated_receive, send)
+
+
+class ETagMiddleware:
+    """Strong ETag on every JSON GET response, and 304 on If-None-Match.
+
+    The body is hashed after the handler renders it, so handlers need no
+    changes; responses that set their own ETag (e.g. /home, images) or
+    aren't 200 application/json pass through untouched. Adds
+    Cache-Control: no-cache when the handler set none, so browsers keep
+    the body and revalidate instead of refetching it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            return await self.app(scope, receive, send)
+        if_none_match = Headers(scope=scope).get("if-none-match", "")
+
+        start = None
+        body = bytearray()
+        passthrough = False
+
+        async def etag_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                return await send(message)
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (message["status"] != 200 or "etag" in headers
+                        or not headers.get("content-type", "").startswith("application/json")):
+                    passthrough = True
+                    return await send(message)
+                start = message
+                return
+            body.extend(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            headers = MutableHeaders(scope=start)
+            # X-* headers (cursors, change tokens) are part of the representation.
+            digest = hashlib.sha256(body)
+            for name, value in sorted(headers.items()):
+                if name.startswith("x-"):
+                    digest.update(f"\n{name}:{value}".encode())
+            etag = f'"{digest.hexdigest()[:32]}"'
+            headers["ETag"] = etag
+            if "cache-control" not in headers:
+                headers["Cache-Control"] = "no-cache"
+            if _etag_matches(if_none_match, etag):
+                del headers["content-length"]
+                del headers["content-type"]
+                await send({**start, "status": 304})
+                return await send({"type": "http.response.body", "body": b""})
+            await send(start)
+            await send({"type": "http.response.body", "body": bytes(body)})
+
+        await self.app(scope, receive, etag_send)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, per RFC 9110 for If-None-Match.
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
@@ -0,0 +1,92 @@
+"""Move image bytes out of Postgres BYTEA columns into the filesystem blob store.
+
+Each artifacts.image_data / artifact_image_variants.image_data value is
+written to IMAGE_STORE_DIR under its SHA-256 (duplicates are stored once),
+then the row keeps only sha256 + size and its image_data is set to NULL.
+Safe to re-run and to interrupt: rows are moved one at a time, each in
+its own transaction, and the blob is on disk before the row changes.
+
+Set IMAGE_STORE=fs on the API after migrating so new publishes go to the
+blob store too.
+
+Usage:
+    DATABASE_URL=postgres://... IMAGE_STORE_DIR=/data/images python migrate_image_store.py
+    ... python migrate_image_store.py --gc    # also delete unreferenced blobs
+
+Run --gc while the agent is not publishing: a publish writes its blob
+shortly before the row referencing it commits.
+"""
+import sys
+
+from db import init_db, get_pool, close
+from storage import IMAGE_STORE_DIR, blob_store, sha256_hex
+
+# (table, key columns, sha column, size column)
+_TABLES = (
+    ("artifacts", ("id",), "image_sha256", "image_size"),
+    ("artifact_image_variants", ("artifact_id", "size"), "sha256", "byte_size"),
+)
+
+
+def _migrate_table(table: str, keys: tuple, sha_col: str, size_col: str) -> tuple[int, int]:
+    key_sql = ", ".join(keys)
+    match_sql = " AND ".join(f"{k} = %s" for k in keys)
+    with get_pool().connection() as conn:
+        pending = conn.execute(
+            f"SELECT {key_sql} FROM {table} WHERE image_data IS NOT NULL ORDER BY {key_sql}"
+        ).fetchall()
+    print(f"{table}: {len(pending)} rows with BYTEA image data")
+
+    moved = 0
+    total_bytes = 0
+    for key in pending:
+        with get_pool().connection() as conn:
+            row = conn.execute(
+                f"SELECT image_data FROM {table} WHERE {match_sql} AND image_data IS NOT NULL", list(key)
+            ).fetchone()
+            if not row:
+                continue
+            data = bytes(row[0])
+            digest = blob_store.put(data, sha256_hex(data))
+            conn.execute(
+                f"UPDATE {table} SET image_data = NULL, {sha_col} = %s, {size_col} = %s WHERE {match_sql}",
+                [digest, len(data), *key],
+            )
+            conn.commit()
+        moved += 1
+        total_bytes += len(data)
+    print(f"  moved {moved} rows, {total_bytes:,} bytes")
+    return moved, total_bytes
+
+
+def _gc() -> int:
+    """Delete blobs no row references. Returns the number removed."""
+    with get_pool().connection() as conn:
+        referenced = {r[0] for r in conn.execute("""
+          SELECT image_sha256 FROM artifacts WHERE image_sha256 IS NOT NULL
+          UNION
+          SELECT sha256 FROM artifact_image_variants WHERE sha256 IS NOT NULL
+        """).fetchall()}
+    removed = 0
+    for digest in list(blob_store.digests()):
+        if digest not in referenced:
+            blob_store.delete(digest)
+            removed += 1
+    return removed
+
+
+def main() -> int:
+    print(f"Blob store: {IMAGE_STORE_DIR}")
+    init_db()
+    try:
+        for table, keys, sha_col, size_col in _TABLES:
+            _migrate_table(table, keys, sha_col, size_col)
+        if "--gc" in sys.argv[1:]:
+            print(f"Unreferenced blobs removed: {_gc()}")
+        return 0
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -47,6 +47,13 @@ class ArtifactOut(BaseModel):
     temperature: Optional[float] = None
     run_id: str = ""
     image_url: str = ""
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_size: Optional[int] = None
+    image_mime: str = ""
+    image_placeholder: str = ""
+    image_color: str = ""
+    updated_at: str = ""
 
 
 class ControlsOut(BaseModel):
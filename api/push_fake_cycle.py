@@ -1,5 +1,6 @@
 import time
-import requests
+
+from analog_client import AnalogClient
 
 def main():
     artifact_id = int(time.time())
@@ -16,9 +17,9 @@ def main():
             "The dial is warm. The crowd wants reflect.\n"
         ),
     }
-    r = requests.post("http://localhost:8000/publish", json=payload, timeout=10)
-    r.raise_for_status()
+    with AnalogClient("http://localhost:8000", timeout=10) as api:
+        api.publish(payload)
     print(f"Published artifact {artifact_id}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
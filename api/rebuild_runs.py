@@ -0,0 +1,46 @@
+"""Rebuild the runs summary table from artifacts.
+
+The API keeps runs up to date on publish and delete; run this to repair
+drift (e.g. after editing artifacts by hand in SQL). Prints any runs
+whose stored summary differed from the recomputed one. Safe to run while
+the API is live: the rebuild happens in one transaction.
+
+Usage:
+    DATABASE_URL=postgres://... python rebuild_runs.py
+"""
+import sys
+
+from db import init_db, get_pool, close
+from runs import rebuild_runs
+
+_COLS = "run_id, brain, artifact_count, started_at, last_artifact_at, first_cycle, last_cycle, first_title"
+
+
+def _describe(old, new) -> str:
+    if old is None:
+        return "missing"
+    if new is None:
+        return "stale row removed"
+    names = _COLS.split(", ")
+    return ", ".join(f"{n} {o} -> {v}" for n, o, v in zip(names, old, new) if o != v)
+
+
+def main() -> int:
+    init_db()
+    try:
+        with get_pool().connection() as conn:
+            before = {r[:2]: r for r in conn.execute(f"SELECT {_COLS} FROM runs").fetchall()}
+            count = rebuild_runs(conn)
+            after = {r[:2]: r for r in conn.execute(f"SELECT {_COLS} FROM runs").fetchall()}
+            conn.commit()
+        drifted = sorted(k for k in before.keys() | after.keys() if before.get(k) != after.get(k))
+        for key in drifted:
+            print(f"  [FIXED] run_id={key[0]} brain={key[1]!r}: {_describe(before.get(key), after.get(key))}")
+        print(f"Rebuilt {count} runs ({len(drifted)} drifted).")
+        return 0
+    finally:
+        close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""Run summary table for Analog Home API.
+
+/runs used to aggregate every artifact on each call. The runs table holds
+one row per (run_id, brain) with its artifact count, first/last
+created_at and cycle, and the run's first non-system title. Writers keep
+it current inside their transaction with per-artifact deltas:
+add_to_run_async() after inserting an artifact, remove_from_run() after
+deleting one. rebuild_runs() recomputes everything (see rebuild_runs.py)
+to repair drift.
+
+The same deltas maintain artifacts.run_position, each artifact's 0-based
+ordinal within its run (created_at, id order), so archive deep links
+resolve with a primary-key read instead of two COUNT(*)s. An append (the
+normal publish) costs a handful of primary-key writes; a delete shifts
+only the positions after it. The cases a delta can't settle fall back
+to re-aggregating that one run (refresh_runs()): an insert that lands
+before the run's newest artifact, a delete that removes a run's first
+or last artifact/cycle or its first title, and a republish that may
+move an artifact between runs.
+
+Lock order: a writer takes lock_runs() for every run it will touch
+before it locks any artifact row (its own INSERT, DELETE or FOR UPDATE),
+because a refresh or a delete's position shift updates other artifacts
+of the run while holding the run lock. lock_artifact() does this for an
+existing artifact, whose run can change until its row is locked. Counters (counts.move_counts())
+come after the run locks, and main._stamp_change() comes last.
+"""
+
+from typing import Iterable, Optional
+
+# Aggregate for one run (%s = run_id) or, with the filter swapped, all runs.
+_SUMMARY_SQL = """
+  SELECT r.run_id, r.brain, r.artifact_count, r.started_at, r.last_artifact_at,
+         r.first_cycle, r.last_cycle, COALESCE(ft.title, '')
+  FROM (
+      SELECT run_id,
+             COALESCE(brain, '') AS brain,
+             COUNT(*) AS artifact_count,
+             MIN(created_at) AS started_at,
+             MAX(created_at) AS last_artifact_at,
+             MIN(cycle) AS first_cycle,
+             MAX(cycle) AS last_cycle
+      FROM artifacts
+      WHERE {where}
+      GROUP BY run_id, COALESCE(brain, '')
+  ) r
+  LEFT JOIN LATERAL (
+      SELECT title FROM artifacts
+      WHERE run_id = r.run_id
+        AND artifact_type NOT LIKE 'system_%%'
+        AND title != ''
+      ORDER BY created_at ASC
+      LIMIT 1
+  ) ft ON true
+"""
+
+# Renumber run_position; only rows whose ordinal changed are written, so
+# appending to a run touches one row.
+_RENUMBER_SQL = """
+  UPDATE artifacts a SET run_position = o.pos
+  FROM (
+      SELECT id, (ROW_NUMBER() OVER (PARTITION BY run_id ORDER BY created_at, id) - 1)::int AS pos
+      FROM artifacts
+      WHERE {where}
+  ) o
+  WHERE a.id = o.id AND a.run_position IS DISTINCT FROM o.pos
+"""
+
+_INSERT_SQL = """
+  INSERT INTO runs (run_id, brain, artifact_count, started_at, last_artifact_at,
+                    first_cycle, last_cycle, first_title)
+"""
+
+
+# Serializes writers to one run: positions are dense per run, and a
+# refresh deletes + re-inserts its summary rows.
+_LOCK_SQL = "SELECT pg_advisory_xact_lock(hashtext(%s))"
+
+
+def _lock_run(conn, run_id: str) -> None:
+    conn.execute(_LOCK_SQL, [f"runs:{run_id}"])
+
+
+def lock_runs(conn, run_ids: Iterable[Optional[str]]) -> None:
+    """Take the given runs' locks (held until commit) in a fixed order."""
+    for run_id in sorted({r for r in run_ids if r}):
+        _lock_run(conn, run_id)
+
+
+async def lock_runs_async(conn, run_ids: Iterable[Optional[str]]) -> None:
+    """lock_runs() for an AsyncConnection."""
+    for run_id in sorted({r for r in run_ids if r}):
+        await conn.execute(_LOCK_SQL, [f"runs:{run_id}"])
+
+
+_RUN_OF_SQL = "SELECT run_id FROM artifacts WHERE id = %s"
+_LOCK_ARTIFACT_SQL = "SELECT run_id, artifact_type FROM artifacts WHERE id = %s FOR UPDATE"
+
+
+def lock_artifact(conn, artifact_id: int, run_ids: Iterable[Optional[str]] = ()) -> Optional[tuple]:
+    """Lock an artifact's run (and run_ids), then its row. Call first in
+    the transaction.
+
+    The run is read before its lock is taken, so a concurrent publish may
+    move the artifact in between. If the row, once locked, is in a run we
+    hold no lock for, the transaction is rolled back (releasing both) and
+    retried. Returns the locked row's (run_id, artifact_type), or None if
+    the artifact doesn't exist.
+    """
+    run_ids = tuple(run_ids)
+    while True:
+        row = conn.execute(_RUN_OF_SQL, [artifact_id]).fetchone()
+        held = {*run_ids, row[0] if row else None}
+        lock_runs(conn, held)
+        locked = conn.execute(_LOCK_ARTIFACT_SQL, [artifact_id]).fetchone()
+        if locked is None or not locked[0] or locked[0] in held:
+            return locked
+        conn.rollback()
+
+
+async def lock_artifact_async(conn, artifact_id: int, run_ids: Iterable[Optional[str]] = ()) -> Optional[tuple]:
+    """lock_artifact() for an AsyncConnection."""
+    run_ids = tuple(run_ids)
+    while True:
+        row = await (await conn.execute(_RUN_OF_SQL, [artifact_id])).fetchone()
+        held = {*run_ids, row[0] if row else None}
+        await lock_runs_async(conn, held)
+        locked = await (await conn.execute(_LOCK_ARTIFACT_SQL, [artifact_id])).fetchone()
+        if locked is None or not locked[0] or locked[0] in held:
+            return locked
+        await conn.rollback()
+
+
+def _resummarize(conn, run_id: str) -> None:
+    conn.execute("DELETE FROM runs WHERE run_id = %s", [run_id])
+    conn.execute(_INSERT_SQL + _SUMMARY_SQL.format(where="run_id = %s"), [run_id])
+
+
+def _refresh_statements(run_ids: Iterable[Optional[str]]) -> list[tuple[str, list]]:
+    statements = []
+    for run_id in sorted({r for r in run_ids if r}):
+        statements += [
+            (_LOCK_SQL, [f"runs:{run_id}"]),
+            ("DELETE FROM runs WHERE run_id = %s", [run_id]),
+            (_INSERT_SQL + _SUMMARY_SQL.format(where="run_id = %s"), [run_id]),
+            (_RENUMBER_SQL.format(where="run_id = %s"), [run_id]),
+        ]
+    return statements
+
+
+def refresh_runs(conn, run_ids: Iterable[Optional[str]]) -> None:
+    """Recompute the summary rows and run_positions of the given runs.
+
+    O(run size); for writes a delta can't express. Call before commit.
+    """
+    for sql, params in _refresh_statements(run_ids):
+        conn.execute(sql, params)
+
+
+async def refresh_runs_async(conn, run_ids: Iterable[Optional[str]]) -> None:
+    """refresh_runs() for an AsyncConnection."""
+    for sql, params in _refresh_statements(run_ids):
+        await conn.execute(sql, params)
+
+
+_ADDED_SQL = "SELECT run_id, created_at FROM artifacts WHERE id = %s"
+_LATER_SQL = "SELECT 1 FROM artifacts WHERE run_id = %s AND (created_at, id) > (%s, %s) LIMIT 1"
+
+
+def _append_statements(run_id: str, artifact_id: int) -> list[tuple[str, list]]:
+    return [
+        ("""
+          UPDATE artifacts SET run_position = (
+              SELECT COALESCE(SUM(artifact_count), 0)::int FROM runs WHERE run_id = %s)
+          WHERE id = %s
+        """, [run_id, artifact_id]),
+        (_INSERT_SQL + """
+          SELECT a.run_id, COALESCE(a.brain, ''), 1, a.created_at, a.created_at, a.cycle, a.cycle,
+                 COALESCE((SELECT MAX(first_title) FROM runs WHERE run_id = a.run_id), '')
+          FROM artifacts a WHERE a.id = %s
+          ON CONFLICT (run_id, brain) DO UPDATE SET
+            artifact_count = runs.artifact_count + 1,
+            started_at = LEAST(runs.started_at, EXCLUDED.started_at),
+            last_artifact_at = GREATEST(runs.last_artifact_at, EXCLUDED.last_artifact_at),
+            first_cycle = LEAST(runs.first_cycle, EXCLUDED.first_cycle),
+            last_cycle = GREATEST(runs.last_cycle, EXCLUDED.last_cycle)
+        """, [artifact_id]),
+        # Being the newest, it is the run's first title only if it has none yet.
+        ("""
+          UPDATE runs SET first_title = a.title
+          FROM artifacts a
+          WHERE a.id = %s AND runs.run_id = a.run_id
+            AND a.artifact_type NOT LIKE 'system_%%' AND a.title != ''
+            AND NOT EXISTS (SELECT 1 FROM runs r WHERE r.run_id = a.run_id AND r.first_title != '')
+        """, [artifact_id]),
+    ]
+
+
+async def add_to_run_async(conn, artifact_id: int) -> None:
+    """Count a just-inserted artifact into its run (AsyncConnection; call
+    before commit)."""
+    row = await (await conn.execute(_ADDED_SQL, [artifact_id])).fetchone()
+    if not row or not row[0]:
+        return
+    run_id, created_at = row
+    await conn.execute(_LOCK_SQL, [f"runs:{run_id}"])
+    if await (await conn.execute(_LATER_SQL, [run_id, created_at, artifact_id])).fetchone():
+        # Not an append: every position after it moves.
+        await refresh_runs_async(conn, [run_id])
+        return
+    for sql, params in _append_statements(run_id, artifact_id):
+        await conn.execute(sql, params)
+
+
+def remove_from_run(conn, artifact_id: int, run_id: Optional[str], brain: Optional[str],
+                    created_at, cycle: Optional[int], title: Optional[str],
+                    run_position: Optional[int]) -> None:
+    """Take a just-deleted artifact (its former column values) out of its run.
+
+    Call before commit.
+    """
+    if not run_id:
+        return
+    _lock_run(conn, run_id)
+    summary = conn.execute("""
+      UPDATE runs SET artifact_count = artifact_count - 1
+      WHERE run_id = %s AND brain = %s
+      RETURNING artifact_count, started_at, last_artifact_at, first_cycle, last_cycle, first_title
+    """, [run_id, brain or ""]).fetchone()
+    if summary is None or run_position is None:
+        refresh_runs(conn, [run_id])  # drifted; repair this run
+        return
+    count, started_at, last_artifact_at, first_cycle, last_cycle, first_title = summary
+    if count <= 0:
+        conn.execute("DELETE FROM runs WHERE run_id = %s AND brain = %s", [run_id, brain or ""])
+    extreme = count > 0 and (created_at in (started_at, last_artifact_at)
+                             or (cycle is not None and cycle in (first_cycle, last_cycle)))
+    if extreme or (title and title == first_title):
+        # It may have been an extreme: re-aggregate the summary (one read
+        # of this run's rows; positions are handled below either way).
+        _resummarize(conn, run_id)
+    conn.execute("""
+      UPDATE artifacts SET run_position = run_position - 1
+      WHERE run_id = %s AND (created_at, id) > (%s, %s)
+    """, [run_id, created_at, artifact_id])
+
+
+def rebuild_runs(conn) -> int:
+    """Recompute every summary row and run_position from artifacts.
+    Returns the run count."""
+    conn.execute("LOCK TABLE runs IN EXCLUSIVE MODE")
+    conn.execute("DELETE FROM runs")
+    conn.execute(_INSERT_SQL + _SUMMARY_SQL.format(where="run_id != '' AND run_id IS NOT NULL"))
+    conn.execute(_RENUMBER_SQL.format(where="run_id != '' AND run_id IS NOT NULL"))
+    return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
@@ -0,0 +1,114 @@
+"""Image byte storage backends for Analog Home API.
+
+Every stored image (originals in artifacts, rendered tiers in
+artifact_image_variants) records its SHA-256 and byte size. Where the
+bytes themselves live depends on IMAGE_STORE:
+
+- "postgres" (default): in the row's image_data BYTEA column.
+- "fs": in a content-addressed directory tree under IMAGE_STORE_DIR,
+  sharded by hash prefix (ab/cd/abcd...). The row's image_data is NULL.
+  Identical images (the agent re-emits images across cycles) are stored
+  once. On Fly.io, IMAGE_STORE_DIR must be on a mounted volume.
+
+Readers handle both layouts regardless of IMAGE_STORE, so rows can be
+moved over gradually with migrate_image_store.py.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+
+# ---------------------------------------------------------------------------
+# Configurable defaults (override via environment)
+# ---------------------------------------------------------------------------
+IMAGE_STORE = os.getenv("IMAGE_STORE", "postgres")
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "/data/images")
+
+
+class BlobStore:
+    """Content-addressed file store keyed by SHA-256 hex digest."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: bytes, digest: str | None = None) -> str:
+        """Store data (if not already present) and return its digest.
+
+        Writes go to a temp file in the target directory, are fsynced, then
+        renamed into place, so readers never see a partial blob.
+        """
+        digest = digest or sha256_hex(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest
+
+    def get(self, digest: str) -> bytes:
+        with open(self.path(digest), "rb") as f:
+            return f.read()
+
+    def open_mmap(self, digest: str) -> mmap.mmap:
+        """Map a blob read-only. Slicing memoryview(m) serves bytes without copying."""
+        with open(self.path(digest), "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def exists(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def digests(self):
+        """Yield every stored digest (for garbage collection)."""
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.startswith(".tmp-"):
+                    yield name
+
+    def delete(self, digest: str) -> None:
+        try:
+            os.unlink(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+
+blob_store = BlobStore(IMAGE_STORE_DIR)
+
+
+def sha256_hex(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare_blob(data: bytes) -> tuple[bytes | None, str, int]:
+    """Return (image_data column value, sha256, size) for storing data.
+
+    With IMAGE_STORE=fs the bytes are written to the blob store and the
+    column value is None; otherwise the bytes go in the column.
+    """
+    digest = sha256_hex(data)
+    if IMAGE_STORE == "fs":
+        blob_store.put(data, digest)
+        return None, digest, len(data)
+    return data, digest, len(data)
+
+
+def load_blob(image_data, digest: str | None) -> bytes:
+    """Resolve a row's image bytes from either layout (b'' if none)."""
+    if image_data is not None:
+        return bytes(image_data)
+    if digest:
+        return blob_store.get(digest)
+    return b""
@@ -0,0 +1,392 @@
+"""Live daemon feed for Analog Home API: the current run's newest ticks, in memory.
+
+/daemon/live is polled by every open home page, so each process keeps the
+feed's whole window (the newest DAEMON_TICK_RETENTION ticks of the
+latest run) in a TickFeed and serves it without touching Postgres.
+post_daemon_tick(s) apply() lines to the window synchronously and queue
+them; a writer thread persists the queue in batches (write-behind) and
+NOTIFYs a "daemon_tick" event per tick. Other processes refresh that
+tick from the database when the event arrives; the writing process
+already has it. The window is loaded from Postgres on startup and after
+the event listener reconnects (notifications may have been missed).
+A new run_id starts a new feed, but lines the previous run still had
+queued are written (and announced) first; the new run's first write
+then trims that session, as retention always has.
+
+Lines accepted but not yet written are lost if the process dies before
+the next write (TICK_WRITE_DELAY). apply() refuses new lines while more
+than MAX_PENDING_TICK_LINES are waiting, so a database outage pushes
+back on the agent instead of growing without bound.
+"""
+
+import datetime
+import json
+import os
+import threading
+import uuid
+from typing import Optional
+
+import psycopg
+
+from db import get_pool
+from events import notify
+
+# ---------------------------------------------------------------------------
+# Configurable defaults (override via environment)
+# ---------------------------------------------------------------------------
+DAEMON_TICK_RETENTION = 50
+TICK_WRITE_DELAY = float(os.getenv("TICK_WRITE_DELAY", "0.2"))      # seconds a burst may coalesce
+MAX_PENDING_TICK_LINES = int(os.getenv("MAX_PENDING_TICK_LINES", "20000"))
+
+# A tick as /daemon/live returns it: tick_data flags plus its lines in
+# push order. Filter with WHERE on alias t.
+TICK_SELECT = """
+  SELECT t.tick, t.run_id, COALESCE(t.updated_at, t.created_at), t.tick_data,
+         ARRAY(SELECT l.line FROM daemon_tick_lines l WHERE l.tick_id = t.id ORDER BY l.id)
+  FROM daemon_ticks t
+"""
+
+
+class FeedBacklogged(Exception):
+    """Too many accepted lines are still waiting to be written."""
+
+
+def persist_ticks(conn, ticks: list[dict], run_id: str, origin: str, trim: bool = True) -> None:
+    """Write queued ticks (distinct (run_id, tick) keys) inside the caller's transaction.
+
+    One pipelined executemany upserts every tick row (flags merged into
+    tick_data, updated_at set to when the feed accepted the lines), one
+    statement appends all of their lines to daemon_tick_lines in order,
+    and retention is trimmed once if any new tick started, keeping only
+    run_id's ticks. trim=False skips the trim (a previous run's last
+    lines must not delete the current run).
+    """
+    with conn.cursor() as cur:
+        cur.executemany("""
+            INSERT INTO daemon_ticks (tick, brain, run_id, tick_data, updated_at) VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (run_id, tick) DO UPDATE
+              SET tick_data = daemon_ticks.tick_data || EXCLUDED.tick_data, updated_at = EXCLUDED.updated_at
+            RETURNING id, (xmax = 0)
+        """, [(t["tick"], t["brain"], t["run_id"], json.dumps(t["flags"]), t["changed_at"]) for t in ticks],
+            returning=True)
+        rows = []
+        while True:
+            rows.append(cur.fetchone())
+            if not cur.nextset():
+                break
+    tick_ids = [tick_id for (tick_id, _), t in zip(rows, ticks) for _ in t["lines"]]
+    if tick_ids:
+        conn.execute("""
+            INSERT INTO daemon_tick_lines (tick_id, line)
+            SELECT tick_id, line FROM unnest(%s::int[], %s::text[]) WITH ORDINALITY AS u(tick_id, line, n)
+            ORDER BY n
+        """, [tick_ids, [line for t in ticks for line in t["lines"]]])
+    if trim and any(inserted for _, inserted in rows):
+        # Old sessions and all but the newest DAEMON_TICK_RETENTION
+        # ticks go (their lines cascade).
+        conn.execute("""
+            DELETE FROM daemon_ticks
+            WHERE run_id != %s OR id NOT IN (
+                SELECT id FROM daemon_ticks ORDER BY COALESCE(updated_at, created_at) DESC LIMIT %s)
+        """, [run_id, DAEMON_TICK_RETENTION])
+    for t in ticks:
+        notify(conn, "daemon_tick", {"run_id": t["run_id"], "tick": t["tick"], "origin": origin})
+
+
+def _entry(row) -> dict:
+    tick, run_id, changed_at, tick_data, lines = row
+    flags = tick_data if isinstance(tick_data, dict) else json.loads(tick_data) if tick_data else {}
+    return {"tick": tick, "run_id": run_id, "brain": "", "changed_at": changed_at,
+            "flags": {k: v for k, v in flags.items() if k != "lines"}, "lines": list(lines or [])}
+
+
+def tick_to_dict(entry: dict) -> dict:
+    return {"tick": entry["tick"], "run_id": entry["run_id"], "created_at": str(entry["changed_at"]),
+            "data": {"lines": list(entry["lines"]), **entry["flags"]}}
+
+
+class TickFeed:
+    """The latest run's newest ticks, plus the lines still to be written."""
+
+    def __init__(self, retention: int = DAEMON_TICK_RETENTION, write_delay: float = TICK_WRITE_DELAY,
+                 max_pending_lines: int = MAX_PENDING_TICK_LINES):
+        self.retention = retention
+        self.write_delay = write_delay
+        self.max_pending_lines = max_pending_lines
+        self.origin = uuid.uuid4().hex[:12]  # tags this process's notifications
+        self.run_id: Optional[str] = None
+        self._window: dict[int, dict] = {}
+        self._pending: dict[tuple[str, int], dict] = {}
+        self._pending_lines = 0
+        self._last_changed: Optional[datetime.datetime] = None
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # held across a write, so loads never see half of one
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.writes = 0
+        self.write_failures = 0
+        self.dropped = 0
+
+    # --- window ---------------------------------------------------------
+    def _now(self) -> datetime.datetime:
+        # Strictly increasing, so (changed_at, tick) change tokens never tie.
+        now = datetime.datetime.now(datetime.timezone.utc)
+        if self._last_changed is not None and now <= self._last_changed:
+            now = self._last_changed + datetime.timedelta(microseconds=1)
+        self._last_changed = now
+        return now
+
+    def _switch_run(self, run_id: str) -> None:
+        # A new session replaces the feed. The old one's queued lines stay
+        # queued: they were accepted, so flush() still writes them.
+        self.run_id = run_id
+        self._window.clear()
+
+    def _trim(self) -> None:
+        while len(self._window) > self.retention:
+            oldest = min(self._window.values(), key=lambda e: (e["changed_at"], e["tick"]))
+            del self._window[oldest["tick"]]
+
+    def apply(self, tick: int, lines: list[str], brain: str = "", run_id: str = "",
+              sentry_interval: int = 300, complete: bool = False) -> None:
+        """Append lines to a tick now and queue them for writing.
+
+        Raises FeedBacklogged (nothing applied) while the write queue is full.
+        """
+        with self._lock:
+            if self._pending_lines + len(lines) > self.max_pending_lines and self._pending_lines:
+                raise FeedBacklogged()
+            if run_id != self.run_id:
+                self._switch_run(run_id)
+            changed_at = self._now()
+            flags = {"sentry_interval": sentry_interval, "complete": complete}
+            entry = self._window.setdefault(tick, {"tick": tick, "run_id": run_id, "brain": brain,
+                                                   "changed_at": changed_at, "flags": {}, "lines": []})
+            entry["lines"].extend(lines)
+            entry["flags"].update(flags)
+            entry["changed_at"] = changed_at
+            self._trim()
+            pending = self._pending.setdefault((run_id, tick), {"tick": tick, "run_id": run_id, "brain": brain,
+                                                                "flags": {}, "lines": []})
+            pending["lines"].extend(lines)
+            pending["flags"].update(flags)
+            pending["brain"] = pending["brain"] or brain
+            pending["changed_at"] = changed_at
+            self._pending_lines += len(lines)
+            self._wake.notify()
+
+    def get(self, run_id: str, tick: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._window.get(tick) if run_id == self.run_id else None
+            return tick_to_dict(entry) if entry else None
+
+    def live(self, limit: int, since: Optional[tuple] = None) -> tuple[list[dict], Optional[tuple]]:
+        """(ticks, change_key): the newest limit ticks changed after since, oldest first.
+
+        change_key is (changed_at, tick) of the latest change, or None if
+        the feed is empty.
+        """
+        with self._lock:
+            if not self._window:
+                return [], None
+            entries = sorted(self._window.values(), key=lambda e: (e["changed_at"], e["tick"]))
+            head = (entries[-1]["changed_at"], entries[-1]["tick"])
+            if since is not None:
+                entries = [e for e in entries if (e["changed_at"], e["tick"]) > since]
+            return [tick_to_dict(e) for e in entries[-limit:]], head
+
+    # --- database -------------------------------------------------------
+    def _overlay(self, entry: dict) -> dict:
+        # A row from Postgres plus this process's lines still queued for it.
+        pending = self._pending.get((entry["run_id"], entry["tick"]))
+        if pending:
+            entry["lines"].extend(pending["lines"])
+            entry["flags"].update(pending["flags"])
+            entry["changed_at"] = max(entry["changed_at"], pending["changed_at"])
+        return entry
+
+    def load(self) -> None:
+        """Rebuild the window from Postgres (startup, missed notifications)."""
+        with self._write_lock:
+            with get_pool().connection() as conn:
+                latest = conn.execute(
+                    "SELECT run_id FROM daemon_ticks ORDER BY COALESCE(updated_at, created_at) DESC, id DESC LIMIT 1"
+                ).fetchone()
+                rows = conn.execute(
+                    f"{TICK_SELECT} WHERE t.run_id = %s ORDER BY COALESCE(t.updated_at, t.created_at) DESC, t.id DESC LIMIT %s",
+                    [latest[0], self.retention]
+                ).fetchall() if latest else []
+            with self._lock:
+                moved_on = any(key[0] == self.run_id for key in self._pending)
+                if moved_on and (not latest or latest[0] != self.run_id):
+                    return  # this process has already moved on to a newer run
+                self.run_id = latest[0] if latest else None
+                self._window = {}
+                for row in rows:
+                    entry = self._overlay(_entry(row))
+                    self._window[entry["tick"]] = entry
+                for (run_id, tick), pending in self._pending.items():
+                    if run_id == self.run_id and tick not in self._window:
+                        self._window[tick] = dict(pending, lines=list(pending["lines"]), flags=dict(pending["flags"]))
+                self._trim()
+
+    def refresh(self, run_id: str, tick: int) -> Optional[dict]:
+        """Re-read one tick another process wrote; returns it as /daemon/live would."""
+        with self._write_lock:
+            with get_pool().connection() as conn:
+                row = conn.execute(f"{TICK_SELECT} WHERE t.run_id = %s AND t.tick = %s", [run_id, tick]).fetchone()
+            if not row:
+                return None
+            with self._lock:
+                entry = self._overlay(_entry(row))
+                if run_id != self.run_id:
+                    current = max((e["changed_at"] for e in self._window.values()), default=None)
+                    if current is not None and current > entry["changed_at"]:
+                        return tick_to_dict(entry)  # a stale run's late write; not the live feed
+                    self._switch_run(run_id)
+                self._window[tick] = entry
+                self._trim()
+                return tick_to_dict(entry)
+
+    def clear(self, run_id: str = "") -> None:
+        """Drop ticks (all, or one run's) here, in Postgres and in every other process."""
+        with self._write_lock:
+            self.forget(run_id)
+            with get_pool().connection() as conn:
+                if run_id:
+                    conn.execute("DELETE FROM daemon_ticks WHERE run_id = %s", [run_id])
+                else:
+                    conn.execute("DELETE FROM daemon_ticks")
+                notify(conn, "daemon_clear", {"run_id": run_id, "origin": self.origin})
+                conn.commit()
+
+    def forget(self, run_id: str = "") -> None:
+        """Drop ticks (all, or one run's) from memory only."""
+        with self._lock:
+            self._pending = {k: p for k, p in self._pending.items() if run_id and k[0] != run_id}
+            self._pending_lines = sum(len(p["lines"]) for p in self._pending.values())
+            if not run_id or run_id == self.run_id:
+                self._window.clear()
+
+    # --- write-behind ---------------------------------------------------
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after writing whatever is still queued."""
+        self._stop.set()
+        with self._lock:
+            self._wake.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:
+            pass
+
+    def _run(self) -> None:
+        backoff = self.write_delay
+        while not self._stop.is_set():
+            with self._lock:
+                while not self._pending and not self._stop.is_set():
+                    self._wake.wait()
+            self._stop.wait(backoff)  # let a burst of lines coalesce into one write
+            try:
+                self.flush()
+                backoff = self.write_delay
+            except Exception:
+                backoff = min(max(backoff * 2, 0.5), 30.0)
+
+    def flush(self) -> int:
+        """Write everything queued now. Returns the number of ticks written.
+
+        A failed write puts its ticks back (ahead of lines queued since)
+        and re-raises. A tick Postgres rejects outright is dropped so it
+        can't block the rest; one that failed transiently is requeued.
+        Previous runs' ticks (queued before a run switch) are written
+        first, each run in its own transaction and untrimmed; the current
+        run goes last, and its trim drops the old sessions afterwards.
+        """
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending, self._pending_lines = self._pending, {}, 0
+                run_id = self.run_id
+            if not batch:
+                return 0
+            runs = sorted({key[0] for key in batch}, key=lambda r: r == run_id)
+            written = 0
+            for i, run in enumerate(runs):
+                ticks = [batch[k] for k in sorted(batch) if k[0] == run]  # fixed lock order across processes
+                try:
+                    retry = self._write(ticks, run, trim=run == run_id)
+                except Exception:
+                    self._requeue([batch[k] for k in sorted(batch) if k[0] in runs[i:]])
+                    self.write_failures += 1
+                    raise
+                if retry:
+                    self._requeue(retry)
+                    self.write_failures += 1
+                written += len(ticks) - len(retry)
+            self.writes += 1
+            return written
+
+    def _write(self, ticks: list[dict], run_id: str, trim: bool = True) -> list[dict]:
+        try:
+            with get_pool().connection() as conn:
+                persist_ticks(conn, ticks, run_id, self.origin, trim)
+                conn.commit()
+            return []
+        except psycopg.OperationalError:
+            raise
+        except psycopg.Error:
+            pass
+        # One bad tick (a value a column can't hold, say): retry one by one.
+        retry = []
+        with get_pool().connection() as conn:
+            for t in ticks:
+                try:
+                    with conn.transaction():
+                        persist_ticks(conn, [t], run_id, self.origin, trim)
+                except psycopg.OperationalError:
+                    retry.append(t)
+                except psycopg.Error:
+                    self.dropped += 1
+            conn.commit()
+        return retry
+
+    def _requeue(self, ticks: list[dict]) -> None:
+        with self._lock:
+            newer = self._pending
+            self._pending = {}
+            for t in ticks:
+                self._pending[(t["run_id"], t["tick"])] = t
+            for key, p in newer.items():
+                merged = self._pending.get(key)
+                if merged is None:
+                    self._pending[key] = p
+                else:
+                    merged["lines"].extend(p["lines"])
+                    merged["flags"].update(p["flags"])
+                    merged["changed_at"] = p["changed_at"]
+            self._pending_lines = sum(len(p["lines"]) for p in self._pending.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "run_id": self.run_id,
+                "ticks": len(self._window),
+                "pending_ticks": len(self._pending),
+                "pending_lines": self._pending_lines,
+                "writes": self.writes,
+                "write_failures": self.write_failures,
+                "dropped": self.dropped,
+            }
+
+
+tick_feed = TickFeed()
@@ -0,0 +1,150 @@
+"""Trajectory vote tallies for Analog Home API, without a hot row.
+
+/vote used to UPDATE controls SET vote_N = vote_N + 1 WHERE id=1, so every
+vote queued on that one tuple's lock. A vote is now a single statement
+(CAST_VOTE_SQL): the per-IP rate-limit upsert, conditional on the cap,
+feeding an insert into the append-only pending_votes table. It locks only
+the voter's own ip_rate_limits row.
+
+The exact tally is controls.vote_N plus the pending rows for N; readers
+join TALLY_JOIN and select TALLY_COLUMNS in one statement, so they see a
+consistent pair. /vote itself reads nothing back: it adds its vote to
+the cached /state snapshot, and its NOTIFY has each process refresh the
+snapshot in the background, so the pending_votes scan runs about once
+per coalescing window rather than on every vote or /state read.
+fold_votes() moves pending rows into controls in one statement as well,
+so every snapshot counts each vote exactly once.
+VoteFolder keeps pending_votes small: each process folds after every
+VOTE_FOLD_BATCH votes it accepts, and every VOTE_FOLD_INTERVAL seconds in
+the background so a quiet process or a short burst never leaves rows
+behind. Both go by what this process has seen, not by pending_votes ids,
+which have gaps.
+
+Lock order: anything that both deletes pending_votes and updates
+controls (fold, trajectory reset) deletes first.
+"""
+
+import asyncio
+import os
+from typing import Optional
+
+import psycopg
+
+from db import get_async_pool
+
+VOTE_FOLD_BATCH = int(os.getenv("VOTE_FOLD_BATCH", "100"))
+VOTE_FOLD_INTERVAL = float(os.getenv("VOTE_FOLD_INTERVAL", "10"))  # seconds; 0 disables
+
+# %(ip)s, %(cap)s, %(choice)s. Returns the pending vote's (id, created_at),
+# or no row when the IP has used its MAX_VOTES_PER_IP for this cycle.
+CAST_VOTE_SQL = """
+  WITH allowed AS (
+    INSERT INTO ip_rate_limits (ip, action, count) VALUES (%(ip)s, 'vote', 1)
+    ON CONFLICT (ip, action) DO UPDATE SET count = ip_rate_limits.count + 1
+      WHERE ip_rate_limits.count < %(cap)s
+    RETURNING 1
+  )
+  INSERT INTO pending_votes (choice) SELECT %(choice)s FROM allowed
+  RETURNING id, created_at
+"""
+
+# Join onto "controls c" to select TALLY_COLUMNS.
+TALLY_JOIN = """
+  CROSS JOIN (
+    SELECT COUNT(*) FILTER (WHERE choice = 1) AS n1,
+           COUNT(*) FILTER (WHERE choice = 2) AS n2,
+           COUNT(*) FILTER (WHERE choice = 3) AS n3,
+           MAX(created_at) AS last_vote_at
+    FROM pending_votes
+  ) pv
+"""
+
+# Exact tallies, and updated_at advanced to the latest pending vote (as
+# if each vote still touched controls).
+TALLY_COLUMNS = ("c.vote_1 + pv.n1 AS vote_1, c.vote_2 + pv.n2 AS vote_2, c.vote_3 + pv.n3 AS vote_3, "
+                 "GREATEST(c.updated_at, pv.last_vote_at) AS updated_at")
+
+FOLD_SQL = """
+  WITH folded AS (DELETE FROM pending_votes RETURNING choice, created_at)
+  UPDATE controls SET
+    vote_1 = vote_1 + (SELECT COUNT(*) FROM folded WHERE choice = 1),
+    vote_2 = vote_2 + (SELECT COUNT(*) FROM folded WHERE choice = 2),
+    vote_3 = vote_3 + (SELECT COUNT(*) FROM folded WHERE choice = 3),
+    updated_at = GREATEST(updated_at, (SELECT MAX(created_at) FROM folded))
+  WHERE id = 1 AND EXISTS (SELECT 1 FROM folded)
+"""
+
+# Start of a trajectory cycle: drop pending votes before zeroing controls.
+RESET_SQL = "DELETE FROM pending_votes"
+
+
+def fold_votes(conn) -> None:
+    """Move pending votes into controls (caller commits)."""
+    conn.execute(FOLD_SQL)
+
+
+async def fold_votes_async(conn) -> None:
+    """fold_votes() for an AsyncConnection."""
+    await conn.execute(FOLD_SQL)
+
+
+class VoteFolder:
+    """Schedules fold_votes() for one process (see module docstring)."""
+
+    def __init__(self, batch: int = VOTE_FOLD_BATCH, interval: float = VOTE_FOLD_INTERVAL):
+        self.batch = batch
+        self.interval = interval
+        self._accepted = 0
+        self._task: Optional[asyncio.Task] = None
+        self.folds = 0
+        self.errors = 0
+
+    def accepted(self) -> bool:
+        """Count a vote this process accepted; True when it is time to fold.
+
+        Called on the event loop only, so the counter needs no lock.
+        """
+        self._accepted += 1
+        if self._accepted < self.batch:
+            return False
+        self._accepted = 0
+        return True
+
+    async def fold(self, conn) -> None:
+        """Fold in its own transaction on conn. Tallies are exact either
+        way, so a failed fold is rolled back and left to the next one."""
+        try:
+            await fold_votes_async(conn)
+            await conn.commit()
+            self.folds += 1
+        except psycopg.Error:
+            await conn.rollback()
+            self.errors += 1
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                async with get_async_pool().connection() as conn:
+                    await self.fold(conn)
+            except Exception:
+                self.errors += 1  # pool busy or closing; try next round
+
+    def stats(self) -> dict:
+        return {"batch": self.batch, "interval": self.interval, "folds": self.folds, "errors": self.errors}
+
+
+vote_folder = VoteFolder()
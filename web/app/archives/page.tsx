@@ -161,11 +161,11 @@ function ArchivesInner() {
       if (targetArtifactId) {
         try {
           // Get artifact position to calculate page
-          const posRes = await fetch(`${API}/artifacts/${targetArtifactId}/position`);
+          const posRes = await fetch(`${API}/artifacts/${targetArtifactId}/position?page_size=${PER_PAGE}`);
           if (posRes.ok) {
             const pos = await posRes.json();
             targetRunId = pos.run_id || null;
-            targetPage = Math.floor(pos.position / PER_PAGE);
+            targetPage = pos.page ?? Math.floor(pos.position / PER_PAGE);
             setRunTotal((prev) => ({ ...prev, [pos.run_id]: pos.total }));
             setExpandedArtifact(Number(targetArtifactId));
           }
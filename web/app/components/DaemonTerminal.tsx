@@ -1,9 +1,11 @@
 "use client";
 
 import { useEffect, useRef, useState } from "react";
+import { onConnection, subscribe } from "../lib/events";
 
 type TickData = {
   tick: number;
+  run_id?: string;
   created_at: string;
   data: {
     lines: string[];
@@ -12,6 +14,11 @@ type TickData = {
   };
 };
 
+const MAX_TICKS = 8;
+// While the /events stream is up, ticks arrive as "daemon_tick" events and
+// the poll only runs this often as a safety net.
+const LIVE_POLL_MS = 60000;
+
 type Props = {
   apiBase: string;
 };
@@ -63,34 +70,58 @@ export default function DaemonTerminal({ apiBase }: Props) {
   const [ticks, setTicks] = useState<TickData[]>([]);
   const [visible, setVisible] = useState(false);
   const scrollRef = useRef<HTMLDivElement>(null);
+  // Change token from the last poll; later polls fetch only ticks added or
+  // extended since, merged into ticksRef by tick number.
+  const sinceRef = useRef<string | null>(null);
+  const ticksRef = useRef<TickData[]>([]);
 
   useEffect(() => {
     let active = true;
+    let live = false;
+    let lastPoll = 0;
+
+    // Merge fresh ticks (replacing by tick number) unless they start a new
+    // run or replace the whole list.
+    function apply(fresh: TickData[], incremental: boolean) {
+      let data = fresh;
+      if (incremental && !(fresh.length > 0 && fresh[0].run_id !== ticksRef.current[0]?.run_id)) {
+        const updated = new Set(fresh.map((t) => t.tick));
+        data = [...ticksRef.current.filter((t) => !updated.has(t.tick)), ...fresh]
+          .sort((a, b) => a.tick - b.tick)
+          .slice(-MAX_TICKS);
+      }
+      ticksRef.current = data;
+
+      if (data.length === 0) {
+        setVisible(false);
+        return;
+      }
+
+      // Check if agent is live: last tick within 2x sentry_interval
+      const lastTick = data[data.length - 1];
+      const interval = lastTick.data?.sentry_interval || 300;
+      const lastTime = new Date(
+        lastTick.created_at.includes("Z") || lastTick.created_at.includes("+")
+          ? lastTick.created_at
+          : lastTick.created_at.replace(" ", "T") + "Z"
+      ).getTime();
+      const stale = Date.now() - lastTime > interval * 2 * 1000;
+
+      setVisible(!stale);
+      setTicks(data);
+    }
 
     async function poll() {
+      if (live && Date.now() - lastPoll < LIVE_POLL_MS) return;
+      lastPoll = Date.now();
       try {
-        const res = await fetch(`${apiBase}/daemon/live?limit=8`);
+        const since = sinceRef.current ? `&since=${encodeURIComponent(sinceRef.current)}` : "";
+        const res = await fetch(`${apiBase}/daemon/live?limit=${MAX_TICKS}${since}`);
         if (!res.ok) return;
-        const data: TickData[] = await res.json();
+        const fresh: TickData[] = await res.json();
         if (!active) return;
-
-        if (data.length === 0) {
-          setVisible(false);
-          return;
-        }
-
-        // Check if agent is live: last tick within 2x sentry_interval
-        const lastTick = data[data.length - 1];
-        const interval = lastTick.data?.sentry_interval || 300;
-        const lastTime = new Date(
-          lastTick.created_at.includes("Z") || lastTick.created_at.includes("+")
-            ? lastTick.created_at
-            : lastTick.created_at.replace(" ", "T") + "Z"
-        ).getTime();
-        const stale = Date.now() - lastTime > interval * 2 * 1000;
-
-        setVisible(!stale);
-        setTicks(data);
+        sinceRef.current = res.headers.get("X-Change-Token");
+        apply(fresh, !!since);
       } catch {
         // API unreachable
       }
@@ -98,7 +129,13 @@ export default function DaemonTerminal({ apiBase }: Props) {
 
     poll();
     const t = setInterval(poll, 8000);
-    return () => { active = false; clearInterval(t); };
+    const offTick = subscribe("daemon_tick", (tick) => {
+      if (active) apply([tick as TickData], ticksRef.current.length > 0);
+    });
+    const offConnection = onConnection((open) => {
+      live = open;
+    });
+    return () => { active = false; clearInterval(t); offTick(); offConnection(); };
   }, [apiBase]);
 
   // On first ticks arrival (initial mount / page refresh), jump to the bottom
@@ -6,6 +6,8 @@ import { imageUrl } from "../lib/imageUrl";
 import Footer from "../components/Footer";
 
 const PAGE_SIZE = 24;
+// Everything a grid card renders (id and created_at always come back).
+const GRID_FIELDS = "title,cycle,image_url,has_image";
 
 export default function Gallery() {
   const API = useMemo(() => "/api/proxy", []);
@@ -21,9 +23,10 @@ export default function Gallery() {
     try {
       const offset = (pageNum - 1) * PAGE_SIZE;
       // include_images=true so legacy data-URI artifacts still come through.
+      // fields= keeps bodies and monologues out of the grid payload.
       // Pagination via offset; total count fetched separately below.
       const [pageRes, countRes] = await Promise.all([
-        fetch(`${API}/artifacts?artifact_type=image&limit=${PAGE_SIZE}&offset=${offset}&sort=desc&include_images=true`),
+        fetch(`${API}/artifacts?artifact_type=image&limit=${PAGE_SIZE}&offset=${offset}&sort=desc&include_images=true&fields=${GRID_FIELDS}`),
         fetch(`${API}/artifacts/count?artifact_type=image`),
       ]);
       if (pageRes.ok) {
@@ -0,0 +1,94 @@
+/**
+ * Shared connection to the API's /events Server-Sent Events stream.
+ *
+ * One EventSource per tab, opened on the first subscribe() and closed
+ * when the last subscriber leaves. The browser reconnects on its own
+ * after a network drop (resuming via Last-Event-ID); if the server
+ * refuses the stream (503 at its client cap) we retry after
+ * REOPEN_DELAY_MS. onConnection() reports whether the stream is live so
+ * callers can fall back to polling while it isn't.
+ */
+
+const EVENTS_URL = "/api/proxy/events";
+const REOPEN_DELAY_MS = 30000;
+
+type Handler = (data: unknown) => void;
+type ConnectionListener = (open: boolean) => void;
+
+const handlers = new Map<string, Set<Handler>>();
+const connectionListeners = new Set<ConnectionListener>();
+let source: EventSource | null = null;
+let open = false;
+let reopenTimer: ReturnType<typeof setTimeout> | null = null;
+
+function setOpen(value: boolean) {
+  if (open === value) return;
+  open = value;
+  connectionListeners.forEach((l) => l(value));
+}
+
+function listen(es: EventSource, type: string) {
+  es.addEventListener(type, (e) => {
+    let data: unknown;
+    try {
+      data = JSON.parse((e as MessageEvent).data);
+    } catch {
+      return;
+    }
+    handlers.get(type)?.forEach((h) => h(data));
+  });
+}
+
+function connect() {
+  if (source || typeof EventSource === "undefined") return;
+  const es = new EventSource(EVENTS_URL);
+  source = es;
+  handlers.forEach((_, type) => listen(es, type));
+  es.onopen = () => setOpen(true);
+  es.onerror = () => {
+    setOpen(false);
+    if (es.readyState !== EventSource.CLOSED) return; // browser is reconnecting
+    es.close();
+    source = null;
+    if (!reopenTimer) {
+      reopenTimer = setTimeout(() => {
+        reopenTimer = null;
+        if (handlers.size > 0) connect();
+      }, REOPEN_DELAY_MS);
+    }
+  };
+}
+
+function disconnect() {
+  source?.close();
+  source = null;
+  if (reopenTimer) clearTimeout(reopenTimer);
+  reopenTimer = null;
+  setOpen(false);
+}
+
+/** Call handler with the parsed data of every `type` event. Returns an unsubscribe function. */
+export function subscribe(type: string, handler: Handler): () => void {
+  let set = handlers.get(type);
+  if (!set) {
+    set = new Set();
+    handlers.set(type, set);
+    if (source) listen(source, type);
+  }
+  set.add(handler);
+  connect();
+  return () => {
+    set.delete(handler);
+    if (set.size === 0) handlers.delete(type);
+    if (handlers.size === 0) disconnect();
+  };
+}
+
+/** Call listener whenever the stream opens or drops. Returns an unsubscribe function. */
+export function onConnection(listener: ConnectionListener): () => void {
+  connectionListeners.add(listener);
+  listener(open);
+  return () => {
+    connectionListeners.delete(listener);
+  };
+}
@@ -0,0 +1,25 @@
+import type { Controls } from "../types";
+
+/**
+ * The temperature right now, decayed from the stored one.
+ *
+ * Mirrors effective_temperature in api/db.py: a user-set temperature
+ * decays linearly back to default_temperature over temp_decay_hours.
+ * /home sends these inputs (not just the decayed value) so its state
+ * version only changes when something is written; "state" events carry
+ * them too. Responses without them (/state, /vote, /seed) already carry
+ * the decayed value.
+ */
+export function effectiveTemperature(controls: Controls, now: number = Date.now()): number {
+  const { stored_temperature: stored, temp_set_at: setAt, temp_decay_hours: hours } = controls;
+  if (stored === undefined || setAt === undefined || !hours) return controls.temperature;
+  const target = controls.default_temperature;
+  if (setAt === null || stored === target) return target;
+  // "2026-04-09 12:00:00.123456+00:00": ISO-ify and keep milliseconds.
+  const start = Date.parse(setAt.replace(" ", "T").replace(/(\.\d{3})\d+/, "$1"));
+  if (Number.isNaN(start)) return controls.temperature;
+  const elapsed = (now - start) / 3_600_000;
+  if (elapsed >= hours) return target;
+  const t = Math.max(0, elapsed) / hours;
+  return Math.round((stored + (target - stored) * t) * 10_000) / 10_000;
+}
@@ -1,7 +1,7 @@
 "use client";
 
 import { useEffect, useMemo, useRef, useState } from "react";
-import type { Artifact, Controls as ControlsType, Seed, State } from "./types";
+import type { Artifact, Controls as ControlsType, Home as HomeData, Seed, State } from "./types";
 import ControlsPanel from "./components/Controls";
 import CrtTerminal from "./components/CrtTerminal";
 import CrystalWrapper from "./components/CrystalWrapper";
@@ -9,7 +9,9 @@ import NavBeams from "./components/NavBeams";
 import DaemonTerminal from "./components/DaemonTerminal";
 import VotingBox from "./components/VotingBox";
 import Footer from "./components/Footer";
+import { onConnection, subscribe } from "./lib/events";
 import { imageUrl } from "./lib/imageUrl";
+import { effectiveTemperature } from "./lib/temperature";
 
 // Primary featured artifact — pinned to the top of the featured section
 // regardless of cycle order, and auto-expanded on initial page load. The
@@ -17,6 +19,11 @@ import { imageUrl } from "./lib/imageUrl";
 // id to change which artifact leads the home page.
 const PRIMARY_FEATURED_ID = 1775696507944; // "The Interval" (cycle 4)
 
+// Poll cadence for /home. While the /events stream is up, changes are
+// pushed and the poll only runs every LIVE_POLL_MS as a safety net.
+const POLL_MS = 8000;
+const LIVE_POLL_MS = 60000;
+
 export default function Home() {
   const API = useMemo(() => "/api/proxy", []);
   const [controls, setControls] = useState<ControlsType | null>(null);
@@ -36,16 +43,26 @@ export default function Home() {
   const [voteError, setVoteError] = useState<string | null>(null);
   const [tempError, setTempError] = useState<string | null>(null);
   const draggingTempRef = useRef<boolean>(false);
+  const controlsRef = useRef<ControlsType | null>(null);
+  // Last-seen /home section versions + ETag, so polls only carry changes.
+  const homeVersionsRef = useRef<Record<string, string>>({});
+  const homeEtagRef = useRef<string | null>(null);
 
   async function fetchData() {
     try {
-      const [stateRes, runsRes, featuredRes] = await Promise.all([
-        fetch(`${API}/state`),
-        fetch(`${API}/runs`),
-        fetch(`${API}/featured`),
-      ]);
-      if (featuredRes.ok) {
-        const featuredData = await featuredRes.json();
+      const versions = Object.entries(homeVersionsRef.current)
+        .map(([name, v]) => `${name}:${v}`)
+        .join(",");
+      const homeRes = await fetch(`${API}/home?versions=${encodeURIComponent(versions)}`, {
+        headers: homeEtagRef.current ? { "If-None-Match": homeEtagRef.current } : {},
+      });
+      if (homeRes.status === 304 || !homeRes.ok) return;
+      const home = (await homeRes.json()) as HomeData;
+      homeVersionsRef.current = home.versions;
+      homeEtagRef.current = homeRes.headers.get("ETag");
+
+      if (home.featured !== "unchanged") {
+        const featuredData = home.featured;
         if (Array.isArray(featuredData) && featuredData.length > 0) {
           // Pin PRIMARY_FEATURED_ID to the top; sort the rest by cycle ASC
           // so the medal order is: 🥇 primary (oldest signature piece),
@@ -62,51 +79,25 @@ export default function Home() {
             setFeaturedExpandedId(ordered[0]?.id ?? null);
             featuredInitializedRef.current = true;
           }
-        } else if (featuredData && featuredData.id) {
-          // Backward compat with old single-object response
-          setFeaturedArtifacts([featuredData as Artifact]);
-          if (!featuredInitializedRef.current) {
-            setFeaturedExpandedId(featuredData.id);
-            featuredInitializedRef.current = true;
-          }
         }
       }
-      if (!stateRes.ok) return;
-      const stateData = (await stateRes.json()) as State;
-      setControls(stateData.controls);
-      if (!draggingTempRef.current) {
-        setTemp(stateData.controls.temperature);
+      if (home.state !== "unchanged") {
+        applyState(home.state as State);
       }
-      setSeeds(stateData.seeds);
 
-      // Fetch artifacts from the latest run only
-      let artsUrl = `${API}/artifacts?limit=25`;
-      let allRuns: Array<{ run_id: string }> = [];
-      if (runsRes.ok) {
-        allRuns = await runsRes.json();
-        if (allRuns.length > 0 && allRuns[0].run_id) {
-          artsUrl = `${API}/artifacts?limit=25&run_id=${allRuns[0].run_id}`;
-        }
-      }
-      const artsRes = await fetch(artsUrl);
-      if (!artsRes.ok) return;
-      const artsData = (await artsRes.json()) as Artifact[];
-      if (artsData.length > 0) {
+      // Artifacts from the latest run only (the server picks the run)
+      if (home.artifacts !== "unchanged" && home.artifacts.length > 0) {
+        const artsData = home.artifacts;
         setArtifacts(artsData);
         const topId = artsData[0].id;
         if (lastSeenTopIdRef.current === null || topId !== lastSeenTopIdRef.current) {
           setExpanded(topId);
           lastSeenTopIdRef.current = topId;
         }
-        // Find latest image via dedicated endpoint (list responses omit image data to save bandwidth)
-        try {
-          const imgRes = await fetch(`${API}/latest-image`);
-          if (imgRes.ok) {
-            const imgData = await imgRes.json();
-            if (imgData && imgData.image_url) setLatestImage(imgData as Artifact);
-          }
-        } catch { /* ignore */
-        }
+      }
+      // Latest image comes from its own section (list rows omit image data to save bandwidth)
+      if (home.latest_image !== "unchanged" && home.latest_image && home.latest_image.image_url) {
+        setLatestImage(home.latest_image);
       }
     } catch {
       // API unreachable — keep existing state
@@ -115,10 +106,48 @@ export default function Home() {
     }
   }
 
+  function applyState(stateData: State) {
+    controlsRef.current = stateData.controls;
+    setControls(stateData.controls);
+    if (!draggingTempRef.current) {
+      setTemp(effectiveTemperature(stateData.controls));
+    }
+    setSeeds(stateData.seeds);
+  }
+
+  // /home's state section is unchanged while the temperature decays, so
+  // the slider follows the decay locally between writes.
+  function decayTemp() {
+    if (controlsRef.current && !draggingTempRef.current) {
+      setTemp(effectiveTemperature(controlsRef.current));
+    }
+  }
+
   useEffect(() => {
+    let live = false;
+    let lastPoll = Date.now();
     fetchData();
-    const t = setInterval(fetchData, 8000);
-    return () => clearInterval(t);
+    const t = setInterval(() => {
+      decayTemp();
+      if (live && Date.now() - lastPoll < LIVE_POLL_MS) return;
+      lastPoll = Date.now();
+      fetchData();
+    }, POLL_MS);
+    // State events carry the full /state payload; anything else just
+    // triggers a /home delta fetch.
+    const unsubscribe = [
+      subscribe("state", (data) => applyState(data as State)),
+      subscribe("artifact", () => fetchData()),
+      subscribe("featured", () => fetchData()),
+      subscribe("resync", () => fetchData()),
+      onConnection((open) => {
+        live = open;
+      }),
+    ];
+    return () => {
+      clearInterval(t);
+      unsubscribe.forEach((off) => off());
+    };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
@@ -135,6 +164,7 @@ export default function Home() {
         return;
       }
       const data = (await res.json()) as State;
+      controlsRef.current = data.controls;
       setControls(data.controls);
       setSeeds(data.seeds);
       setTempError(null);
@@ -157,6 +187,7 @@ export default function Home() {
         return;
       }
       const data = (await res.json()) as State;
+      controlsRef.current = data.controls;
       setControls(data.controls);
       setSeeds(data.seeds);
       setVoteError(null);
@@ -180,6 +211,7 @@ export default function Home() {
         return;
       }
       const data = (await res.json()) as State;
+      controlsRef.current = data.controls;
       setControls(data.controls);
       setSeeds(data.seeds);
       setSeedInput("");
@@ -17,6 +17,15 @@ export type Artifact = {
   run_id: string;
   image_url: string;
   has_image?: boolean;
+  // Precomputed at publish so layout/placeholders don't wait on the download.
+  image_width?: number | null;
+  image_height?: number | null;
+  image_size?: number | null;
+  image_mime?: string;
+  image_placeholder?: string;
+  image_color?: string;
+  // Bumped by every edit; pollers pass X-Change-Token back as ?since=.
+  updated_at?: string;
 };
 
 export type Run = {
@@ -48,6 +57,11 @@ export type Controls = {
   trajectory_reason: string;
   updated_at: string;
   tagline: string;
+  // /home and "state" events: decay inputs, so the client computes the current
+  // temperature (lib/temperature.ts) and /home's state version stays put.
+  stored_temperature?: number;
+  temp_set_at?: string | null;
+  temp_decay_hours?: number;
 };
 
 export type State = {
@@ -55,3 +69,16 @@ export type State = {
   controls: Controls;
   seeds: Seed[];
 };
+
+// GET /home: every home-page section in one poll. Sections whose version
+// matches the one the client sent back come back as "unchanged".
+export type HomeSection<T> = T | "unchanged";
+
+export type Home = {
+  versions: Record<string, string>;
+  state: HomeSection<State>;
+  runs: HomeSection<Run[]>;
+  featured: HomeSection<Artifact[]>;
+  artifacts: HomeSection<Artifact[]>;
+  latest_image: HomeSection<Artifact | null>;
+};